@@ -1,30 +1,56 @@
 # ai_utils.py
 
-import ast
 import json
 import os
 import re
 import requests
 import hashlib
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from config import Config
-from datetime import datetime, timezone
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
-from azure.storage.blob import BlobServiceClient
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service as EdgeService
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from azure.core.credentials import AzureKeyCredential
-from azure.core.exceptions import ResourceNotFoundError, ResourceModifiedError
+from search_helper import get_indices, get_index_fields, get_search_client, get_search_endpoint, invalidate_index_catalog
+from response_cache import get_response_cache
+from llm_client import LLMError, get_llm_client
+from context_builder import build_context, count_tokens, format_history, trim_history, truncate_to_tokens
+from embeddings import embed_documents, get_embedder
+from qa_generation import generate_qa_batch, print_qa_metrics
+from ingestion_pipeline import Stage, run_pipeline, print_pipeline_summary
+from ingest_jobs import JobJournal, get_job_queue
+from browser_pool import get_browser_pool, close_browser_pool
+from ingest_manifest import PENDING, ChunkPlan, get_ingest_manifest, hash_stream, hash_text
+from chunker import chunk_sections, chunk_text
+from html_extract import extract_page
+from datetime import datetime, timedelta, timezone
 
 config = Config()
 
 session_history = {}
+last_response_stats = {}
+
+search_executor = ThreadPoolExecutor(max_workers=config.SEARCH_MAX_WORKERS, thread_name_prefix="lumina-search")
+last_search_stats = {}
+known_document_ids = {}
+known_document_ids_lock = threading.Lock()
+consolidated_index_lock = threading.Lock()
+reported_schema_issues = set()
+ingestion_lock = threading.Lock()
+background_ingestion = {"thread": None, "description": None}
+
+usage_lock = threading.Lock()
+
+RETRYABLE_INDEXING_STATUSES = {409, 422, 429, 500, 502, 503, 504}
+
+DOC_TYPE_ALIASES = {
+    "transcript": "transcript_chunk",
+    "transcripts": "transcript_chunk",
+    "qa": "qa",
+    "q&a": "qa",
+    "content": "content",
+    "pages": "content",
+    "docs": "content"
+}
 
 def generate_index_name(url_or_identifier):
     slug = url_or_identifier.replace("https://", "").replace("http://", "").replace("_", "-").lower()
@@ -37,191 +63,19 @@ def generate_valid_id(url_or_identifier, doc_index):
     index_name = generate_index_name(url_or_identifier)
     return f"{index_name}-{doc_index}"
 
-def split_text_with_overlap(text, chunk_size=3000, overlap=300):
-    """
-    Split text into chunks with a specified overlap between chunks.
-    """
-    chunks = []
-    start = 0
-    text_length = len(text)
-    while start < text_length:
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap if end < text_length else text_length
-    return chunks
-
 def scrape_authenticated_page(url):
-    options = webdriver.EdgeOptions()
-
-    local_driver_path = os.path.join(os.getcwd(), "drivers", "msedgedriver.exe")
-
-    if os.path.exists(local_driver_path):
-        print(f"Using local Edge WebDriver: {local_driver_path}")
-        service = EdgeService(local_driver_path)
-    else:
-        print("No local Edge WebDriver found. Attempting to download...")
-        try:
-            service = EdgeService(EdgeChromiumDriverManager().install())
-        except Exception as e:
-            raise RuntimeError(
-                "Could not download Edge WebDriver. "
-                "Please ensure internet access or place msedgedriver.exe in the 'drivers' folder."
-            ) from e
+    return get_browser_pool().fetch(url)
 
-    driver = webdriver.Edge(options=options, service=service)
-    driver.get(url)
+def record_usage(usage, response_json):
+    if usage is None:
+        return
+    tokens = response_json.get("usage") or {}
+    with usage_lock:
+        for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            usage[field] = usage.get(field, 0) + tokens.get(field, 0)
 
-    try:
-        WebDriverWait(driver, 20).until(lambda d: d.find_element(By.ID, "_content"))
-    except Exception as e:
-        print("Warning: Main content not detected; proceeding anyway.", e)
-
-    html = driver.page_source
-    driver.quit()
-    return html
-
-def extract_title(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    return soup.title.get_text().strip() if soup.title else ""
-
-def extract_main_content(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    article = soup.find('article', id="_content")
-    if article:
-        for unwanted in article.find_all(['nav', 'header', 'footer', 'aside', 'script', 'style']):
-            unwanted.decompose()
-        return article.get_text(separator="\n").strip()
-    else:
-        paragraphs = soup.find_all('p')
-        texts = [p.get_text(separator=" ").strip() for p in paragraphs if p.get_text().strip()]
-        return "\n".join(texts) if texts else soup.get_text(separator="\n").strip()
-
-def extract_sections_from_article(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    article = soup.find('article', id="_content")
-    sections = []
-    if article:
-        for unwanted in article.find_all(['nav', 'header', 'footer', 'aside', 'script', 'style']):
-            unwanted.decompose()
-        h2_containers = article.find_all("div", class_=lambda x: x and "h2-container" in x)
-        if h2_containers:
-            for i, container in enumerate(h2_containers):
-                h_heading = container.find(['h1','h2','h3','h4','h5','h6'])
-                sec_title = h_heading.get_text(strip=True) if h_heading else f"Section {i+1}"
-                if h_heading:
-                    h_heading.decompose()
-                sec_content = container.get_text(separator="\n", strip=True)
-                sections.append({"title": sec_title, "content": sec_content})
-        else:
-            headings = article.find_all(['h1','h2','h3','h4','h5','h6'])
-            if headings:
-                for i, heading in enumerate(headings):
-                    sec_title = heading.get_text(strip=True)
-                    content_parts = []
-                    for sibling in heading.find_next_siblings():
-                        if sibling.name in ['h1','h2','h3','h4','h5','h6']:
-                            break
-                        text = sibling.get_text(separator=" ", strip=True)
-                        if text:
-                            content_parts.append(text)
-                    sec_content = "\n".join(content_parts).strip()
-                    if not sec_title:
-                        sec_title = f"Section {i+1}"
-                    sections.append({"title": sec_title, "content": sec_content})
-            else:
-                full_text = article.get_text(separator="\n").strip()
-                sections.append({"title": "Untitled Section", "content": full_text})
-    else:
-        paragraphs = soup.find_all('p')
-        for i, p in enumerate(paragraphs):
-            text = p.get_text(separator=" ", strip=True)
-            if text:
-                sections.append({"title": f"Section {i+1}", "content": text})
-        if not sections:
-            full_text = soup.get_text(separator="\n").strip()
-            sections.append({"title": "Untitled Section", "content": full_text})
-    return sections
-
-def generate_qa_pairs(text_chunk, identifier, max_retries=3):
-    target_min = max(10, int(len(text_chunk) / 1000) * 2)
-    target_max = target_min + 10
-    prompt = (
-        "Based solely on the **Content** provided below (ignore navigation menus, headers, footers, sidebars, and extraneous UI elements), "
-        f"Generate between {target_min} and {target_max} highly relevant question-answer pairs. Ensure coverage of all key topics and sections presented in the content."
-        "Each Q&A pair must be specific and accurate. If the text does not provide a clear, definitive answer, skip generating that pair. "
-        "Replace any user-specific details (such as IDs, GUIDs, or personal information) with placeholders. "
-        "Return your answer in JSON format as a list of objects, each with a 'question' field and an 'answer' field.\n\n"
-        "Content:\n" + text_chunk
-    )
-    headers = {"Content-Type": "application/json", "api-key": config.AZURE_OPENAI_API_KEY}
-    data = {
-        "model": config.DEPLOYMENT_NAME,
-        "messages": [
-            {"role": "system", "content": "You are an AI assistant that generates detailed Q&A pairs from provided content."},
-            {"role": "user", "content": prompt}
-        ],
-        "max_tokens": 4000
-    }
-    attempt = 0
-    while attempt < max_retries:
-        response = requests.post(config.AZURE_OPENAI_ENDPOINT, headers=headers, json=data)
-        if response.status_code == 429:
-            wait_time = 21
-            try:
-                error_msg = response.json().get("error", {}).get("message", "")
-                match = re.search(r"after (\d+) seconds", error_msg)
-                if match:
-                    wait_time = int(match.group(1))
-            except Exception:
-                pass
-            print(f"Rate limit exceeded. Waiting for {wait_time} seconds...")
-            time.sleep(wait_time)
-            attempt += 1
-            continue
-        try:
-            response_json = response.json()
-        except Exception as e:
-            print("Error parsing JSON:", e)
-            return []
-        message_content = response_json.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-        if message_content.startswith("```json"):
-            message_content = message_content[len("```json"):].strip()
-        if message_content.endswith("```"):
-            message_content = message_content[:-3].strip()
-        message_content_clean = re.sub(r'[\x00-\x1F]+', ' ', message_content)
-        try:
-            qa_pairs = json.loads(message_content_clean)
-            if isinstance(qa_pairs, str):
-                qa_pairs = json.loads(qa_pairs)
-            if isinstance(qa_pairs, list) and all(isinstance(item, dict) for item in qa_pairs):
-                return qa_pairs
-            else:
-                print("Parsed Q&A pairs not in expected format:", qa_pairs)
-                return []
-        except Exception as e:
-            print("Error parsing Q&A pairs:", e)
-            try:
-                qa_pairs = ast.literal_eval(message_content_clean)
-                if isinstance(qa_pairs, list) and all(isinstance(item, dict) for item in qa_pairs):
-                    return qa_pairs
-                else:
-                    print("AST literal_eval parsed Q&A pairs not in expected format:", qa_pairs)
-                    return []
-            except Exception as e2:
-                print("Error parsing Q&A pairs with ast.literal_eval:", e2)
-                match = re.search(r'\[.*\]', message_content_clean, re.DOTALL)
-                if match:
-                    trimmed = match.group(0)
-                    try:
-                        qa_pairs = json.loads(trimmed)
-                        if isinstance(qa_pairs, list) and all(isinstance(item, dict) for item in qa_pairs):
-                            return qa_pairs
-                    except Exception as e3:
-                        print("Error parsing trimmed Q&A pairs:", e3)
-                return []
-    print("Max retries reached for", identifier)
-    return []
+def generate_qa_pairs(text, identifier, max_retries=3):
+    return generate_qa_batch({identifier: text}, identifier, max_retries)[identifier]
 
 def clean_transcript_text(raw_text):
     cleaned = re.sub(r'\d+:\d+:\d+|\d+:\d+', '', raw_text)
@@ -229,88 +83,279 @@ def clean_transcript_text(raw_text):
     cleaned = re.sub(r'\s+', ' ', cleaned).strip()
     return cleaned
 
-def enhance_text_via_ai(text, identifier, max_retries=3):
+def enhance_text_via_ai(text, identifier, max_retries=3, usage=None):
     prompt = (
         "You are an AI assistant that improves text by correcting grammar, punctuation, and filling in missing words based on context, "
         "without altering the original meaning. Remove any side conversations or filler talk such as the friendly banter at the beginning and end of every meeting. Improve the following text and return the result as plain text:\n\n" + text
     )
-    headers = {"Content-Type": "application/json", "api-key": config.AZURE_OPENAI_API_KEY}
-    data = {
-        "model": config.DEPLOYMENT_NAME,
-        "messages": [
-            {"role": "system", "content": "You are an assistant that cleans up text."},
-            {"role": "user", "content": prompt}
-        ],
-        "max_tokens": 4000
-    }
-    attempt = 0
-    while attempt < max_retries:
-        response = requests.post(config.AZURE_OPENAI_ENDPOINT, headers=headers, json=data)
-        if response.status_code == 429:
-            wait_time = 21
-            try:
-                error_msg = response.json().get("error", {}).get("message", "")
-                match = re.search(r"after (\d+) seconds", error_msg)
-                if match:
-                    wait_time = int(match.group(1))
-            except Exception:
-                pass
-            print(f"Rate limit exceeded (enhancement). Waiting for {wait_time} seconds...")
-            time.sleep(wait_time)
-            attempt += 1
-            continue
-        try:
-            response_json = response.json()
-            improved_text = response_json.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-            return improved_text
-        except Exception as e:
-            print("Error enhancing text via AI:", e)
-            attempt += 1
-    print("Max retries reached for text enhancement", identifier)
+    messages = [
+        {"role": "system", "content": "You are an assistant that cleans up text."},
+        {"role": "user", "content": prompt}
+    ]
+    try:
+        response_json = get_llm_client().chat(messages, max_tokens=4000, label=f"enhancement of {identifier}", max_retries=max_retries)
+        record_usage(usage, response_json)
+        return response_json.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+    except LLMError as e:
+        print(e)
+    except Exception as e:
+        print("Error enhancing text via AI:", e)
     return text
 
-def get_indices():
-    endpoint = f"https://{config.SEARCH_SERVICE_NAME}.search.windows.net"
-    credential = AzureKeyCredential(config.ADMIN_KEY)
-    index_client = SearchIndexClient(endpoint=endpoint, credential=credential)
-    return [index.name for index in index_client.list_indexes()]
+def has_vector_field(index_name, service_name=None, admin_key=None):
+    """
+    Whether the index schema has VECTOR_FIELD; None if the schema could not
+    be read. Either problem is reported once per index, not on every query.
+    """
+    try:
+        fields = get_index_fields(index_name, service_name, admin_key)
+    except Exception as e:
+        if ("unreadable", index_name) not in reported_schema_issues:
+            reported_schema_issues.add(("unreadable", index_name))
+            print(f"Warning: Could not read the schema of index '{index_name}'; searching it by keyword only:", e)
+        return None
+    reported_schema_issues.discard(("unreadable", index_name))
+    if config.VECTOR_FIELD in fields:
+        return True
+    if config.EMBEDDINGS_ENABLED and ("no vectors", index_name) not in reported_schema_issues:
+        reported_schema_issues.add(("no vectors", index_name))
+        print(f"Warning: Index '{index_name}' has no {config.VECTOR_FIELD} field, so it is searched by keyword only. "
+              "The field is added on the next upload to it; re-ingest its sources to embed the existing documents.")
+    return False
 
-INDICES = get_indices()
+def add_vector_field(index_name, service_name=None, admin_key=None):
+    """
+    Add VECTOR_FIELD to an index created before embeddings were enabled, so
+    documents uploaded from now on carry vectors. Returns whether it worked.
+    """
+    print(f"Adding {config.VECTOR_FIELD} to index {index_name}...")
+    create_or_replace_index(service_name or config.SEARCH_SERVICE_NAME, admin_key or config.ADMIN_KEY, index_name, replace=False)
+    return bool(has_vector_field(index_name, service_name, admin_key))
 
-def query_search_indices(query):
+def embed_query(query):
+    if config.SEARCH_MODE == "keyword" or not config.EMBEDDINGS_ENABLED:
+        return None
+    try:
+        return get_embedder()(query)
+    except Exception as e:
+        print("Warning: Could not embed query; falling back to keyword search:", e)
+        return None
 
-    INDICES = get_indices()
+def parse_search_filters(text):
+    """
+    Parse "transcripts qa last 90 days file <name>" into query_search_indices
+    filters. Returns None if nothing recognisable was given.
+    """
+    filters = {}
+    file_match = re.search(r'\bfile\s+(\S+)', text, re.IGNORECASE)
+    if file_match:
+        filters["file_name"] = file_match.group(1)
+        text = text[:file_match.start()] + text[file_match.end():]
+    days_match = re.search(r'\blast\s+(\d+)\s+days?\b', text, re.IGNORECASE)
+    if days_match:
+        filters["since_days"] = int(days_match.group(1))
+    doc_types = [DOC_TYPE_ALIASES[word] for word in re.findall(r'[\w&]+', text.lower()) if word in DOC_TYPE_ALIASES]
+    if doc_types:
+        filters["doc_types"] = list(dict.fromkeys(doc_types))
+    return filters or None
+
+def filter_cutoff(since_days):
+    return datetime.now(timezone.utc) - timedelta(days=since_days)
+
+def build_search_filter(doc_types=None, since_days=None, file_name=None):
+    """
+    Build the OData filter pushed down to the search service for the
+    doc_type/upload_date/file_name fields every index schema has.
+    """
+    clauses = []
+    if doc_types:
+        values = ",".join(doc_type.replace("'", "''").replace(",", "") for doc_type in doc_types)
+        clauses.append(f"search.in(doc_type, '{values}', ',')")
+    if since_days:
+        clauses.append(f"upload_date ge {filter_cutoff(since_days).strftime('%Y-%m-%dT%H:%M:%SZ')}")
+    if file_name:
+        escaped = file_name.replace("'", "''")
+        clauses.append(f"file_name eq '{escaped}'")
+    return " and ".join(clauses) or None
+
+def document_matches_filters(document, doc_types=None, since_days=None, file_name=None):
+    if doc_types and document.get("doc_type") not in doc_types:
+        return False
+    if file_name and document.get("file_name") != file_name:
+        return False
+    if since_days:
+        try:
+            uploaded = datetime.fromisoformat(document.get("upload_date", "").replace("Z", "+00:00"))
+        except ValueError:
+            return False
+        if uploaded < filter_cutoff(since_days):
+            return False
+    return True
 
-    endpoint = f"https://{config.SEARCH_SERVICE_NAME}.search.windows.net"
-    credential = AzureKeyCredential(config.ADMIN_KEY)
-    all_results = []
+def search_index(index, query, query_vector=None, search_filter=None):
+    """
+    Query one index. query_vector is a Future for the query embedding (None
+    when embeddings are off), so the client and schema lookups here overlap
+    the embedding call. With a vector and an index that has a vector field,
+    SEARCH_MODE "hybrid" runs keyword + vector with semantic reranking and
+    "vector" runs the vector query alone; otherwise it is keyword-only.
+    """
+    start = time.perf_counter()
+    search_client = get_search_client(index)
+    options = {}
+    if search_filter:
+        options["filter"] = search_filter
+    search_text = query
+    vector = query_vector.result() if query_vector is not None and has_vector_field(index) else None
+    if vector is not None:
+        from azure.search.documents.models import VectorizedQuery
+        options["vector_queries"] = [VectorizedQuery(vector=vector, k_nearest_neighbors=config.VECTOR_K, fields=config.VECTOR_FIELD)]
+        if config.SEARCH_MODE == "vector":
+            search_text = None
+    if search_text is not None:
+        options.update(query_type="semantic", semantic_configuration_name="default", search_fields=["title", "content"])
+    results = search_client.search(
+        search_text=search_text,
+        top=4,
+        timeout=config.SEARCH_INDEX_TIMEOUT,
+        read_timeout=config.SEARCH_INDEX_TIMEOUT,
+        **options
+    )
+    hits = []
+    for result in results:
+        content = result.get("content", "")
+        if content:
+            hits.append({
+                "index": index,
+                "doc_type": result.get("doc_type", "unknown"),
+                "title": result.get("title", "No Title"),
+                "content": content,
+                "page": result.get("file_name") or result.get("page_title"),
+                "score": result.get("@search.reranker_score") or result.get("@search.score") or 0.0
+            })
+    return hits, time.perf_counter() - start
+
+def search_indices_for_query():
+    if config.CONSOLIDATED_INDEX_ENABLED:
+        return [config.CONSOLIDATED_INDEX_NAME]
+    return [index for index in get_indices() if index != config.CONSOLIDATED_INDEX_NAME]
+
+def search_hits(query, filters=None):
+    """
+    Search every index concurrently and return (hits, index_stats, elapsed)
+    without packing them into a context. Indexes that fail or miss the
+    SEARCH_DEADLINE are skipped so a slow index only costs its own results.
 
-    for index in INDICES:
-        search_client = SearchClient(endpoint=endpoint, index_name=index, credential=credential)
-        results = search_client.search(
-            search_text=query,
-            query_type="semantic",
-            semantic_configuration_name="default",
-            top=4,
-            search_fields=["title", "content"]
-        )
-        for result in results:
-            doc_type = result.get("doc_type", "unknown")
-            title = result.get("title", "No Title")
-            content = result.get("content", "")
-            if content:
-                all_results.append(f"[{index}][{doc_type}] {title}: {content}")
+    In consolidated mode only CONSOLIDATED_INDEX_NAME is queried. `filters`
+    (doc_types, since_days, file_name) are pushed down as an OData filter.
+    """
+    filters = filters or {}
+    if config.SEARCH_BACKEND == "local":
+        start = time.perf_counter()
+        from local_search import get_local_index
+        all_hits = get_local_index().search(query, top=config.LOCAL_SEARCH_TOP,
+                                            accept=lambda doc: document_matches_filters(doc, **filters))
+        index_stats = {"local": {"status": "ok", "latency": time.perf_counter() - start, "hits": len(all_hits)}}
+        futures = {}
+    else:
+        all_hits = []
+        index_stats = {}
+        start = time.perf_counter()
+        search_filter = build_search_filter(**filters)
+        # The per-index tasks fetch their clients and schemas (and keyword-only
+        # indexes search) while this thread embeds the query.
+        query_vector = Future() if config.SEARCH_MODE != "keyword" and config.EMBEDDINGS_ENABLED else None
+        futures = {index: search_executor.submit(search_index, index, query, query_vector, search_filter) for index in search_indices_for_query()}
+        if query_vector is not None:
+            vector = None
+            try:
+                vector = embed_query(query)
+            finally:
+                query_vector.set_result(vector)
+    done, _ = wait(futures.values(), timeout=config.SEARCH_DEADLINE) if futures else (set(), set())
+
+    for index, future in futures.items():
+        if future not in done:
+            future.cancel()
+            index_stats[index] = {"status": "timeout", "latency": None, "hits": 0}
+            continue
+        try:
+            hits, latency = future.result()
+        except Exception as e:
+            print(f"Warning: Search failed for index '{index}': {e}")
+            index_stats[index] = {"status": "error", "latency": None, "hits": 0}
+            continue
+        index_stats[index] = {"status": "ok", "latency": latency, "hits": len(hits)}
+        all_hits.extend(hits)
+
+    timed_out = [index for index, stats in index_stats.items() if stats["status"] == "timeout"]
+    if timed_out:
+        print(f"Warning: {len(timed_out)} index(es) missed the {config.SEARCH_DEADLINE}s search deadline: {', '.join(timed_out)}")
+    return all_hits, index_stats, time.perf_counter() - start
+
+def pack_search_context(query, filters, hits, index_stats, elapsed):
+    """
+    Pack hits into the context token budget (see context_builder.build_context)
+    and record per-index latency and packing stats in last_search_stats.
+    """
+    all_results, context_stats = build_context(hits, config.CONTEXT_TOKEN_BUDGET, config.CONTEXT_DEDUPE_THRESHOLD)
+    last_search_stats.clear()
+    last_search_stats.update({"query": query, "filters": filters or {}, "elapsed": elapsed, "indices": index_stats, "context": context_stats})
+
+    if config.SEARCH_LOG_LATENCY:
+        for index, stats in index_stats.items():
+            latency = f"{stats['latency'] * 1000:.0f} ms" if stats["latency"] is not None else "-"
+            print(f"  [{index}] {stats['status']} {latency} ({stats['hits']} hits)")
+        print(f"Searched {len(index_stats)} index(es) in {elapsed * 1000:.0f} ms; packed {context_stats['packed']} of "
+              f"{context_stats['hits']} hit(s) into {context_stats['tokens']} tokens ({context_stats['duplicates']} duplicate(s) dropped)")
     return all_results
+
+def query_search_indices(query, filters=None):
+    """
+    Search every index concurrently and pack the best hits into the context
+    token budget; see search_hits and pack_search_context.
+    """
+    hits, index_stats, elapsed = search_hits(query, filters)
+    return pack_search_context(query, filters, hits, index_stats, elapsed)
+
+def warm_search():
+    """
+    Load the index catalog, index schemas, search clients, LLM session and
+    tokenizer ahead of the first question, so none of it is paid mid-turn.
+    """
+    count_tokens("warm up")
+    get_llm_client()
+    if config.SEARCH_BACKEND == "local":
+        from local_search import get_local_index
+        get_local_index()
+        return
+    for index in search_indices_for_query():
+        get_search_client(index)
+        if config.SEARCH_MODE != "keyword" and config.EMBEDDINGS_ENABLED:
+            has_vector_field(index)
+
+def rewrite_follow_up(question, history):
+    """
+    Rewrite a follow-up like "what about in Linux?" into a standalone search
+    query, using the last few (question, answer) turns of history.
+    """
+    turns = history[-config.TURN_REWRITE_TURNS:]
+    transcript = "\n".join(f"User: {asked}\nLumina: {truncate_to_tokens(answer, 150)}" for asked, answer in turns)
+    messages = [
+        {"role": "system", "content": "You rewrite follow-up questions into standalone search queries."},
+        {"role": "user", "content": (
+            f"Conversation so far:\n{transcript}\n\nFollow-up question: {question}\n\n"
+            "Rewrite the follow-up as a standalone search query that names whatever it refers to. "
+            "If it is already standalone, repeat it unchanged. Return only the query."
+        )}
+    ]
+    return get_llm_client().chat_text(messages, max_tokens=60, label="query rewrite").strip().strip('"') or question
  
 config = Config()
 
-def generate_response(user_input, context, history):
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": config.AZURE_OPENAI_API_KEY
-    }
-
-    history_text = "\n".join([f"{role.capitalize()}: {content}" for role, content in history])
+def build_response_messages(user_input, context, history):
+    history_text = format_history(trim_history(history, config.HISTORY_TOKEN_BUDGET))
+    context_text = "\n\n".join(context) if isinstance(context, (list, tuple)) else context
     prompt = (
         "Your name is Lumina. You are a technical knowledge assistant for the Azure App Service Team, led by Bilal Alam.\n"
         "Answer the question below using ONLY the provided context and contextually relevant parts of the provided Conversation History. Do not invent or guess information.\n\n"
@@ -319,41 +364,87 @@ def generate_response(user_input, context, history):
         "Generalize or replace tenant names, GUIDs, IDs, email addresses, and anything user/environment-specific with placeholder text.\n"
         "Do not hallucinate acronyms, make up context, or make up something in general if you’re not confident.\n"
         "If you absolutely cannot find the answer from context, respond with: \"I'm sorry, I couldn't find an exact answer based on the available information.\"\n\n"
-        f"Context:\n{context}\n\n"
+        f"Context:\n{context_text}\n\n"
         f"Conversation History:\n{history_text}\n\n"
         f"Question:\n{user_input}"
     )
 
-    messages = [
+    return [
         {"role": "system", "content": "You are an AI assistant. Use the provided context as your primary guide. Do not invent details if the context is insufficient."},
         {"role": "user", "content": prompt}
     ]
 
-    data = {"model": config.DEPLOYMENT_NAME, "messages": messages, "max_tokens": 1000}
-    response = requests.post(config.AZURE_OPENAI_ENDPOINT, headers=headers, json=data)
+def summarize_conversation(summary, turns, max_tokens=400):
+    prompt = (
+        "Update the running summary of this conversation with the new turns below. "
+        "Keep product names, commands, error messages, decisions and open questions; drop greetings and small talk. "
+        "Return only the updated summary.\n\n"
+        f"Current summary:\n{summary or '(none)'}\n\n"
+        f"New turns:\n{format_history(turns)}"
+    )
+    messages = [
+        {"role": "system", "content": "You maintain a concise running summary of a technical conversation."},
+        {"role": "user", "content": prompt}
+    ]
+    return get_llm_client().chat_text(messages, max_tokens=max_tokens, label="history summary").strip()
+
+def generate_response(user_input, context, history):
+    messages = build_response_messages(user_input, context, history)
 
     try:
-        return response.json().get("choices", [{}])[0].get("message", {}).get("content", "No response.")
+        return get_llm_client().chat_text(messages, max_tokens=1000, label="response") or "No response."
     except Exception as e:
         print("Error processing OpenAI response:", e)
         return "No response."
 
-def create_or_replace_index(service_name, admin_key, index_name):
+def generate_response_stream(user_input, context, history):
+    """
+    Stream the answer and yield each content delta as it arrives. If the
+    connection drops mid-stream the deltas already yielded are the reply.
+    Time to first token and total time land in last_response_stats.
+    """
+    messages = build_response_messages(user_input, context, history)
+
+    start = time.perf_counter()
+    first_token_at = None
+    chunks = 0
+    last_response_stats.clear()
+
+    try:
+        for token in get_llm_client().stream(messages, max_tokens=1000, label="response"):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            chunks += 1
+            yield token
+    except (LLMError, requests.RequestException) as e:
+        print(f"Error streaming OpenAI response: {e}")
+    finally:
+        last_response_stats.update({
+            "time_to_first_token": first_token_at - start if first_token_at is not None else None,
+            "total_time": time.perf_counter() - start,
+            "chunks": chunks
+        })
+
+def create_or_replace_index(service_name, admin_key, index_name, replace=True):
     """
     Create an index tailored for transcript and URL content.
     This schema includes documents for:
       - Q&A pairs (doc_type: "qa")
       - Raw content chunks (doc_type: "content")
     The semantic configuration prioritizes the 'title' field (if available) and 'content' field.
+    With EMBEDDINGS_ENABLED the schema also gets a VECTOR_FIELD and an HNSW vector profile.
+    With replace=False an existing index is updated in place instead of being deleted first.
     """
-    url = f"https://{service_name}.search.windows.net/indexes/{index_name}?api-version={config.API_VERSION}"
+    url = f"{get_search_endpoint(service_name)}/indexes/{index_name}?api-version={config.API_VERSION}"
     headers = {"Content-Type": "application/json", "api-key": admin_key}
     
     fields = [
         {"name": "id", "type": "Edm.String", "searchable": True, "filterable": True,
          "retrievable": True, "sortable": True, "facetable": True, "key": True, "synonymMaps": []},
         {"name": "doc_type", "type": "Edm.String", "searchable": True, "filterable": True,
-         "retrievable": True, "sortable": False, "facetable": False, "key": False, "synonymMaps": []},
+         "retrievable": True, "sortable": False, "facetable": True, "key": False, "synonymMaps": []},
+        {"name": "source_index", "type": "Edm.String", "searchable": False, "filterable": True,
+         "retrievable": True, "sortable": False, "facetable": True, "key": False, "synonymMaps": []},
         {"name": "page_title", "type": "Edm.String", "searchable": True, "filterable": True,
          "retrievable": True, "sortable": True, "facetable": False, "key": False, "synonymMaps": []},
         {"name": "title", "type": "Edm.String", "searchable": True, "filterable": True,
@@ -365,6 +456,10 @@ def create_or_replace_index(service_name, admin_key, index_name):
         {"name": "upload_date", "type": "Edm.DateTimeOffset", "searchable": False, "filterable": True,
          "retrievable": True, "sortable": True, "facetable": True, "key": False, "synonymMaps": []}
     ]
+    if config.EMBEDDINGS_ENABLED:
+        fields.append({"name": config.VECTOR_FIELD, "type": "Collection(Edm.Single)", "searchable": True,
+                       "retrievable": False, "dimensions": config.EMBEDDING_DIMENSIONS,
+                       "vectorSearchProfile": "default-vector-profile"})
     
     semantic_config = {
         "configurations": [
@@ -390,44 +485,227 @@ def create_or_replace_index(service_name, admin_key, index_name):
         "charFilters": [],
         "similarity": {"@odata.type": "#Microsoft.Azure.Search.BM25Similarity"}
     }
+    if config.EMBEDDINGS_ENABLED:
+        index_definition["vectorSearch"] = {
+            "algorithms": [{"name": "default-hnsw", "kind": "hnsw", "hnswParameters": {"metric": "cosine"}}],
+            "profiles": [{"name": "default-vector-profile", "algorithm": "default-hnsw"}]
+        }
     
-    delete_response = requests.delete(url, headers=headers)
-    if delete_response.status_code in [200, 204]:
-        print(f"Deleted existing index {index_name}")
-    else:
-        print(f"No existing index {index_name} or delete failed: {delete_response.text}")
-    
+    if replace:
+        delete_response = requests.delete(url, headers=headers)
+        if delete_response.status_code in [200, 204]:
+            print(f"Deleted existing index {index_name}")
+        else:
+            print(f"No existing index {index_name} or delete failed: {delete_response.text}")
+
     create_response = requests.put(url, headers=headers, json=index_definition)
-    if create_response.status_code == 201:
+    invalidate_index_catalog()
+    if replace:
+        forget_document_ids(service_name, index_name)
+    if create_response.status_code in (200, 201, 204):
         print(f"Created index {index_name} with semantic configuration.")
     else:
         print(f"Failed to create index {index_name}: {create_response.text}")
 
+def ensure_consolidated_index():
+    with consolidated_index_lock:
+        if config.CONSOLIDATED_INDEX_NAME not in get_indices():
+            create_or_replace_index(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, config.CONSOLIDATED_INDEX_NAME, replace=False)
+
+def route_documents(index_name, documents=()):
+    """
+    In consolidated mode, redirect writes for a per-source index to
+    CONSOLIDATED_INDEX_NAME, tagging each document with the index it was
+    meant for. Returns (index_name, documents) unchanged otherwise.
+    """
+    if not config.CONSOLIDATED_INDEX_ENABLED or index_name == config.CONSOLIDATED_INDEX_NAME:
+        return index_name, documents
+    if config.SEARCH_BACKEND != "local":
+        ensure_consolidated_index()
+    return config.CONSOLIDATED_INDEX_NAME, [dict(doc, source_index=doc.get("source_index") or index_name) for doc in documents]
+
+def split_document_batches(documents, max_count, max_bytes):
+    batches = []
+    batch = []
+    batch_bytes = 0
+    for doc in documents:
+        size = len(json.dumps(doc).encode("utf-8"))
+        if batch and (len(batch) >= max_count or batch_bytes + size > max_bytes):
+            batches.append((batch, batch_bytes))
+            batch = []
+            batch_bytes = 0
+        batch.append(doc)
+        batch_bytes += size
+    if batch:
+        batches.append((batch, batch_bytes))
+    return batches
+
+def upload_batch(search_client, batch, max_retries):
+    """
+    Upload one batch and retry only the keys that failed with a transient
+    status, backing off exponentially. Returns (succeeded_keys, failed, retried)
+    where failed maps each key that never made it to its last error.
+    """
+    pending = {doc["id"]: doc for doc in batch}
+    succeeded = []
+    failed = {}
+    retried = 0
+
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(min(config.UPLOAD_RETRY_BACKOFF * 2 ** (attempt - 1), 30))
+            retried += len(pending)
+        try:
+            results = search_client.upload_documents(documents=list(pending.values()))
+        except Exception as e:
+            failed.update({key: str(e) for key in pending})
+            continue
+
+        retry = {}
+        for result in results:
+            if result.succeeded:
+                succeeded.append(result.key)
+                failed.pop(result.key, None)
+                continue
+            failed[result.key] = f"{result.status_code}: {result.error_message}"
+            if result.status_code is None or result.status_code in RETRYABLE_INDEXING_STATUSES:
+                retry[result.key] = pending[result.key]
+        pending = retry
+        if not pending:
+            break
+
+    return succeeded, failed, retried
+
 def upload_documents(service_name, admin_key, index_name, documents):
-    endpoint = f"https://{service_name}.search.windows.net"
-    from azure.search.documents import SearchClient
-    from azure.core.credentials import AzureKeyCredential
-    credential = AzureKeyCredential(admin_key)
-    search_client = SearchClient(endpoint=endpoint, index_name=index_name, credential=credential)
-    results = search_client.upload_documents(documents=documents)
-    print(f"Uploaded {len(documents)} documents to index {index_name}")
-    print("Upload results:", results)
+    """
+    Upload documents in batches capped by UPLOAD_BATCH_SIZE and
+    UPLOAD_BATCH_BYTES, several batches at a time, and return a summary with
+    succeeded/failed/retried counts, failed keys, payload bytes and elapsed time.
+    Documents bound for an index with a vector field are embedded first.
+    With the local search backend documents go straight into the local index.
+    """
+    start = time.perf_counter()
+    summary = {"succeeded": 0, "failed": 0, "retried": 0, "failed_keys": {}, "batches": 0, "bytes": 0, "elapsed": 0.0}
+    if not documents:
+        return summary
+
+    index_name, documents = route_documents(index_name, documents)
+    if config.SEARCH_BACKEND == "local":
+        return store_local_documents(service_name, index_name, documents, summary, start)
+    payload = documents
+    vector_field = config.EMBEDDINGS_ENABLED and has_vector_field(index_name, service_name, admin_key)
+    if config.EMBEDDINGS_ENABLED and vector_field is False:
+        vector_field = add_vector_field(index_name, service_name, admin_key)
+    if vector_field:
+        try:
+            payload = embed_documents(documents, config.VECTOR_FIELD)
+        except Exception as e:
+            print(f"Warning: Could not embed documents for index {index_name}; uploading without vectors:", e)
+
+    search_client = get_search_client(index_name, service_name, admin_key)
+    batches = split_document_batches(payload, config.UPLOAD_BATCH_SIZE, config.UPLOAD_BATCH_BYTES)
+    with ThreadPoolExecutor(max_workers=min(config.UPLOAD_WORKERS, len(batches))) as executor:
+        outcomes = list(executor.map(lambda batch: upload_batch(search_client, batch[0], config.UPLOAD_MAX_RETRIES), batches))
+
+    succeeded_keys = []
+    for succeeded, failed, retried in outcomes:
+        succeeded_keys.extend(succeeded)
+        summary["failed_keys"].update(failed)
+        summary["retried"] += retried
+    summary["succeeded"] = len(succeeded_keys)
+    summary["failed"] = len(summary["failed_keys"])
+    summary["batches"] = len(batches)
+    summary["bytes"] = sum(batch_bytes for _, batch_bytes in batches)
+    summary["elapsed"] = time.perf_counter() - start
+
+    remember_document_ids(service_name, index_name, succeeded_keys)
+    from local_search import get_local_index, local_index_enabled
+    if local_index_enabled() and succeeded_keys:
+        succeeded_ids = set(succeeded_keys)
+        get_local_index().add_documents(index_name, [doc for doc in documents if doc["id"] in succeeded_ids])
+    cache = get_response_cache()
+    if cache is not None and succeeded_keys:
+        cache.invalidate_index(index_name)
+
+    retried = f", {summary['retried']} retried" if summary["retried"] else ""
+    print(f"Uploaded {summary['succeeded']}/{len(documents)} documents to index {index_name} "
+          f"in {summary['batches']} batch(es), {summary['bytes']} bytes, {summary['elapsed']:.1f}s{retried}")
+    for key, error in list(summary["failed_keys"].items())[:5]:
+        print(f"  Failed to upload {key}: {error}")
+    return summary
+
+def store_local_documents(service_name, index_name, documents, summary, start):
+    from local_search import get_local_index
+    get_local_index().add_documents(index_name, documents)
+    ids = [doc["id"] for doc in documents]
+    remember_document_ids(service_name, index_name, ids)
+    cache = get_response_cache()
+    if cache is not None:
+        cache.invalidate_index(index_name)
+    summary["succeeded"] = len(ids)
+    summary["elapsed"] = time.perf_counter() - start
+    print(f"Stored {len(ids)} documents in the local index {index_name} in {summary['elapsed']:.1f}s")
+    return summary
+
+def delete_documents(service_name, admin_key, index_name, ids):
+    if not ids:
+        return None
+    index_name, _ = route_documents(index_name)
+    results = None
+    if config.SEARCH_BACKEND != "local":
+        search_client = get_search_client(index_name, service_name, admin_key)
+        results = search_client.delete_documents(documents=[{"id": doc_id} for doc_id in ids])
+    forget_document_ids(service_name, index_name, ids)
+    from local_search import get_local_index, local_index_enabled
+    if local_index_enabled():
+        get_local_index().delete_documents(index_name, ids)
+    cache = get_response_cache()
+    if cache is not None:
+        cache.invalidate_index(index_name)
+    print(f"Deleted {len(ids)} stale document(s) from index {index_name}")
     return results
 
-def get_existing_ids(service_name, admin_key, index_name):
-    from azure.search.documents import SearchClient
-    endpoint = f"https://{service_name}.search.windows.net"
-    credential = AzureKeyCredential(admin_key)
-    search_client = SearchClient(endpoint=endpoint, index_name=index_name, credential=credential)
+def get_existing_ids(service_name, admin_key, index_name, candidate_ids):
+    """
+    Return the subset of candidate_ids that already exist in the index.
+    IDs seen before are answered from known_document_ids; the rest are looked
+    up with a search.in filter on the key field in batches, so the cost follows
+    the size of the upload rather than the size of the index.
+    """
+    cache_key = (service_name, index_name)
+    candidate_ids = set(candidate_ids)
+    with known_document_ids_lock:
+        existing = candidate_ids & known_document_ids.get(cache_key, set())
+    unknown = sorted(candidate_ids - existing)
+    if config.SEARCH_BACKEND == "local":
+        from local_search import get_local_index
+        existing.update(get_local_index().existing_ids(index_name, unknown))
+        unknown = []
+
+    search_client = get_search_client(index_name, service_name, admin_key) if unknown else None
+    batch_size = config.SEARCH_ID_LOOKUP_BATCH
+    for start in range(0, len(unknown), batch_size):
+        batch = unknown[start:start + batch_size]
+        id_filter = f"search.in(id, '{','.join(batch)}', ',')"
+        try:
+            results = search_client.search(search_text="*", filter=id_filter, select=["id"], top=len(batch))
+            existing.update(doc["id"] for doc in results)
+        except Exception as e:
+            print(f"Warning: Could not look up existing IDs for index '{index_name}':", e)
+
+    remember_document_ids(service_name, index_name, existing)
+    return existing
 
-    existing_ids = set()
-    try:
-        results = search_client.search(search_text="*", select=["id"], top=1000)
-        for doc in results:
-            existing_ids.add(doc["id"])
-    except Exception as e:
-        print(f"Warning: Could not fetch existing IDs for index '{index_name}':", e)
-    return existing_ids
+def remember_document_ids(service_name, index_name, ids):
+    with known_document_ids_lock:
+        known_document_ids.setdefault((service_name, index_name), set()).update(ids)
+
+def forget_document_ids(service_name, index_name, ids=None):
+    with known_document_ids_lock:
+        if ids is None:
+            known_document_ids.pop((service_name, index_name), None)
+        else:
+            known_document_ids.get((service_name, index_name), set()).difference_update(ids)
 
 def should_replace_index(index_name):
     answer = input(f"Do you want to replace the existing index '{index_name}'? [y/N]: ").strip().lower()
@@ -437,16 +715,93 @@ def upsert_documents(service_name, admin_key, index_name, documents):
     # if should_replace_index(index_name):
     #     create_or_replace_index(service_name, admin_key, index_name)
     # else:
+    index_name, documents = route_documents(index_name, documents)
     print(f"Appending to existing index '{index_name}'...")
-    existing_ids = get_existing_ids(service_name, admin_key, index_name)
+    existing_ids = get_existing_ids(service_name, admin_key, index_name, [doc["id"] for doc in documents])
     before = len(documents)
     documents = [doc for doc in documents if doc["id"] not in existing_ids]
     print(f"Filtered out {before - len(documents)} duplicate document(s).")
 
     if documents:
-        upload_documents(service_name, admin_key, index_name, documents)
-    else:
-        print(f"No new documents to upload to index '{index_name}'.")
+        return upload_documents(service_name, admin_key, index_name, documents)
+    print(f"No new documents to upload to index '{index_name}'.")
+    return upload_documents(service_name, admin_key, index_name, [])
+
+def copy_index_documents(source_index, target_index, page_size):
+    """
+    Page through source_index in id order (keyset paging, so there is no
+    $skip limit) and upload each page to target_index as it arrives.
+    """
+    search_client = get_search_client(source_index)
+    copied = 0
+    failed = 0
+    last_id = None
+    while True:
+        id_filter = None
+        if last_id is not None:
+            escaped = last_id.replace("'", "''")
+            id_filter = f"id gt '{escaped}'"
+        results = search_client.search(search_text="*", filter=id_filter, order_by=["id asc"], top=page_size)
+        page = [{key: value for key, value in doc.items() if not key.startswith("@")} for doc in results]
+        if not page:
+            break
+        page = [dict(doc, source_index=doc.get("source_index") or source_index) for doc in page]
+        summary = upload_documents(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, target_index, page)
+        copied += summary["succeeded"]
+        failed += summary["failed"]
+        last_id = page[-1]["id"]
+        if len(page) < page_size:
+            break
+    return copied, failed
+
+def migrate_to_consolidated_index():
+    """
+    Copy every per-source index into CONSOLIDATED_INDEX_NAME, several
+    indexes at a time, keeping document IDs so the ingest manifest still
+    applies. Vector fields are not retrievable, so copies are re-embedded,
+    mostly from the embedding cache.
+    """
+    ensure_consolidated_index()
+    sources = [index for index in get_indices(refresh=True) if index != config.CONSOLIDATED_INDEX_NAME]
+    if not sources:
+        print("No indexes to migrate.")
+        return True
+
+    print(f"Migrating {len(sources)} index(es) into '{config.CONSOLIDATED_INDEX_NAME}'...")
+    failed = 0
+    with ThreadPoolExecutor(max_workers=min(config.MIGRATION_WORKERS, len(sources)), thread_name_prefix="lumina-migrate") as executor:
+        futures = {index: executor.submit(copy_index_documents, index, config.CONSOLIDATED_INDEX_NAME, config.MIGRATION_PAGE_SIZE)
+                   for index in sources}
+        for index, future in futures.items():
+            try:
+                copied, index_failed = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error migrating index '{index}': {e}")
+                continue
+            failed += index_failed
+            print(f"Copied {copied} document(s) from '{index}'" + (f", {index_failed} failed" if index_failed else ""))
+    from local_search import save_local_index
+    save_local_index()
+    return failed == 0
+
+def handle_index_migration(user_text):
+    if user_text.strip().lower() == "migrate indexes":
+        if migrate_to_consolidated_index():
+            print(f"Migration complete. Set CONSOLIDATED_INDEX_ENABLED = True to query '{config.CONSOLIDATED_INDEX_NAME}' only.")
+        else:
+            print("Migration finished with errors; run it again to retry.")
+        return True
+    return False
+
+def get_source_facets():
+    """
+    Return document counts per doc_type, source_index and file_name in the
+    consolidated index.
+    """
+    search_client = get_search_client(config.CONSOLIDATED_INDEX_NAME)
+    results = search_client.search(search_text="*", facets=["doc_type", "source_index", "file_name,count:10"], top=0)
+    return results.get_facets() or {}
 
 def store_conversation(conversation_id, conversation_history):
     convo_lines = []
@@ -490,7 +845,7 @@ def store_conversation(conversation_id, conversation_history):
         documents.append(doc)
         doc_index += 1
 
-    content_chunks = split_text_with_overlap(convo_text, chunk_size=3000, overlap=300)
+    content_chunks = chunk_text(convo_text, config.CHUNK_MAX_TOKENS, config.CHUNK_OVERLAP_TOKENS)
     for idx, chunk in enumerate(content_chunks):
         doc = {
             "id": f"{conversation_id}-content-{idx}",
@@ -505,19 +860,22 @@ def store_conversation(conversation_id, conversation_history):
         doc_index += 1
 
     index_name = "manual-knowledge-1"
-    endpoint = f"https://{config.SEARCH_SERVICE_NAME}.search.windows.net"
-    credential = AzureKeyCredential(config.ADMIN_KEY)
-    search_client = SearchClient(endpoint=endpoint, index_name=index_name, credential=credential)
 
-    try:
-        search_client.get_index()
+    # The local backend has no index catalog; upsert_documents writes
+    # straight into the local index.
+    if config.SEARCH_BACKEND == "local" or config.CONSOLIDATED_INDEX_ENABLED or index_name in get_indices():
         print(f"Index {index_name} exists. Appending to it...")
-        upsert_documents(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, index_name, documents)
-    except Exception:
+        summary = upsert_documents(config.SEARCH_SERVICE_NAME, None, index_name, documents)
+    else:
         print(f"Index {index_name} does not exist. Creating a new index...")
         create_or_replace_index(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, index_name)
-        upload_documents(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, index_name, documents)
+        summary = upload_documents(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, index_name, documents)
 
+    from local_search import save_local_index
+    save_local_index()
+    if summary["failed"]:
+        print(f"{summary['failed']} document(s) could not be stored.")
+        return False
     print("Conversation stored to knowledge base.")
     return True
 
@@ -537,8 +895,11 @@ def handle_link_knowledge_upload(user_text):
             print(f"No valid URLs found in '{file_path}'. Please check its contents.")
             return True
 
+        if wants_background(user_text):
+            start_background_ingestion(f"{len(urls)} link(s) from {file_path}", add_link_contents_to_index, urls)
+            return True
         success = add_link_contents_to_index(urls)
-        print(f"{len(urls)} links have been stored!" if success else "Failed to store one or more URLs. Please try again.")
+        print(f"{len(urls)} links have been stored!" if success else "Failed to store one or more URLs. Type 'retry failed ingestion' to retry them.")
         return True
 
     if re.search(r'\b(upload|store|save|add|ingest)\b.*https?://', user_text, re.IGNORECASE):
@@ -549,75 +910,333 @@ def handle_link_knowledge_upload(user_text):
             print("No valid URLs found in the message. Please provide a valid URL.")
             return True
 
+        if wants_background(user_text):
+            start_background_ingestion(f"{len(urls)} link(s)", add_link_contents_to_index, urls)
+            return True
         success = add_link_contents_to_index(urls)
-        print("Knowledge has been stored!" if success else "Failed to store URL contents. Please try again.")
+        print("Knowledge has been stored!" if success else "Failed to store URL contents. Type 'retry failed ingestion' to retry.")
         return True
 
     return False
     
-def add_link_contents_to_index(urls):
+def build_link_documents(url, page_title, chunk, idx, chunk_hash, qa_pairs):
     qa_documents = []
-    content_documents = []
     doc_index = 0
 
-    try:
-        for url in urls:
-            html = scrape_authenticated_page(url)
-            if html:
-                page_title = extract_title(html)
-                main_content = extract_main_content(html)
-                
-                qa_pairs = generate_qa_pairs(main_content, url)
-                for qa in qa_pairs:
-                    if not isinstance(qa, dict):
-                        continue
-                    question = " ".join(qa.get("question", "").split())
-                    answer = " ".join(qa.get("answer", "").split())
-                    if not question or not answer:
-                        continue
-                    doc = {
-                        "id": generate_valid_id(url, doc_index),
-                        "doc_type": "qa",
-                        "page_title": page_title,
-                        "title": question,
-                        "content": f"Question: {question}\nAnswer: {answer}",
-                        "file_name": url,
-                        "upload_date": datetime.now(timezone.utc).isoformat(),
-                    }
-                    qa_documents.append(doc)
-                    doc_index += 1
-
-                content_chunks = split_text_with_overlap(main_content, chunk_size=3000, overlap=300)
-                for idx, chunk in enumerate(content_chunks):
-                    doc = {
-                        "id": generate_valid_id(url, f"content-{idx}"),
-                        "doc_type": "content",
-                        "page_title": page_title,
-                        "title": f"{page_title} - Content Part {idx+1}",
-                        "content": chunk,
-                        "file_name": url,
-                        "upload_date": datetime.now(timezone.utc).isoformat(),
-                    }
-                    content_documents.append(doc)
-                    doc_index += 1
-
-                if qa_documents:
-                    qa_index_name = generate_index_name("qa")
-                    upsert_documents(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, qa_index_name, qa_documents)
-
-                if content_documents:
-                    content_index_name = generate_index_name("content")
-                    upsert_documents(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, content_index_name, content_documents)
-    except Exception as e:
-        print(f"Error processing URL {url}: {e}")
+    for qa in qa_pairs:
+        if not isinstance(qa, dict):
+            continue
+        question = " ".join(qa.get("question", "").split())
+        answer = " ".join(qa.get("answer", "").split())
+        if not question or not answer:
+            continue
+        doc = {
+            "id": generate_valid_id(url, f"qa-{chunk_hash[:16]}-{doc_index}"),
+            "doc_type": "qa",
+            "page_title": page_title,
+            "title": question,
+            "content": f"Question: {question}\nAnswer: {answer}",
+            "file_name": url,
+            "upload_date": datetime.now(timezone.utc).isoformat(),
+        }
+        qa_documents.append(doc)
+        doc_index += 1
+
+    content_document = {
+        "id": generate_valid_id(url, f"content-{chunk_hash[:16]}"),
+        "doc_type": "content",
+        "page_title": page_title,
+        "title": f"{page_title} - Content Part {idx+1}",
+        "content": chunk,
+        "file_name": url,
+        "upload_date": datetime.now(timezone.utc).isoformat(),
+    }
+    return qa_documents, content_document
+
+def save_scraped_page(url, html):
+    os.makedirs(config.SAVE_SCRAPED_PAGES_DIR, exist_ok=True)
+    file_name = f"{generate_index_name(url)}.html"
+    with open(os.path.join(config.SAVE_SCRAPED_PAGES_DIR, file_name), "w", encoding="utf-8") as f:
+        f.write(html)
+
+def scrape_link_stage(url, _):
+    html = scrape_authenticated_page(url)
+    if not html:
+        raise RuntimeError("page returned no HTML")
+    if config.SAVE_SCRAPED_PAGES_DIR:
+        save_scraped_page(url, html)
+    return html
+
+def extract_link_stage(url, html):
+    return extract_page(html)
+
+def generate_link_qa_stage(url, extracted):
+    """
+    Generate Q&A only for chunks the manifest has not seen before, packing
+    them into as few requests as the Q&A budgets allow. Returns None when the
+    page is unchanged since it was last ingested.
+    """
+    page_title = extracted["title"]
+    sections = extracted["sections"]
+    manifest = get_ingest_manifest()
+    content_hash = hash_text(extracted["content"])
+    if manifest.is_unchanged(url, content_hash):
+        print(f"Skipping unchanged page {url}")
+        return None
+
+    qa_index_name = generate_index_name("qa")
+    content_index_name = generate_index_name("content")
+    plan = ChunkPlan(manifest.get(url))
+    chunks_record = {}
+    qa_documents = []
+    content_documents = []
+
+    new_chunks = {}
+    for idx, chunk in enumerate(chunk_sections(sections, config.CHUNK_MAX_TOKENS, config.CHUNK_OVERLAP_TOKENS)):
+        chunk_hash, is_new = plan.add(chunk)
+        if is_new:
+            new_chunks[chunk_hash] = (idx, chunk)
+
+    qa_by_chunk = generate_qa_batch({chunk_hash: chunk for chunk_hash, (_, chunk) in new_chunks.items()}, url)
+    pending = 0
+    for chunk_hash, (idx, chunk) in new_chunks.items():
+        qa_pairs = qa_by_chunk[chunk_hash]
+        chunk_qa_documents, content_document = build_link_documents(url, page_title, chunk, idx, chunk_hash, qa_pairs or [])
+        qa_documents.extend(chunk_qa_documents)
+        content_documents.append(content_document)
+        chunks_record[chunk_hash] = {
+            qa_index_name: [doc["id"] for doc in chunk_qa_documents],
+            content_index_name: [content_document["id"]]
+        }
+        if qa_pairs is None:
+            # Q&A generation failed; regenerate this chunk on the next run.
+            chunks_record[chunk_hash][PENDING] = True
+            pending += 1
+    chunks_record.update(plan.kept)
+    stale = plan.stale()
+    print(f"{url}: {plan.changed} of {plan.total} chunk(s) are new or changed.")
+    if pending:
+        print(f"Warning: Q&A generation failed for {pending} chunk(s) of {url}; they will be retried next time.")
+
+    return {
+        "content_hash": content_hash if not pending else None,
+        "chunks": chunks_record,
+        "qa_documents": qa_documents,
+        "content_documents": content_documents,
+        "stale": stale
+    }
+
+def upload_link_stage(url, plan):
+    if plan is None:
+        return 0, 0
+    qa_documents = plan["qa_documents"]
+    content_documents = plan["content_documents"]
+    failed = 0
+    if qa_documents:
+        failed += upsert_documents(config.SEARCH_SERVICE_NAME, None, generate_index_name("qa"), qa_documents)["failed"]
+    if content_documents:
+        failed += upsert_documents(config.SEARCH_SERVICE_NAME, None, generate_index_name("content"), content_documents)["failed"]
+    if failed:
+        raise RuntimeError(f"{failed} document(s) failed to upload")
+    for index_name, ids in plan["stale"].items():
+        delete_documents(config.SEARCH_SERVICE_NAME, None, index_name, ids)
+    get_ingest_manifest().update(url, plan["content_hash"], plan["chunks"])
+    return len(qa_documents), len(content_documents)
+
+def add_link_contents_to_index(urls):
+    """
+    Queue URLs in the ingestion job queue and run them through the pipeline.
+    Returns True only if every URL made it through all stages.
+    """
+    urls = list(dict.fromkeys(urls))
+    get_job_queue().enqueue("url", urls)
+    return run_link_jobs(urls)
+
+def run_link_jobs(urls):
+    """
+    Run queued URLs through the scrape -> extract -> Q&A -> upload pipeline.
+    Each URL's Q&A output is checkpointed in the job queue, so a URL that
+    failed or was interrupted during upload resumes without regenerating Q&A.
+    """
+    if not urls:
+        return True
+    if not ingestion_lock.acquire(blocking=False):
+        print("Another ingestion is already running; type 'ingestion status' to check on it.")
         return False
-    
+    stages = [
+        Stage("scrape", scrape_link_stage, config.INGEST_SCRAPE_WORKERS),
+        Stage("extract", extract_link_stage, config.INGEST_EXTRACT_WORKERS),
+        Stage("qa", generate_link_qa_stage, config.INGEST_QA_WORKERS),
+        Stage("upload", upload_link_stage, config.INGEST_UPLOAD_WORKERS),
+    ]
+    journal = JobJournal(get_job_queue(), "url", checkpoint_stages={"qa"})
+    try:
+        summary = run_pipeline(urls, stages, label="URL", journal=journal)
+    finally:
+        close_browser_pool()
+        from local_search import save_local_index
+        save_local_index()
+        ingestion_lock.release()
+    print_pipeline_summary(summary, label="URL")
+    print_qa_metrics()
+
+    qa_count = sum(qa for qa, _ in summary["results"].values())
+    content_count = sum(content for _, content in summary["results"].values())
+    print(f"Generated {qa_count} Q&A document(s) and {content_count} content chunk(s).")
+    return summary["failed"] == 0
+
 def handle_storage_command(conversation_id, user_text):
     if re.search(r'store\s+.*(knowledge base|index)', user_text, re.IGNORECASE):
         success = store_conversation(conversation_id, user_text)
         return "Knowledge has been stored!" if success else "Failed to store conversation. Please try again."
     return
 
+def enhance_transcript_chunk(file_name, idx, chunk, usage):
+    print(f"Enhancing chunk {idx+1} for {file_name} (length: {len(chunk)})...")
+    return enhance_text_via_ai(chunk, f"{file_name}-chunk{idx}", usage=usage)
+
+def iter_transcript_lines(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for raw_line in f:
+            line = clean_transcript_text(raw_line)
+            if line:
+                yield line
+
+def process_transcript_file(path, file_name, manifest, transcript_index_name, chunk_executor):
+    """
+    Stream one transcript through the chunker, enhancing new or changed
+    chunks concurrently on the shared chunk executor with a bounded number in
+    flight, and upload the enhanced documents in chunk order as batches fill.
+    Returns a per-file report with wall time and token usage.
+    """
+    start = time.perf_counter()
+    usage = {}
+    report = {"file_name": file_name, "chunks": 0, "enhanced": 0, "skipped": False, "usage": usage}
+
+    file_path = os.path.join(path, file_name)
+    stat = os.stat(file_path)
+    validators = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if manifest.is_unchanged(file_name, validators=validators):
+        print(f"Skipping unchanged transcript '{file_name}'.")
+        report["skipped"] = True
+        return report
+
+    content_hash = hash_stream(iter_transcript_lines(file_path))
+    previous = manifest.get(file_name)
+    if manifest.is_unchanged(file_name, content_hash):
+        manifest.update(file_name, content_hash, previous["chunks"], validators)
+        print(f"Skipping unchanged transcript '{file_name}'.")
+        report["skipped"] = True
+        return report
+
+    plan = ChunkPlan(previous)
+    chunks_record = {}
+    in_flight = deque()
+    transcript_documents = []
+
+    def collect(idx, chunk_hash, future):
+        improved_chunk = future.result()
+        if not improved_chunk:
+            print(f"Warning: Chunk {idx+1} for {file_name} returned empty result.")
+            return
+        doc = {
+            "id": generate_valid_id(file_name, chunk_hash[:16]),
+            "doc_type": "transcript_chunk",
+            "page_title": file_name,
+            "title": f"{file_name} - Part {idx+1}",
+            "content": improved_chunk,
+            "file_name": file_name,
+            "upload_date": datetime.now(timezone.utc).isoformat(),
+        }
+        transcript_documents.append(doc)
+        chunks_record[chunk_hash] = {transcript_index_name: [doc["id"]]}
+        report["enhanced"] += 1
+
+    def flush():
+        if not transcript_documents:
+            return
+        summary = upsert_documents(config.SEARCH_SERVICE_NAME, None, transcript_index_name, transcript_documents)
+        if summary["failed"]:
+            raise RuntimeError(f"{summary['failed']} transcript document(s) failed to upload; it will be retried next time")
+        print(f"Uploaded {len(transcript_documents)} transcript document(s) to index '{transcript_index_name}'.")
+        transcript_documents.clear()
+
+    chunks = chunk_text(iter_transcript_lines(file_path), config.CHUNK_MAX_TOKENS, config.CHUNK_OVERLAP_TOKENS, split_lines=True)
+    for idx, chunk in enumerate(chunks):
+        chunk_hash, is_new = plan.add(chunk)
+        if not is_new:
+            continue
+        in_flight.append((idx, chunk_hash, chunk_executor.submit(enhance_transcript_chunk, file_name, idx, chunk, usage)))
+        if len(in_flight) > config.TRANSCRIPT_ENHANCE_WORKERS * 2:
+            collect(*in_flight.popleft())
+        if len(transcript_documents) >= config.UPLOAD_BATCH_SIZE:
+            flush()
+    while in_flight:
+        collect(*in_flight.popleft())
+    flush()
+
+    report["chunks"] = plan.total
+    print(f"Transcript '{file_name}' produced {plan.total} chunk(s); {plan.changed} new or changed.")
+    chunks_record.update(plan.kept)
+    for index_name, ids in plan.stale().items():
+        delete_documents(config.SEARCH_SERVICE_NAME, None, index_name, ids)
+    if report["enhanced"] < plan.changed:
+        # Chunks that came back empty are not recorded; without a content hash
+        # the file is not skipped next time, so they are retried.
+        manifest.update(file_name, None, chunks_record)
+    else:
+        manifest.update(file_name, content_hash, chunks_record, validators)
+
+    report["elapsed"] = time.perf_counter() - start
+    return report
+
+def run_transcript_jobs(file_paths):
+    """
+    Process queued transcript files, several at a time, recording each
+    file's outcome in the job queue. Returns True if every file succeeded.
+    """
+    if not file_paths:
+        return True
+    if not ingestion_lock.acquire(blocking=False):
+        print("Another ingestion is already running; type 'ingestion status' to check on it.")
+        return False
+
+    queue = get_job_queue()
+    manifest = get_ingest_manifest()
+    transcript_index_name = generate_index_name("meeting-transcripts")
+
+    def process(file_path):
+        queue.mark_running("transcript", file_path)
+        path, file_name = os.path.split(file_path)
+        return process_transcript_file(path, file_name, manifest, transcript_index_name, chunk_executor)
+
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=config.TRANSCRIPT_ENHANCE_WORKERS, thread_name_prefix="lumina-enhance") as chunk_executor, \
+                ThreadPoolExecutor(max_workers=config.TRANSCRIPT_FILE_WORKERS, thread_name_prefix="lumina-transcript") as file_executor:
+            futures = {file_path: file_executor.submit(process, file_path) for file_path in file_paths}
+            for file_path, future in futures.items():
+                try:
+                    report = future.result()
+                except Exception as e:
+                    failed += 1
+                    queue.mark_failed("transcript", file_path, e)
+                    print(f"Error processing transcript '{file_path}': {e}")
+                    continue
+                queue.mark_done("transcript", file_path)
+                if not report["skipped"]:
+                    print(f"'{report['file_name']}': enhanced {report['enhanced']} of {report['chunks']} chunk(s) in {report['elapsed']:.1f}s "
+                          f"using {report['usage'].get('total_tokens', 0)} tokens.")
+    finally:
+        from local_search import save_local_index
+        save_local_index()
+        ingestion_lock.release()
+
+    if failed:
+        print(f"{failed} transcript(s) could not be processed.")
+        return False
+    return True
+
 def handle_meeting_transcripts(user_text, path="MeetingTranscripts"):
     if user_text.lower() == "upload meeting transcript":
         try:
@@ -628,39 +1247,10 @@ def handle_meeting_transcripts(user_text, path="MeetingTranscripts"):
             if not transcript_files:
                 return "No transcript files (.txt or .vtt) found."
 
-            for file_name in transcript_files:
-                file_path = os.path.join(path, file_name)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    raw_transcript = f.read()
-
-                cleaned_text = clean_transcript_text(raw_transcript)
-                chunks = split_text_with_overlap(cleaned_text, chunk_size=3000, overlap=300)
-                print(f"Transcript '{file_name}' split into {len(chunks)} chunk(s) with overlap.")
-
-                transcript_documents = []
-                for idx, chunk in enumerate(chunks):
-                    print(f"Enhancing chunk {idx+1}/{len(chunks)} for {file_name} (length: {len(chunk)})...")
-                    improved_chunk = enhance_text_via_ai(chunk, f"{file_name}-chunk{idx}")
-                    if not improved_chunk:
-                        print(f"Warning: Chunk {idx+1} for {file_name} returned empty result.")
-                        continue
-
-                    doc = {
-                        "id": generate_valid_id(file_name, f"{idx}"),
-                        "doc_type": "transcript_chunk",
-                        "page_title": file_name,
-                        "title": f"{file_name} - Part {idx+1}",
-                        "content": improved_chunk,
-                        "file_name": file_name,
-                        "upload_date": datetime.now(timezone.utc).isoformat(),
-                    }
-                    transcript_documents.append(doc)
-
-                if transcript_documents:
-                    transcript_index_name = generate_index_name("meeting-transcripts")
-                    upsert_documents(config.SEARCH_SERVICE_NAME, config.ADMIN_KEY, transcript_index_name, transcript_documents)
-                    print(f"Uploaded {len(transcript_documents)} transcript document(s) to index '{transcript_index_name}'.")
-
+            file_paths = [os.path.join(path, file_name) for file_name in transcript_files]
+            get_job_queue().enqueue("transcript", file_paths)
+            if not run_transcript_jobs(file_paths):
+                return False
             print("All valid meeting transcripts have been processed and stored.")
             return True
 
@@ -670,77 +1260,65 @@ def handle_meeting_transcripts(user_text, path="MeetingTranscripts"):
         
     return False
 
-def upload_feedback_to_container(history=None, written=None, feedbackType=None):
-    try:
-        blob_service_client = BlobServiceClient.from_connection_string(config.AZURE_STORAGE_CONNECTION_STRING)
-        container_name = config.AZURE_STORAGE_CONTAINER_NAME
-        container_client = blob_service_client.get_container_client(container_name)
-
-        if not container_client.exists():
-            container_client.create_container()
-
-        timestamp = datetime.now(timezone.utc).isoformat()
-
-        if written:
-            feedback_data = {
-                "timestamp": timestamp,
-                "type": "written",
-                "feedback": written,
-                "history": history
-            }
-
-            blob_name = f"feedback/written-{timestamp}.json"
-            blob_client = container_client.get_blob_client(blob_name)
-            blob_client.upload_blob(json.dumps(feedback_data, indent=2), overwrite=True)
-            print(f"Written feedback saved to {blob_name}")
-            return
-
-        elif feedbackType in ("positive", "negative"):
-            stats_blob_name = "feedback-reaction-stats.json"
-            stats_blob_client = container_client.get_blob_client(stats_blob_name)
-
-            try:
-                existing_data = stats_blob_client.download_blob().readall()
-                stats = json.loads(existing_data)
-                etag = stats_blob_client.get_blob_properties().etag
-            except ResourceNotFoundError:
-                stats = {"thumbs_up": 0, "thumbs_down": 0}
-                etag = None
+def wants_background(user_text):
+    return re.search(r'\bin (the )?background\b', user_text, re.IGNORECASE) is not None
 
-            max_retries = 3
-            retry_delay = 0.3
-
-            for attempt in range(max_retries):
-                if feedbackType == "positive":
-                    stats["thumbs_up"] += 1
-                elif feedbackType == "negative":
-                    stats["thumbs_down"] += 1
-
-                stats["last_updated"] = timestamp
-                new_data = json.dumps(stats, indent=2)
-
-                try:
-                    if etag:
-                        stats_blob_client.upload_blob(new_data, overwrite=True, if_match=etag)
-                    else:
-                        stats_blob_client.upload_blob(new_data, overwrite=True)
-                    print(f"Updated feedback stats in {stats_blob_name}")
-                    return
-                except ResourceModifiedError:
-                    if attempt < max_retries - 1:
-                        print(f"ETag conflict detected. Retrying... ({attempt+1}/{max_retries})")
-                        time.sleep(retry_delay)
-                        existing_data = stats_blob_client.download_blob().readall()
-                        stats = json.loads(existing_data)
-                        etag = stats_blob_client.get_blob_properties().etag
-                    else:
-                        print("Feedback update failed due to concurrent modification.")
-                        return
+def start_background_ingestion(description, func, *args):
+    thread = background_ingestion["thread"]
+    if thread is not None and thread.is_alive():
+        print(f"Already ingesting {background_ingestion['description']} in the background; type 'ingestion status' to check on it.")
+        return False
+    thread = threading.Thread(target=func, args=args, name="lumina-background-ingest", daemon=True)
+    background_ingestion.update(thread=thread, description=description)
+    thread.start()
+    print(f"Ingesting {description} in the background. Type 'ingestion status' to check on it; "
+          "if Lumina exits first, type 'resume ingestion' next time.")
+    return True
 
+def resume_ingestion():
+    queue = get_job_queue()
+    urls = queue.unfinished("url")
+    file_paths = [file_path for file_path in queue.unfinished("transcript") if os.path.exists(file_path)]
+    if not urls and not file_paths:
+        print("No unfinished ingestion jobs.")
+        return True
+    print(f"Resuming {len(urls)} URL(s) and {len(file_paths)} transcript(s)...")
+    links_ok = run_link_jobs(urls)
+    transcripts_ok = run_transcript_jobs(file_paths)
+    return links_ok and transcripts_ok
+
+def print_ingestion_status():
+    queue = get_job_queue()
+    counts = queue.counts()
+    if not counts:
+        print("\nNo ingestion jobs recorded yet.")
+        return
+    print("\nIngestion jobs:")
+    for kind, statuses in counts.items():
+        print(f"  {kind}: " + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())))
+    thread = background_ingestion["thread"]
+    if thread is not None and thread.is_alive():
+        print(f"  Running in the background: {background_ingestion['description']}")
+    failures = queue.failures()
+    if failures:
+        print("Recent failures:")
+        for kind, item, stage, attempts, error in failures:
+            print(f"  [{kind}] {item} (after {stage or 'no'} stage, {attempts} attempt(s)): {error}")
+
+def handle_ingestion_command(user_text):
+    command = user_text.strip().lower()
+    if command == "ingestion status":
+        print_ingestion_status()
+        return True
+    if command in ("resume ingestion", "resume ingestion in background", "resume ingestion in the background"):
+        if wants_background(command):
+            start_background_ingestion("unfinished jobs", resume_ingestion)
         else:
-            print("No valid feedback provided. Either 'written' or 'feedbackType' is required.")
-            return
-
-    except Exception as e:
-        print(f"Error uploading feedback: {e}")
-        return False
\ No newline at end of file
+            resume_ingestion()
+        return True
+    if command == "retry failed ingestion":
+        count = get_job_queue().retry_failed()
+        print(f"Retrying {count} failed job(s)...")
+        resume_ingestion()
+        return True
+    return False
@@ -1,16 +1,45 @@
 # app.py
 
+import time
 import traceback
-from console_utils import print_intro, print_shortcuts, handle_feedback, handle_knowledge_storage, conversation_history
-from ai_utils import handle_meeting_transcripts, query_search_indices, generate_response, handle_link_knowledge_upload
+from config import Config
+from console_utils import print_intro, print_shortcuts, print_turn_stats, handle_feedback, handle_knowledge_storage, handle_search_filter, console_session, conversation_history, conversation_memory, conversation_id, turn_engine
+from ai_utils import handle_meeting_transcripts, generate_response, generate_response_stream, handle_link_knowledge_upload, handle_index_migration, handle_ingestion_command
+from ingest_jobs import get_job_queue
+from response_cache import get_response_cache
+from feedback_writer import get_feedback_writer
+
+config = Config()
+
+def stream_reply(user_text, search_results, history, turn_start):
+    print("\n\nLumina: ", end="", flush=True)
+    parts = []
+    first_token_at = None
+    for token in generate_response_stream(user_text, search_results, history):
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        print(token, end="", flush=True)
+        parts.append(token)
+    print()
+
+    assistant_reply = "".join(parts)
+    if not assistant_reply:
+        assistant_reply = "No response."
+        print(assistant_reply)
+    return assistant_reply, (first_token_at - turn_start if first_token_at is not None else None)
 
 def handle_user_input():
     print_intro()
 
     print(f"\n\nLumina: Hi how can I help you today? (Type 'exit' to quit, or help for shortcuts)")
+    interrupted = sum(len(get_job_queue().unfinished(kind)) for kind in ("url", "transcript"))
+    if interrupted:
+        print(f"\n{interrupted} ingestion job(s) did not finish last time. Type 'resume ingestion' to continue them.")
 
     while True:
         try:
+            if config.TURN_PIPELINE_ENABLED:
+                turn_engine.prefetch()
             user_text = input("\nYou: ").strip()
             if user_text.lower() in ["exit", "quit"]:
                 print("\nGoodbye!")
@@ -20,6 +49,23 @@ def handle_user_input():
                 print_shortcuts()
                 continue
 
+            if user_text.lower() == "cache stats":
+                cache = get_response_cache()
+                print(f"\nResponse cache: {cache.stats}" if cache else "\nResponse cache is disabled.")
+                continue
+
+            if user_text.lower() == "turn stats":
+                print_turn_stats()
+                continue
+
+            if user_text.lower() == "feedback stats":
+                try:
+                    stats = get_feedback_writer().reaction_stats()
+                    print(f"\nFeedback: {stats['thumbs_up']} 👍, {stats['thumbs_down']} 👎 across {stats['shards']} counter shard(s)")
+                except Exception as e:
+                    print(f"\nCould not read feedback stats: {e}")
+                continue
+
             if user_text.lower() == "feedback":
                 #if conversation_history is null then we cant do feedback since user didnt ask anything yet
                 if not conversation_history:
@@ -29,6 +75,15 @@ def handle_user_input():
                     if not handle_feedback():
                         continue
 
+            if handle_search_filter(user_text):
+                continue
+
+            if handle_index_migration(user_text):
+                continue
+
+            if handle_ingestion_command(user_text):
+                continue
+
             if handle_meeting_transcripts(user_text=user_text):
                 continue
 
@@ -38,12 +93,38 @@ def handle_user_input():
             if handle_knowledge_storage(user_text):
                 continue
 
-            search_results = query_search_indices(user_text)
-            assistant_reply = generate_response(user_text, search_results, conversation_history)
-
-            conversation_history.append((user_text, assistant_reply))
+            turn_start = time.perf_counter()
+            search_results, turn, retrieval_time = console_session.retrieve(user_text)
+            assistant_reply = console_session.cached_reply(user_text, search_results)
+            cached = assistant_reply is not None
+            history = []
+            if cached:
+                print(f"\n\nLumina: {assistant_reply}")
+                time_to_first_token = time.perf_counter() - turn_start
+            elif config.STREAM_RESPONSES:
+                history = conversation_memory.history_for_prompt()
+                assistant_reply, time_to_first_token = stream_reply(user_text, search_results, history, turn_start)
+            else:
+                history = conversation_memory.history_for_prompt()
+                assistant_reply = generate_response(user_text, search_results, history)
+                time_to_first_token = time.perf_counter() - turn_start
+                print(f"\n\nLumina: {assistant_reply}")
 
-            print(f"\n\nLumina: {assistant_reply}")
+            timing = {
+                "time_to_first_token": time_to_first_token,
+                "total_time": time.perf_counter() - turn_start,
+                "cached": cached,
+                "turn": turn,
+                "retrieval_time": retrieval_time,
+                "history_tokens": conversation_memory.metrics["history_tokens"][-1] if history else 0
+            }
+            console_session.record_turn(user_text, assistant_reply, search_results, timing, cached)
+            if config.TELEMETRY_UPLOADS:
+                get_feedback_writer().record("telemetry", conversation_id, timing)
+            if config.LOG_TURN_TIMINGS:
+                ttft = f"{timing['time_to_first_token'] * 1000:.0f} ms" if timing["time_to_first_token"] is not None else "-"
+                print(f"(first token {ttft}, total {timing['total_time'] * 1000:.0f} ms, {turn} retrieval in {retrieval_time * 1000:.0f} ms, "
+                      f"{timing['history_tokens']} history tokens{', cached' if cached else ''})")
             
         except Exception as e:
             print(f"\nAn error occurred while processing your message: {e}")
@@ -0,0 +1,73 @@
+# benchmark_extraction.py
+#
+# Measures HTML extraction throughput and peak memory on saved pages:
+#
+#   python benchmark_extraction.py SavedPages --repeat 3 --check
+#
+# Save a corpus by setting SAVE_SCRAPED_PAGES_DIR in config.py and running an
+# ingestion. Peak memory comes from tracemalloc, which sees Python allocations
+# only (not selectolax/lxml native trees).
+
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from html_extract import available_parsers, extract_page
+
+def legacy_extract(html):
+    # extract_title, extract_main_content and extract_sections_from_article
+    # each parsed the page with html.parser.
+    BeautifulSoup(html, "html.parser").decompose()
+    BeautifulSoup(html, "html.parser").decompose()
+    return extract_page(html, "html.parser")
+
+def run(name, extract, pages, repeat):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            extract(html)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(pages) * repeat
+    print(f"{name:<24} {count / elapsed:8.1f} pages/s  {elapsed / count * 1000:7.1f} ms/page  peak {peak / 1024 / 1024:6.1f} MiB")
+
+def check(pages, parsers):
+    for parser in parsers:
+        mismatched = [path for path, html in pages.items() if extract_page(html, parser) != extract_page(html, "html.parser")]
+        print(f"{parser}: {len(mismatched)} of {len(pages)} page(s) differ from html.parser")
+        for path in mismatched[:5]:
+            print(f"  {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML extraction backends on saved pages.")
+    parser.add_argument("directory", nargs="?", default="SavedPages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="compare each backend's output with html.parser")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.directory, "*.html")))
+    if not paths:
+        print(f"No .html files found in '{args.directory}'.")
+        return
+    pages = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            pages[path] = f.read()
+    total_bytes = sum(len(html) for html in pages.values())
+    print(f"{len(pages)} page(s), {total_bytes / 1024 / 1024:.1f} MiB, {args.repeat} pass(es)\n")
+
+    html_pages = list(pages.values())
+    run("legacy (3x html.parser)", legacy_extract, html_pages, args.repeat)
+    for name in reversed(available_parsers()):
+        run(name, lambda html, name=name: extract_page(html, name), html_pages, args.repeat)
+
+    if args.check:
+        print()
+        check(pages, [name for name in available_parsers() if name != "html.parser"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+# benchmark_fakes.py
+#
+# Local stand-ins for Azure AI Search, Azure OpenAI (chat completions and
+# embeddings) and Blob Storage, served over HTTP so the real clients and
+# SDKs can be benchmarked without touching Azure. benchmark_load.py runs
+# them in a child process (see serve); each fake answers just the calls
+# Lumina makes.
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+WORDS = ("app service deploy slot scale plan linux windows container restart kudu log stream diagnostics "
+         "certificate domain ssl network vnet outbound inbound storage mount cache redis function trigger "
+         "timeout memory cpu worker instance region failover backup restore quota throttle kusto query").split()
+
+INDEX_FIELDS = [
+    {"name": "id", "type": "Edm.String", "key": True, "searchable": True, "filterable": True},
+    {"name": "doc_type", "type": "Edm.String", "searchable": True, "filterable": True, "facetable": True},
+    {"name": "source_index", "type": "Edm.String", "filterable": True, "facetable": True},
+    {"name": "page_title", "type": "Edm.String", "searchable": True},
+    {"name": "title", "type": "Edm.String", "searchable": True},
+    {"name": "content", "type": "Edm.String", "searchable": True},
+    {"name": "file_name", "type": "Edm.String", "searchable": True, "filterable": True},
+    {"name": "upload_date", "type": "Edm.DateTimeOffset", "filterable": True, "sortable": True}
+]
+
+def sample_text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def sample_page(rng, sections=6, words=120):
+    parts = [f"<html><head><title>Page {rng.randrange(10**6)}</title></head><body><nav>menu</nav><article id=\"_content\">"]
+    for i in range(sections):
+        parts.append(f"<h2>Section {i + 1} {rng.choice(WORDS)}</h2><p>{sample_text(rng, words)}.</p><p>{sample_text(rng, words // 2)}.</p>")
+    parts.append("</article><footer>footer</footer></body></html>")
+    return "".join(parts)
+
+def sample_transcript(rng, lines=200):
+    cues = ["WEBVTT", ""]
+    for i in range(lines):
+        cues.append(f"00:{i // 60:02d}:{i % 60:02d}.000 --> 00:{i // 60:02d}:{i % 60:02d}.900")
+        cues.append(f"<v Speaker {i % 4}>{sample_text(rng, 18)}.</v>")
+        cues.append("")
+    return "\n".join(cues)
+
+def blob_connection_string(url):
+    # The well-known Azurite development key; the fake never checks it.
+    key = "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="
+    return f"DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey={key};BlobEndpoint={url}/blob/devstoreaccount1;"
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing pooled connections mid-read are expected under load.
+        pass
+
+class FakeServices:
+    """
+    One threaded HTTP server answering:
+      /search/...   index CRUD, docs/search.post.search and docs/search.index
+      /openai/...   chat/completions (JSON or SSE) and embeddings
+      /blob/...     container create/list and block/append blob put/get/delete,
+                    honouring If-Match / If-None-Match so ETag races show up
+                    as 412 / 409 (counted as blob.conflicts)
+      /pages/<name> a generated HTML page, the same for the same name
+      /stats        request counts by kind
+    Latencies are in seconds; rate_limit_ratio is the share of chat and
+    embedding calls answered with 429 and a Retry-After of retry_after.
+    """
+
+    def __init__(self, search_latency=0.05, chat_latency=0.5, token_latency=0.01, embedding_latency=0.05,
+                 blob_latency=0.02, rate_limit_ratio=0.0, retry_after=1, seed=0):
+        self.search_latency = search_latency
+        self.chat_latency = chat_latency
+        self.token_latency = token_latency
+        self.embedding_latency = embedding_latency
+        self.blob_latency = blob_latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.indexes = {}
+        self.blobs = {}
+        self.etags = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        services = self
+
+        class Handler(FakeHandler):
+            fakes = services
+
+        self.server = QuietServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-services", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def count(self, kind):
+        with self.lock:
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+
+    def add_index(self, name, documents=0, words=120):
+        with self.lock:
+            index = self.indexes.setdefault(name, {"definition": {"name": name, "fields": INDEX_FIELDS}, "docs": {}})
+            for i in range(documents):
+                doc_id = f"{name}-{i}"
+                index["docs"][doc_id] = {"id": doc_id, "doc_type": self.rng.choice(["qa", "content"]),
+                                         "title": f"{name} document {i}", "content": sample_text(self.rng, words),
+                                         "file_name": f"{name}-{i % 10}.txt", "upload_date": "2025-01-01T00:00:00Z"}
+
+class FakeHandler(BaseHTTPRequestHandler):
+    fakes = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._route()
+
+    def do_HEAD(self):
+        self._route()
+
+    def do_POST(self):
+        self._route()
+
+    def do_PUT(self):
+        self._route()
+
+    def do_DELETE(self):
+        self._route()
+
+    def _route(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        path = urllib.parse.unquote(parsed.path)
+        query = urllib.parse.parse_qs(parsed.query)
+        body = self._body()
+        try:
+            if path.startswith("/search/"):
+                self._search(path[len("/search"):], body)
+            elif path.startswith("/openai/"):
+                self._openai(path, body)
+            elif path.startswith("/blob/"):
+                self._blob(path[len("/blob/"):], query, body)
+            elif path.startswith("/pages/"):
+                self.fakes.count("page")
+                self._send(200, sample_page(random.Random(path)), "text/html")
+            elif path == "/stats":
+                with self.fakes.lock:
+                    self._send(200, dict(self.fakes.stats))
+            else:
+                self._send(404, {"error": {"message": f"no fake for {path}"}})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    # Azure AI Search
+
+    def _search(self, path, body):
+        fakes = self.fakes
+        match = re.match(r"^/indexes(?:\('([^']+)'\)|/([^/?]+))?(/docs/search\.(post\.search|index))?$", path)
+        if not match:
+            return self._send(404, {"error": {"message": path}})
+        name = match.group(1) or match.group(2)
+        operation = match.group(4)
+        if name is None:
+            fakes.count("search.list_indexes")
+            time.sleep(fakes.search_latency)
+            with fakes.lock:
+                definitions = [index["definition"] for index in fakes.indexes.values()]
+            return self._send(200, {"value": definitions})
+        if operation is None:
+            return self._index(name, body)
+        with fakes.lock:
+            index = fakes.indexes.get(name)
+        if index is None:
+            return self._send(404, {"error": {"code": "ResourceNotFound", "message": f"index {name} not found"}})
+        request = json.loads(body or b"{}")
+        time.sleep(fakes.search_latency)
+        if operation == "index":
+            fakes.count("search.index")
+            return self._send(200, {"value": self._apply_actions(index, request.get("value", []))})
+        fakes.count("search.query")
+        return self._send(200, {"value": self._query(index, request)})
+
+    def _index(self, name, body):
+        fakes = self.fakes
+        fakes.count(f"search.{self.command.lower()}_index")
+        with fakes.lock:
+            if self.command == "DELETE":
+                existed = fakes.indexes.pop(name, None) is not None
+                return self._send(204 if existed else 404)
+            if self.command == "PUT":
+                definition = json.loads(body)
+                index = fakes.indexes.setdefault(name, {"docs": {}})
+                created = "definition" not in index
+                index["definition"] = definition
+                return self._send(201 if created else 200, definition)
+            index = fakes.indexes.get(name)
+        if index is None:
+            return self._send(404, {"error": {"code": "ResourceNotFound", "message": f"index {name} not found"}})
+        return self._send(200, index["definition"])
+
+    def _apply_actions(self, index, actions):
+        results = []
+        with self.fakes.lock:
+            for action in actions:
+                kind = action.pop("@search.action", "upload")
+                doc_id = action.get("id")
+                if kind == "delete":
+                    index["docs"].pop(doc_id, None)
+                elif kind in ("merge", "mergeOrUpload") and doc_id in index["docs"]:
+                    index["docs"][doc_id].update(action)
+                else:
+                    index["docs"][doc_id] = action
+                results.append({"key": doc_id, "status": True, "errorMessage": None, "statusCode": 200})
+        return results
+
+    def _query(self, index, request):
+        top = request.get("top") or 50
+        id_filter = re.search(r"search\.in\(id, '([^']*)'", request.get("filter") or "")
+        with self.fakes.lock:
+            docs = list(index["docs"].values())
+        if id_filter:
+            wanted = set(id_filter.group(1).split(","))
+            return [{"@search.score": 1.0, "id": doc["id"]} for doc in docs if doc["id"] in wanted][:top]
+        terms = set(re.findall(r"\w+", (request.get("search") or "").lower()))
+        scored = []
+        for doc in docs:
+            words = re.findall(r"\w+", f"{doc.get('title', '')} {doc.get('content', '')}".lower())
+            score = sum(1 for word in words if word in terms)
+            if score or not terms:
+                scored.append((score, doc))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        vector_field = next((field["name"] for field in index["definition"].get("fields", []) if field.get("dimensions")), None)
+        return [dict({key: value for key, value in doc.items() if key != vector_field}, **{"@search.score": float(score)})
+                for score, doc in scored[:top]]
+
+    # Azure OpenAI
+
+    def _openai(self, path, body):
+        fakes = self.fakes
+        request = json.loads(body or b"{}")
+        kind = "embeddings" if path.endswith("/embeddings") else "chat"
+        if fakes.rate_limit_ratio and fakes.rng.random() < fakes.rate_limit_ratio:
+            fakes.count(f"{kind}.429")
+            return self._send(429, {"error": {"code": "429", "message": "Rate limit is exceeded."}},
+                              headers={"Retry-After": str(fakes.retry_after)})
+        fakes.count(kind)
+        if kind == "embeddings":
+            time.sleep(fakes.embedding_latency)
+            return self._send(200, self._embeddings(request))
+        content = self._completion(request)
+        usage = {"prompt_tokens": len(json.dumps(request.get("messages", []))) // 4,
+                 "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        time.sleep(fakes.chat_latency)
+        if request.get("stream"):
+            return self._stream(content, usage)
+        return self._send(200, {"choices": [{"index": 0, "finish_reason": "stop",
+                                             "message": {"role": "assistant", "content": content}}], "usage": usage})
+
+    def _embeddings(self, request):
+        texts = request.get("input") or []
+        texts = [texts] if isinstance(texts, str) else texts
+        dimensions = request.get("dimensions") or 1536
+        data = []
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(str(text).encode("utf-8"), digest_size=8).digest(), "big")
+            rng = random.Random(seed)
+            data.append({"index": i, "embedding": [rng.uniform(-1, 1) for _ in range(dimensions)]})
+        return {"data": data, "usage": {"prompt_tokens": sum(len(str(text)) // 4 for text in texts)}}
+
+    def _completion(self, request):
+        if (request.get("response_format") or {}).get("type") in ("json_object", "json_schema"):
+            prompt = request["messages"][-1]["content"]
+            segments = re.findall(r"### (S\d+) \(about (\d+) pairs\)", prompt)
+            pairs = [{"segment": label, "question": f"What does {label} say about {word}?", "answer": sample_text(self.fakes.rng, 25)}
+                     for label, target in segments for word in self.fakes.rng.sample(WORDS, min(int(target), 5))]
+            return json.dumps({"pairs": pairs})
+        return sample_text(self.fakes.rng, 120) + "."
+
+    def _stream(self, content, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(data):
+            payload = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        words = content.split(" ")
+        for i in range(0, len(words), 4):
+            piece = " ".join(words[i:i + 4]) + " "
+            chunk(json.dumps({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}))
+            time.sleep(self.fakes.token_latency)
+        chunk(json.dumps({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}))
+        chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    # Blob Storage
+
+    def _blob_error(self, status, code, message, headers):
+        xml = (f"<?xml version=\"1.0\" encoding=\"utf-8\"?><Error><Code>{code}</Code>"
+               f"<Message>{escape(message)}\nRequestId:{headers['x-ms-request-id']}</Message></Error>")
+        return self._send(status, xml, "application/xml", dict(headers, **{"x-ms-error-code": code}))
+
+    def _blob_precondition(self, key, headers):
+        """
+        Apply If-Match / If-None-Match: * to a blob write or delete the way
+        Blob Storage does; returns True after sending the error response.
+        """
+        fakes = self.fakes
+        if_match = self.headers.get("If-Match")
+        if if_match is not None and (key not in fakes.blobs or if_match not in ("*", fakes.etags.get(key))):
+            fakes.stats["blob.conflicts"] = fakes.stats.get("blob.conflicts", 0) + 1
+            self._blob_error(412, "ConditionNotMet", "The condition specified using HTTP conditional header(s) is not met.", headers)
+            return True
+        if self.headers.get("If-None-Match") == "*" and key in fakes.blobs:
+            fakes.stats["blob.conflicts"] = fakes.stats.get("blob.conflicts", 0) + 1
+            self._blob_error(409, "BlobAlreadyExists", "The specified blob already exists.", headers)
+            return True
+        return False
+
+    def _blob(self, path, query, body):
+        fakes = self.fakes
+        time.sleep(fakes.blob_latency)
+        parts = path.split("/", 2)
+        container = parts[1] if len(parts) > 1 else ""
+        blob = parts[2] if len(parts) > 2 else None
+        etag = lambda: f"\"0x{time.time_ns():X}\""
+        headers = {"x-ms-request-id": str(time.time_ns()), "x-ms-version": self.headers.get("x-ms-version", "2021-08-06")}
+        fakes.count(f"blob.{self.command.lower()}")
+        with fakes.lock:
+            blobs = fakes.blobs
+            if blob is None:
+                if query.get("comp") == ["list"]:
+                    prefix = (query.get("prefix") or [""])[0]
+                    names = [name for (owner, name) in blobs if owner == container and name.startswith(prefix)]
+                    items = "".join(f"<Blob><Name>{escape(name)}</Name><Properties><Content-Length>{len(blobs[(container, name)])}</Content-Length>"
+                                    f"<BlobType>BlockBlob</BlobType></Properties></Blob>" for name in sorted(names))
+                    xml = (f"<?xml version=\"1.0\" encoding=\"utf-8\"?><EnumerationResults ContainerName=\"{escape(container)}\">"
+                           f"<Prefix>{escape(prefix)}</Prefix><Blobs>{items}</Blobs><NextMarker /></EnumerationResults>")
+                    return self._send(200, xml, "application/xml", headers)
+                if self.command == "PUT":
+                    created = ("container", container) not in blobs
+                    blobs[("container", container)] = b""
+                    if not created:
+                        return self._blob_error(409, "ContainerAlreadyExists", "The specified container already exists.", headers)
+                    return self._send(201, b"", "application/octet-stream", dict(headers, ETag=etag()))
+                exists = ("container", container) in blobs
+                return self._send(200 if exists else 404, b"", "application/octet-stream", headers)
+
+            key = (container, blob)
+            if self.command == "PUT":
+                if query.get("comp") == ["appendblock"]:
+                    if key not in blobs:
+                        return self._blob_error(404, "BlobNotFound", "The specified blob does not exist.", headers)
+                    blobs[key] += body
+                    fakes.etags[key] = etag()
+                    return self._send(201, b"", "application/octet-stream",
+                                      dict(headers, ETag=fakes.etags[key], **{"x-ms-blob-append-offset": "0", "x-ms-blob-committed-block-count": "1"}))
+                if self._blob_precondition(key, headers):
+                    return
+                blobs[key] = body
+                fakes.etags[key] = etag()
+                return self._send(201, b"", "application/octet-stream", dict(headers, ETag=fakes.etags[key]))
+            if key not in blobs:
+                return self._blob_error(404, "BlobNotFound", "The specified blob does not exist.", headers)
+            if self.command == "DELETE":
+                if self._blob_precondition(key, headers):
+                    return
+                del blobs[key]
+                del fakes.etags[key]
+                return self._send(202, b"", "application/octet-stream", headers)
+            data = blobs[key]
+            current = fakes.etags[key]
+        headers = dict(headers, ETag=current, **{"x-ms-blob-type": "BlockBlob", "Last-Modified": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime())})
+        # The SDK downloads with a range header and expects a 206 carrying
+        # Content-Range; the whole blob always fits in the first range here.
+        if data and (self.headers.get("x-ms-range") or self.headers.get("Range")):
+            return self._send(206, data, "application/octet-stream",
+                              dict(headers, **{"Content-Range": f"bytes 0-{len(data) - 1}/{len(data)}"}))
+        return self._send(200, data, "application/octet-stream", headers)
+
+def serve(ready, options, indexes=0, documents=0):
+    """
+    Child-process entry point: start the fakes with `options`, seed
+    `indexes` indexes of `documents` documents each, put the base URL on the
+    `ready` queue and serve until terminated.
+    """
+    fakes = FakeServices(**options).start()
+    for n in range(indexes):
+        fakes.add_index(f"benchmark-{n}", documents)
+    ready.put(fakes.url)
+    fakes.thread.join()
@@ -0,0 +1,330 @@
+# benchmark_load.py
+#
+# Load and latency benchmark for the search, answer and ingestion paths,
+# run against the local stand-ins in benchmark_fakes.py instead of Azure:
+#
+#   python benchmark_load.py --concurrency 8 --requests 200
+#   python benchmark_load.py --scenarios chat,stream --chat-latency 1.5 --rate-limit 0.1
+#   python benchmark_load.py --set LLM_REQUESTS_PER_MINUTE=600 --set SEARCH_MAX_WORKERS=16
+#
+# Scenarios drive the real code (query_search_indices, generate_response,
+# generate_response_stream, add_link_contents_to_index,
+# handle_meeting_transcripts and the FeedbackWriter) with the real Search,
+# OpenAI and Blob clients pointed at the fakes, so pooling, retries, rate
+# limiting and thread pools are all exercised. Reported per scenario:
+# p50/p95/p99 latency, throughput, errors and the process's peak RSS; with
+# --trace-memory also the tracemalloc peak (Python allocations only), which
+# slows every call several times over, so its latencies are not comparable.
+# The fakes run in a child process so they do not compete with Lumina for
+# the GIL. Secrets are replaced with dummies, so Key Vault is never called;
+# caches and the ingest manifest live in a temporary directory. The
+# response cache is off unless --response-cache is given.
+#
+# Search, chat and feedback run --concurrency callers at once. Ingestion
+# holds a process-wide lock, so the link and transcript scenarios run their
+# batches one after another and report per-batch latency. The feedback
+# scenario spreads its calls over --feedback-writers writers sharing the
+# counter shards, then checks that every record and reaction was stored and
+# exits non-zero if not.
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from benchmark_fakes import WORDS, blob_connection_string, sample_transcript, serve
+from config import Config
+
+SCENARIOS = ["search", "chat", "stream", "feedback", "links", "transcripts"]
+
+class FakeDriver:
+    """
+    Just enough of a WebDriver for browser_pool: fetches pages from the fake
+    server over plain HTTP.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.page_source = ""
+        self.current_url = ""
+
+    def get(self, url):
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        self.page_source = response.text
+        self.current_url = url
+
+    def get_cookies(self):
+        return []
+
+    def add_cookie(self, cookie):
+        pass
+
+    def quit(self):
+        pass
+
+def percentile(values, share):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))]
+
+def sample_question(rng):
+    return f"How do I {' '.join(rng.sample(WORDS, 4))}?"
+
+def configure(url, args):
+    Config.SEARCH_ENDPOINT = f"{url}/search"
+    Config.ADMIN_KEY = "benchmark"
+    Config.AZURE_OPENAI_API_KEY = "benchmark"
+    Config.AZURE_OPENAI_ENDPOINT = f"{url}/openai/deployments/gpt-4o/chat/completions"
+    Config.AZURE_OPENAI_EMBEDDING_ENDPOINT = f"{url}/openai/deployments/text-embedding-3-small/embeddings"
+    Config.AZURE_STORAGE_CONNECTION_STRING = blob_connection_string(url)
+    Config.RESPONSE_CACHE_ENABLED = args.response_cache
+    Config.SECRET_CACHE_ENABLED = False
+    Config.BROWSER_HEADLESS = True
+    for setting in args.set:
+        name, _, value = setting.partition("=")
+        if not hasattr(Config, name):
+            raise SystemExit(f"Unknown setting '{name}'.")
+        current = getattr(Config, name)
+        if isinstance(current, bool):
+            value = value.lower() in ("1", "true", "yes", "on")
+        elif isinstance(current, (int, float)):
+            value = type(current)(value)
+        elif value.lower() == "none":
+            value = None
+        setattr(Config, name, value)
+
+def peak_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def run_scenario(name, operation, count, concurrency, quiet, trace_memory):
+    """
+    Call operation(i) count times from `concurrency` threads and return the
+    latency and memory figures. Output printed by the operations is dropped
+    unless quiet is False.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def call(i):
+        start = time.perf_counter()
+        error = None
+        try:
+            if operation(i) is False:
+                error = "operation reported failure"
+        except Exception as e:
+            error = repr(e)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            if error is not None:
+                errors.append(error)
+
+    output = io.StringIO() if quiet else None
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"bench-{name}") as executor:
+            list(executor.map(call, range(count)))
+    elapsed = time.perf_counter() - start
+    traced = None
+    if trace_memory:
+        _, traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "name": name,
+        "count": count,
+        "errors": errors,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "throughput": count / elapsed if elapsed else 0.0,
+        "rss": peak_rss(),
+        "traced": traced
+    }
+
+def build_operations(url, args, workdir):
+    import ai_utils
+    import browser_pool
+    import requests
+    from feedback_writer import FeedbackWriter
+
+    rng = random.Random(args.seed)
+    operations = {}
+
+    operations["search"] = lambda i: bool(ai_utils.query_search_indices(sample_question(random.Random(i))) is not None)
+
+    contexts = {}
+    def answer(i, stream):
+        question = sample_question(random.Random(i))
+        context = contexts.get(i % 16)
+        if context is None:
+            context = contexts[i % 16] = ai_utils.query_search_indices(question)
+        history = [("What is a deployment slot?", "A deployment slot is a live app with its own host name.")]
+        if stream:
+            reply = "".join(ai_utils.generate_response_stream(question, context, history))
+        else:
+            reply = ai_utils.generate_response(question, context, history)
+        return bool(reply) and reply != "No response."
+
+    operations["chat"] = lambda i: answer(i, stream=False)
+    operations["stream"] = lambda i: answer(i, stream=True)
+
+    # Several writers stand in for several service processes sharing the
+    # counter shards, so their ETag races are part of the measurement.
+    writers = [FeedbackWriter(Config.AZURE_STORAGE_CONTAINER_NAME, flush_interval=Config.FEEDBACK_FLUSH_INTERVAL,
+                              batch_size=Config.FEEDBACK_BATCH_SIZE, max_retries=Config.FEEDBACK_MAX_RETRIES,
+                              queue_size=Config.FEEDBACK_QUEUE_SIZE, shards=Config.FEEDBACK_REACTION_SHARDS)
+               for _ in range(args.feedback_writers)]
+
+    def feedback(i):
+        writer = writers[i % len(writers)]
+        writer.record_reaction("positive" if i % 3 else "negative")
+        return writer.record("written", f"session-{i % 32}", {"feedback": f"benchmark feedback {i}", "history": []})
+
+    operations["feedback"] = feedback
+
+    # Ingestion appends to indexes that already exist, as it does in Azure.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for identifier in ("qa", "content", "meeting-transcripts"):
+            ai_utils.create_or_replace_index(Config.SEARCH_SERVICE_NAME, Config.ADMIN_KEY, ai_utils.generate_index_name(identifier), replace=False)
+
+    http = requests.Session()
+    browser_pool._pool = browser_pool.BrowserPool(size=Config.BROWSER_POOL_SIZE, wait_for_id=None,
+                                                  driver_factory=lambda headless: FakeDriver(http))
+
+    def links(i):
+        return ai_utils.add_link_contents_to_index([f"{url}/pages/batch{i}-{n}" for n in range(args.batch)]) is not False
+
+    operations["links"] = links
+
+    def transcripts(i):
+        folder = os.path.join(workdir, f"transcripts-{i}")
+        os.makedirs(folder, exist_ok=True)
+        for n in range(args.batch):
+            with open(os.path.join(folder, f"meeting-{i}-{n}.vtt"), "w", encoding="utf-8") as f:
+                f.write(sample_transcript(rng, lines=args.transcript_lines))
+        return ai_utils.handle_meeting_transcripts("upload meeting transcript", path=folder)
+
+    operations["transcripts"] = transcripts
+    return operations, writers
+
+def check_feedback(writers, count):
+    """
+    Flush every writer and return the problems that would otherwise only
+    show up in the stats line: records that were not written, counter
+    updates that failed, and shard totals that do not match the reactions.
+    """
+    problems = []
+    for writer in writers:
+        if not writer.flush(Config.FEEDBACK_FLUSH_TIMEOUT):
+            problems.append("feedback flush timed out")
+    stats = {key: sum(writer.stats[key] for writer in writers) for key in writers[0].stats}
+    for key in ("failed", "dropped", "counter_failures"):
+        if stats[key]:
+            problems.append(f"{key}={stats[key]}")
+    totals = writers[0].reaction_stats()
+    expected_up = sum(1 for i in range(count) if i % 3)
+    if (totals["thumbs_up"], totals["thumbs_down"]) != (expected_up, count - expected_up):
+        problems.append(f"counter shards hold {totals['thumbs_up']} up / {totals['thumbs_down']} down, "
+                        f"expected {expected_up} / {count - expected_up}")
+    return stats, problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Lumina under load against local Azure stand-ins.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="calls per concurrent scenario")
+    parser.add_argument("--batches", type=int, default=3, help="ingestion batches per ingestion scenario")
+    parser.add_argument("--batch", type=int, default=5, help="pages or transcripts per ingestion batch")
+    parser.add_argument("--transcript-lines", type=int, default=200)
+    parser.add_argument("--feedback-writers", type=int, default=4, help="FeedbackWriters sharing the counter shards")
+    parser.add_argument("--indexes", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=200, help="documents per index")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds between streamed chunks")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--blob-latency", type=float, default=0.02, help="seconds")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of OpenAI calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a Config setting")
+    parser.add_argument("--response-cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--approx-tokens", action="store_true", help="count tokens by length instead of tiktoken")
+    parser.add_argument("--trace-memory", action="store_true", help="also report the tracemalloc peak (slows every call)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="show Lumina's own output")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    options = {"search_latency": args.search_latency, "chat_latency": args.chat_latency, "token_latency": args.token_latency,
+               "embedding_latency": args.embedding_latency, "blob_latency": args.blob_latency,
+               "rate_limit_ratio": args.rate_limit, "retry_after": args.retry_after, "seed": args.seed}
+    ready = multiprocessing.Queue()
+    fakes = multiprocessing.Process(target=serve, args=(ready, options, args.indexes, args.documents), daemon=True)
+    fakes.start()
+    url = ready.get(timeout=60)
+    configure(url, args)
+
+    workdir = tempfile.mkdtemp(prefix="lumina-benchmark-")
+    os.chdir(workdir)
+    if args.approx_tokens:
+        import context_builder
+        context_builder.tiktoken = None
+
+    operations, writers = build_operations(url, args, workdir)
+    print(f"Fakes at {url}; {args.indexes} index(es) x {args.documents} document(s); working in {workdir}")
+    print(f"{'scenario':<12} {'calls':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>8} {'RSS MiB':>8}"
+          + (f" {'traced MiB':>10}" if args.trace_memory else ""))
+    results = []
+    problems = []
+    try:
+        for name in scenarios:
+            ingestion = name in ("links", "transcripts")
+            count = args.batches if ingestion else args.requests
+            result = run_scenario(name, operations[name], count, 1 if ingestion else args.concurrency, not args.verbose, args.trace_memory)
+            results.append(result)
+            rss = f"{result['rss'] / 1024 / 1024:>8.0f}" if result["rss"] is not None else f"{'-':>8}"
+            traced = f" {result['traced'] / 1024 / 1024:>10.1f}" if args.trace_memory else ""
+            print(f"{name:<12} {result['count']:>6} {len(result['errors']):>6} {result['p50'] * 1000:>9.1f} {result['p95'] * 1000:>9.1f} "
+                  f"{result['p99'] * 1000:>9.1f} {result['throughput']:>8.2f} {rss}{traced}")
+        if "feedback" in scenarios:
+            start = time.perf_counter()
+            feedback_stats, problems = check_feedback(writers, args.requests)
+            print(f"Feedback flush: {(time.perf_counter() - start) * 1000:.0f} ms across {len(writers)} writer(s); "
+                  + ", ".join(f"{key}={value}" for key, value in feedback_stats.items()))
+        import requests
+        stats = requests.get(f"{url}/stats", timeout=10).json()
+    finally:
+        for writer in writers:
+            writer.close(Config.FEEDBACK_FLUSH_TIMEOUT)
+        fakes.terminate()
+
+    for result in results:
+        for message in sorted(set(result["errors"]))[:3]:
+            print(f"  {result['name']}: {message}")
+    from llm_client import get_llm_client
+    metrics = get_llm_client().metrics
+    print(f"LLM client: {metrics['calls']} call(s), {metrics['retries']} retr(ies), {metrics['rate_limited']} rate-limited, {metrics['failures']} failure(s)")
+    print("Fake service requests: " + ", ".join(f"{kind}={count}" for kind, count in sorted(stats.items())))
+    if problems:
+        raise SystemExit("Feedback check failed: " + "; ".join(problems))
+
+if __name__ == "__main__":
+    main()
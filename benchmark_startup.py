@@ -0,0 +1,87 @@
+# benchmark_startup.py
+#
+# Measures how long Lumina takes to start:
+#
+#   python benchmark_startup.py --runs 5
+#
+# "import" is the time to import app (from python -X importtime, with the
+# slowest modules listed); "prompt" is the wall time from launching app.py
+# until the first "You:" prompt is printed, after which the run sends "exit".
+# Each run is a fresh interpreter, so nothing is warm between runs.
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def measure_import(script_dir):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            cwd=script_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import app failed")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((int(match.group(2)), len(match.group(3)), match.group(4)))
+    total = next(cumulative for cumulative, _, name in reversed(modules) if name == "app")
+    return total / 1e6, modules
+
+def measure_prompt(script_dir, timeout):
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "app.py"], cwd=script_dir, env=env, text=True,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = ""
+    try:
+        while "You:" not in output:
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"no prompt within {timeout}s")
+            char = process.stdout.read(1)
+            if not char:
+                raise RuntimeError("app exited before the prompt:\n" + output[-2000:])
+            output += char
+        elapsed = time.perf_counter() - start
+        process.stdin.write("exit\n")
+        process.stdin.flush()
+        process.wait(timeout=timeout)
+        return elapsed
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+def describe(label, samples):
+    print(f"{label:<8} median {statistics.median(samples) * 1000:7.0f} ms  min {min(samples) * 1000:7.0f} ms  max {max(samples) * 1000:7.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Lumina's import time and time to first prompt.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="number of top-level imports to list")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    import_samples = []
+    prompt_samples = []
+    modules = []
+    for _ in range(args.runs):
+        seconds, modules = measure_import(script_dir)
+        import_samples.append(seconds)
+        prompt_samples.append(measure_prompt(script_dir, args.timeout))
+
+    print(f"{args.runs} run(s)\n")
+    describe("import", import_samples)
+    describe("prompt", prompt_samples)
+
+    # Cumulative times nest, so a package appears above the modules it pulls in.
+    print("\nSlowest imports (last run, cumulative):")
+    for cumulative, depth, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:7.1f} ms  {'  ' * (depth // 2)}{name}")
+
+if __name__ == "__main__":
+    main()
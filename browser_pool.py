@@ -0,0 +1,188 @@
+# browser_pool.py
+
+import atexit
+import os
+import queue
+import threading
+from urllib.parse import urlparse
+from config import Config
+
+config = Config()
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_edge_driver_path():
+    """
+    Resolve msedgedriver once per process: prefer drivers/msedgedriver.exe,
+    otherwise download it through webdriver_manager.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            local_driver_path = os.path.join(os.getcwd(), "drivers", "msedgedriver.exe")
+            if os.path.exists(local_driver_path):
+                print(f"Using local Edge WebDriver: {local_driver_path}")
+                _driver_path = local_driver_path
+            else:
+                print("No local Edge WebDriver found. Attempting to download...")
+                try:
+                    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+                    _driver_path = EdgeChromiumDriverManager().install()
+                except Exception as e:
+                    raise RuntimeError(
+                        "Could not download Edge WebDriver. "
+                        "Please ensure internet access or place msedgedriver.exe in the 'drivers' folder."
+                    ) from e
+        return _driver_path
+
+def create_edge_driver(headless=False):
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service as EdgeService
+    options = webdriver.EdgeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    return webdriver.Edge(options=options, service=EdgeService(get_edge_driver_path()))
+
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.domains = set()
+
+class BrowserPool:
+    """
+    Keeps up to `size` WebDriver instances warm across a batch of pages.
+    Cookies captured after each page are replayed into drivers that have not
+    visited that domain yet, so SSO only has to complete once. A driver is
+    recycled after max_pages pages or as soon as it raises a WebDriverException.
+    """
+
+    def __init__(self, size=2, headless=False, max_pages=50, wait_for_id="_content", wait_timeout=20, driver_factory=create_edge_driver):
+        self.size = size
+        self.headless = headless
+        self.max_pages = max_pages
+        self.wait_for_id = wait_for_id
+        self.wait_timeout = wait_timeout
+        self.driver_factory = driver_factory
+        self.stats = {"created": 0, "recycled": 0, "crashed": 0, "pages": 0}
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._cookies = {}
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            driver = self.driver_factory(self.headless)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.stats["created"] += 1
+        return PooledDriver(driver)
+
+    def _checkin(self, pooled, healthy):
+        if healthy and pooled.pages < self.max_pages:
+            self._idle.put(pooled)
+        else:
+            with self._lock:
+                self.stats["recycled" if healthy else "crashed"] += 1
+            self._quit(pooled)
+        self._slots.release()
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print("Warning: Could not shut down browser cleanly:", e)
+
+    def _load(self, pooled, url):
+        from selenium.common.exceptions import WebDriverException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        driver = pooled.driver
+        domain = urlparse(url).netloc
+        driver.get(url)
+
+        with self._lock:
+            cookies = self._cookies.get(domain)
+        if cookies and domain not in pooled.domains:
+            for cookie in cookies:
+                try:
+                    driver.add_cookie(cookie)
+                except WebDriverException:
+                    pass
+            driver.get(url)
+        pooled.domains.add(domain)
+
+        if self.wait_for_id:
+            try:
+                WebDriverWait(driver, self.wait_timeout).until(lambda d: d.find_element(By.ID, self.wait_for_id))
+            except Exception as e:
+                print("Warning: Main content not detected; proceeding anyway.", e)
+
+        html = driver.page_source
+        current_domain = urlparse(driver.current_url).netloc or domain
+        with self._lock:
+            self._cookies[current_domain] = driver.get_cookies()
+            self.stats["pages"] += 1
+        pooled.pages += 1
+        return html
+
+    def fetch(self, url, retries=1):
+        from selenium.common.exceptions import WebDriverException
+        attempt = 0
+        while True:
+            pooled = self._checkout()
+            try:
+                html = self._load(pooled, url)
+            except WebDriverException as e:
+                self._checkin(pooled, healthy=False)
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                print(f"Browser failed while loading {url}; retrying with a fresh driver...", e)
+                continue
+            except BaseException:
+                # Any other failure (a dead driver process, a refused
+                # connection) still returns the slot and drops the driver.
+                self._checkin(pooled, healthy=False)
+                raise
+            self._checkin(pooled, healthy=True)
+            return html
+
+    def close(self):
+        """
+        Quit every idle driver. Cookies are kept, so the next batch can
+        reuse the session without logging in again.
+        """
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(pooled)
+
+def get_browser_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                size=config.BROWSER_POOL_SIZE,
+                headless=config.BROWSER_HEADLESS,
+                max_pages=config.BROWSER_MAX_PAGES
+            )
+            atexit.register(_pool.close)
+        return _pool
+
+def close_browser_pool():
+    if _pool is not None:
+        _pool.close()
@@ -0,0 +1,162 @@
+# chat_session.py
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from ai_utils import query_search_indices, summarize_conversation, search_hits, pack_search_context, rewrite_follow_up, warm_search
+from conversation_memory import ConversationMemory
+from response_cache import get_response_cache
+from turn_engine import TurnEngine
+from config import Config
+
+config = Config()
+
+class ChatSession:
+    """
+    Everything one conversation needs between turns: its id, the
+    (question, answer) history, the summarizing memory, the turn engine's
+    warm context, search filters and turn timings. The console has one;
+    the HTTP service keeps one per session id and passes the store's shared
+    executor, so sessions own no threads of their own.
+
+    A turn runs between begin_turn() and end_turn(); request_close() on a
+    session mid-turn closes it once that turn ends.
+    """
+
+    def __init__(self, session_id=None, warm=True, executor=None):
+        self.id = session_id or f"session-{uuid.uuid4()}"
+        self.history = []
+        self.memory = ConversationMemory(
+            summarize_conversation,
+            keep_turns=config.MEMORY_KEEP_TURNS,
+            summary_token_budget=config.MEMORY_SUMMARY_TOKENS,
+            history_token_budget=config.HISTORY_TOKEN_BUDGET,
+            executor=executor
+        )
+        self.turn_engine = TurnEngine(
+            search_hits,
+            pack_search_context,
+            rewrite_follow_up,
+            warm_search if warm else None,
+            reuse_coverage=config.TURN_REUSE_COVERAGE,
+            rewrite_timeout=config.TURN_REWRITE_TIMEOUT,
+            warm_hits=config.TURN_WARM_HITS,
+            executor=executor
+        )
+        self.filters = {}
+        self.timings = []
+        self.last_active = time.time()
+        self.turn_lock = threading.Lock()
+        self.close_requested = False
+        self.closed = False
+        self._close_lock = threading.Lock()
+
+    def retrieve(self, user_text):
+        """
+        Return (search_results, turn kind, retrieval seconds) for a question.
+        """
+        start = time.perf_counter()
+        self.last_active = time.time()
+        if config.TURN_PIPELINE_ENABLED:
+            search_results = self.turn_engine.retrieve(user_text, self.history, self.filters)
+            turn = self.turn_engine.turns[-1]["kind"]
+        else:
+            search_results = query_search_indices(user_text, self.filters)
+            turn = "first" if not self.history else "fresh"
+        return search_results, turn, time.perf_counter() - start
+
+    def cached_reply(self, user_text, search_results):
+        cache = get_response_cache()
+        return cache.get(user_text, search_results, self.history) if cache else None
+
+    def record_turn(self, user_text, assistant_reply, search_results, timing, cached=False):
+        cache = get_response_cache()
+        if cache and not cached and assistant_reply != "No response.":
+            cache.put(user_text, search_results, assistant_reply, self.history)
+        self.history.append((user_text, assistant_reply))
+        self.memory.append(user_text, assistant_reply)
+        self.timings.append(timing)
+        del self.timings[:-100]
+        self.last_active = time.time()
+
+    def begin_turn(self):
+        """
+        Claim the session for one turn; False if a turn is already running.
+        """
+        return self.turn_lock.acquire(blocking=False)
+
+    def end_turn(self):
+        self.turn_lock.release()
+        if self.close_requested:
+            self.close()
+
+    def request_close(self):
+        """
+        Close now if no turn is running, otherwise when the running turn ends.
+        """
+        self.close_requested = True
+        if self.turn_lock.acquire(blocking=False):
+            try:
+                self.close()
+            finally:
+                self.turn_lock.release()
+
+    def close(self):
+        with self._close_lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.turn_engine.close()
+        self.memory.close()
+
+class SessionStore:
+    """
+    Sessions by id for the HTTP service. Sessions idle for more than
+    idle_timeout seconds are closed, and the least recently used one is
+    evicted when max_sessions is reached, preferring sessions with no turn
+    running. Every session's rewrites, speculative searches and memory folds
+    share one pool of `workers` threads.
+    """
+
+    def __init__(self, max_sessions=500, idle_timeout=3600, workers=16):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lumina-session")
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id=None, create=True):
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None and create:
+                if len(self._sessions) >= self.max_sessions:
+                    oldest = min(self._sessions.values(), key=lambda item: (item.turn_lock.locked(), item.last_active))
+                    self._sessions.pop(oldest.id).request_close()
+                session = ChatSession(session_id, warm=False, executor=self.executor)
+                self._sessions[session.id] = session
+            return session
+
+    def remove(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.request_close()
+        return session is not None
+
+    def _evict(self):
+        cutoff = time.time() - self.idle_timeout
+        for session_id in [key for key, session in self._sessions.items() if session.last_active < cutoff]:
+            self._sessions.pop(session_id).request_close()
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.request_close()
+        self.executor.shutdown(wait=False)
+
+    def __len__(self):
+        return len(self._sessions)
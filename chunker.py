@@ -0,0 +1,157 @@
+# chunker.py
+
+import re
+from context_builder import count_tokens, truncate_to_tokens
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(\[])')
+
+def iter_lines(source):
+    """
+    Yield lines from a string, an open file or any iterable of text pieces,
+    without building a second copy of the whole text.
+    """
+    if isinstance(source, str):
+        for match in re.finditer(r'[^\n]*\n|[^\n]+$', source):
+            yield match.group(0)
+        return
+    buffer = ""
+    for piece in source:
+        buffer += piece
+        if "\n" not in buffer:
+            continue
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    if buffer:
+        yield buffer
+
+def iter_blocks(lines, split_lines=False):
+    """
+    Group lines into (text, is_code) blocks: fenced code blocks stay whole,
+    other text is grouped into blank-line separated paragraphs, or one block
+    per line with split_lines (scraped sections, transcript turns).
+    """
+    block = []
+    in_code = False
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if in_code:
+                block.append(line.rstrip("\n"))
+                yield "\n".join(block), True
+                block = []
+                in_code = False
+                continue
+            if block:
+                yield "\n".join(block), False
+                block = []
+            in_code = True
+            block.append(line.rstrip("\n"))
+            continue
+        if in_code:
+            block.append(line.rstrip("\n"))
+            continue
+        if not stripped:
+            if block:
+                yield "\n".join(block), False
+                block = []
+            continue
+        if split_lines:
+            yield stripped, False
+            continue
+        block.append(stripped)
+    if block:
+        yield "\n".join(block), in_code
+
+def split_at_tokens(text, max_tokens):
+    head = truncate_to_tokens(text, max_tokens)
+    if not head or not text.startswith(head):
+        head = text[:max(1, max_tokens * 4)]
+    return head, text[len(head):].lstrip()
+
+def iter_units(blocks, max_tokens):
+    """
+    Yield units of at most max_tokens: whole blocks when they fit, otherwise
+    their sentences (lines for code), and token slices as a last resort.
+    """
+    for block, is_code in blocks:
+        if count_tokens(block) <= max_tokens:
+            yield block
+            continue
+        pieces = block.split("\n") if is_code else SENTENCE_END.split(block)
+        for piece in pieces:
+            while count_tokens(piece) > max_tokens:
+                head, piece = split_at_tokens(piece, max_tokens)
+                yield head
+            if piece:
+                yield piece
+
+def chunk_units(units, max_tokens, overlap_tokens=0, prefix=""):
+    """
+    Pack units into chunks of at most max_tokens, starting each chunk with
+    `prefix` (a section title) and repeating up to overlap_tokens worth of the
+    previous chunk's trailing units. Chunks are yielded as they fill up.
+    """
+    prefix_tokens = count_tokens(prefix) + 1 if prefix else 0
+    chunk = []
+    used = prefix_tokens
+    for unit in units:
+        tokens = count_tokens(unit) + 1
+        if chunk and used + tokens > max_tokens:
+            yield "\n".join(([prefix] if prefix else []) + [text for text, _ in chunk])
+            carry = []
+            carried = 0
+            for text, text_tokens in reversed(chunk):
+                if carried + text_tokens > overlap_tokens:
+                    break
+                carry.insert(0, (text, text_tokens))
+                carried += text_tokens
+            if prefix_tokens + carried + tokens > max_tokens:
+                carry, carried = [], 0
+            chunk = carry
+            used = prefix_tokens + carried
+        chunk.append((unit, tokens))
+        used += tokens
+    if chunk:
+        yield "\n".join(([prefix] if prefix else []) + [text for text, _ in chunk])
+
+def chunk_text(source, max_tokens, overlap_tokens=0, split_lines=False, prefix=""):
+    """
+    Lazily chunk a string, file or iterable of text pieces on paragraph,
+    sentence and code-block boundaries, sizing chunks in tokens.
+    """
+    unit_budget = max(1, max_tokens - (count_tokens(prefix) + 1 if prefix else 0) - 1)
+    units = iter_units(iter_blocks(iter_lines(source), split_lines), unit_budget)
+    return chunk_units(units, max_tokens, overlap_tokens, prefix)
+
+def chunk_sections(sections, max_tokens, overlap_tokens=0):
+    """
+    Chunk the sections returned by html_extract.extract_page. Small
+    neighbouring sections are packed together under their titles; a section
+    too big for one chunk is split on its own line/sentence boundaries with
+    its title repeated at the top of every piece.
+    """
+    pending = []
+    used = 0
+    for section in sections:
+        title = (section.get("title") or "").strip()
+        content = section.get("content") or ""
+        text = f"{title}\n{content}".strip()
+        if not content.strip():
+            continue
+        tokens = count_tokens(text) + 2
+        if tokens <= max_tokens:
+            if pending and used + tokens > max_tokens:
+                yield "\n\n".join(pending)
+                pending = []
+                used = 0
+            pending.append(text)
+            used += tokens
+            continue
+        if pending:
+            yield "\n\n".join(pending)
+            pending = []
+            used = 0
+        yield from chunk_text(content, max_tokens, overlap_tokens, split_lines=True, prefix=title)
+    if pending:
+        yield "\n\n".join(pending)
@@ -1,14 +1,134 @@
 # config.py
 
-from keyvault_helper import get_secret
+import os
+from keyvault_helper import get_secret, register_secret
+
+class Secret:
+    """
+    A Key Vault secret read on first access rather than when config.py is
+    imported.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        register_secret(name)
+
+    def __get__(self, instance, owner):
+        return get_secret(self.name)
 
 class Config:
     SEARCH_SERVICE_NAME = "antares-genie-search"
-    ADMIN_KEY = get_secret("Antares-Lumina-SearchKey")
-    AZURE_STORAGE_CONNECTION_STRING = get_secret("Antares-Lumina-AzureStorageConnString")
+    SEARCH_ENDPOINT = None
+    ADMIN_KEY = Secret("Antares-Lumina-SearchKey")
+    AZURE_STORAGE_CONNECTION_STRING = Secret("Antares-Lumina-AzureStorageConnString")
     DEPLOYMENT_NAME = "gpt-4o"
-    API_VERSION = "2021-04-30-Preview"
-    AZURE_STORAGE_CONNECTION_STRING = get_secret("Antares-Lumina-AzureStorageConnString")
+    API_VERSION = "2024-07-01"
     AZURE_OPENAI_ENDPOINT = "https://deployment-agent.openai.azure.com/openai/deployments/gpt-4o/chat/completions?api-version=2025-01-01-preview"
-    AZURE_OPENAI_API_KEY = get_secret("Antares-Lumina-OpenAIKey")
+    AZURE_OPENAI_API_KEY = Secret("Antares-Lumina-OpenAIKey")
+    AZURE_OPENAI_EMBEDDING_ENDPOINT = "https://deployment-agent.openai.azure.com/openai/deployments/text-embedding-3-small/embeddings?api-version=2024-02-01"
     AZURE_STORAGE_CONTAINER_NAME = "feedback-logs"
+    FEEDBACK_FLUSH_INTERVAL = 2
+    FEEDBACK_BATCH_SIZE = 100
+    FEEDBACK_MAX_RETRIES = 3
+    FEEDBACK_QUEUE_SIZE = 10000
+    FEEDBACK_FLUSH_TIMEOUT = 10
+    FEEDBACK_REACTION_SHARDS = 8
+    TELEMETRY_UPLOADS = False
+    SEARCH_MAX_WORKERS = 16
+    SEARCH_INDEX_TIMEOUT = 5
+    SEARCH_DEADLINE = 8
+    SEARCH_LOG_LATENCY = False
+    SEARCH_POOL_SIZE = 32
+    SEARCH_CATALOG_TTL = 300
+    SEARCH_ID_LOOKUP_BATCH = 500
+    CONSOLIDATED_INDEX_ENABLED = False
+    CONSOLIDATED_INDEX_NAME = "lumina-knowledge"
+    MIGRATION_WORKERS = 4
+    MIGRATION_PAGE_SIZE = 1000
+    CONTEXT_TOKEN_BUDGET = 6000
+    CONTEXT_DEDUPE_THRESHOLD = 0.8
+    HISTORY_TOKEN_BUDGET = 2000
+    MEMORY_KEEP_TURNS = 4
+    MEMORY_SUMMARY_TOKENS = 400
+    UPLOAD_BATCH_SIZE = 500
+    UPLOAD_BATCH_BYTES = 8 * 1024 * 1024
+    UPLOAD_WORKERS = 4
+    UPLOAD_MAX_RETRIES = 3
+    UPLOAD_RETRY_BACKOFF = 1
+    CACHE_DIR = ".lumina"
+    SECRET_CACHE_ENABLED = True
+    SECRET_CACHE_PATH = os.path.join(CACHE_DIR, "secrets.bin")
+    SECRET_CACHE_TTL = 12 * 3600
+    EMBEDDINGS_ENABLED = True
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS = 1536
+    EMBEDDING_BATCH_SIZE = 256
+    EMBEDDING_BATCH_TOKENS = 100000
+    EMBEDDING_MAX_INPUT_TOKENS = 8000
+    EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embedding-cache.sqlite3")
+    VECTOR_FIELD = "content_vector"
+    VECTOR_K = 20
+    SEARCH_MODE = "hybrid"
+    SEARCH_BACKEND = "azure"
+    LOCAL_INDEX_MIRROR = False
+    LOCAL_INDEX_PATH = os.path.join(CACHE_DIR, "local-index")
+    LOCAL_EMBEDDER = "hashing"
+    LOCAL_SEARCH_TOP = 20
+    LOCAL_ANN_THRESHOLD = 2000
+    LOCAL_ANN_PROBES = 8
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_PATH = os.path.join(CACHE_DIR, "response-cache.sqlite3")
+    RESPONSE_CACHE_MAX_ENTRIES = 500
+    RESPONSE_CACHE_TTL = 7 * 24 * 3600
+    RESPONSE_CACHE_SIMILARITY = 0.95
+    RESPONSE_CACHE_EMBEDDINGS = False
+    STREAM_RESPONSES = True
+    SERVICE_HOST = "127.0.0.1"
+    SERVICE_PORT = 8080
+    SERVICE_API_KEY = None
+    SERVICE_MAX_CONCURRENT_TURNS = 16
+    SERVICE_QUEUE_TIMEOUT = 30
+    SERVICE_WORKER_THREADS = 32
+    SERVICE_MAX_SESSIONS = 500
+    SERVICE_SESSION_IDLE_TIMEOUT = 3600
+    SERVICE_SESSION_WORKERS = 16
+    SERVICE_MAX_BODY_BYTES = 8 * 1024 * 1024
+    SERVICE_TRANSCRIPTS_DIR = "MeetingTranscripts"
+    TURN_PIPELINE_ENABLED = True
+    TURN_REUSE_COVERAGE = 0.8
+    TURN_REWRITE_TURNS = 3
+    TURN_REWRITE_TIMEOUT = 10
+    TURN_WARM_HITS = 20
+    LOG_TURN_TIMINGS = False
+    LLM_REQUESTS_PER_MINUTE = 60
+    LLM_TOKENS_PER_MINUTE = 80000
+    LLM_MAX_CONCURRENCY = 8
+    LLM_MAX_RETRIES = 4
+    LLM_BACKOFF = 2
+    LLM_CONNECT_TIMEOUT = 10
+    LLM_READ_TIMEOUT = 120
+    QA_RESPONSE_FORMAT = "json_object"
+    QA_INPUT_TOKENS = 3000
+    QA_MAX_OUTPUT_TOKENS = 4000
+    QA_INPUT_TOKENS_PER_PAIR = 60
+    QA_OUTPUT_TOKENS_PER_PAIR = 90
+    QA_MIN_PAIRS = 2
+    QA_MAX_PAIRS = 20
+    QA_REQUEST_WORKERS = 4
+    QA_PROMPT_COST_PER_1K = 0.0025
+    QA_COMPLETION_COST_PER_1K = 0.01
+    CHUNK_MAX_TOKENS = 800
+    CHUNK_OVERLAP_TOKENS = 80
+    HTML_PARSER = None
+    SAVE_SCRAPED_PAGES_DIR = None
+    INGEST_SCRAPE_WORKERS = 2
+    INGEST_EXTRACT_WORKERS = 2
+    INGEST_QA_WORKERS = 4
+    INGEST_UPLOAD_WORKERS = 2
+    BROWSER_POOL_SIZE = INGEST_SCRAPE_WORKERS
+    BROWSER_HEADLESS = False
+    BROWSER_MAX_PAGES = 50
+    TRANSCRIPT_FILE_WORKERS = 2
+    TRANSCRIPT_ENHANCE_WORKERS = 4
+    INGEST_MANIFEST_PATH = os.path.join(CACHE_DIR, "ingest-manifest.json")
+    INGEST_JOBS_PATH = os.path.join(CACHE_DIR, "ingest-jobs.sqlite3")
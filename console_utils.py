@@ -1,11 +1,22 @@
 # console_utils.py
 
 import re
+import statistics
 import uuid
-from ai_utils import upload_feedback_to_container, store_conversation
+from config import Config
+from ai_utils import store_conversation, parse_search_filters, get_source_facets
+from chat_session import ChatSession
+from feedback_writer import get_feedback_writer
 
-conversation_id = f"console-session-{uuid.uuid4()}"
-conversation_history = []
+config = Config()
+
+console_session = ChatSession(f"console-session-{uuid.uuid4()}")
+conversation_id = console_session.id
+conversation_history = console_session.history
+conversation_memory = console_session.memory
+turn_engine = console_session.turn_engine
+turn_timings = console_session.timings
+search_filters = console_session.filters
 
 def print_feedback_options():
     print("\nHow was the response?")
@@ -14,26 +25,32 @@ def print_feedback_options():
     print("3. Submit written feedback")
     print("4. Skip feedback")
 
+def submit_written_feedback(written):
+    # Queued for the background writer; the history is copied because the
+    # upload happens after later turns may have been appended.
+    history = [list(turn) for turn in conversation_history]
+    get_feedback_writer().record("written", conversation_id, {"feedback": written, "history": history})
+
 def handle_feedback():
     print_feedback_options()
     choice = input("Choose an option: ").strip()
 
     if choice == "1":
-        upload_feedback_to_container(history=conversation_history, feedbackType="positive")
+        get_feedback_writer().record_reaction("positive")
         print("\nThank you for your positive feedback!")
 
     elif choice == "2":
-        upload_feedback_to_container(history=conversation_history, feedbackType="negative")
+        get_feedback_writer().record_reaction("negative")
         print("\nThank you for your feedback!")
         written = input("Optional: Add written feedback: ").strip()
         if written:
-            upload_feedback_to_container(history=conversation_history, written=written)
+            submit_written_feedback(written)
             print("\nWritten feedback received.")
 
     elif choice == "3":
         written = input("Write your feedback: ").strip()
         if written:
-            upload_feedback_to_container(history=conversation_history, written=written)
+            submit_written_feedback(written)
             print("\nThank you for your written feedback!")
 
     else:
@@ -71,9 +88,30 @@ def print_shortcuts():
     print("\n\nShortcuts:")
     print("1. Type 'upload meeting transcript' to process all files in the local MeetingTranscripts folder.")
     print("2. Type 'store/upload/save this in the knowledge base' to pull up a prompt to enter knowledge or context. Type 'END' on a new line when you're finished.")
-    print("3. Type 'feedback' to provide feedback on Lumina's last response.")
-    print("4. Type 'exit' or 'quit' to end the session.")
-
+    print("3. Type 'feedback' to provide feedback on Lumina's last response, or 'feedback stats' for the 👍/👎 totals.")
+    print("4. Type 'cache stats' to see how many answers were served from the response cache, or 'turn stats' to compare first and follow-up turn times.")
+    print("5. Type 'filter transcripts last 90 days' (or qa/content, file <name>) to narrow searches; 'filter clear' to reset.")
+    print("6. Type 'migrate indexes' to copy every index into the consolidated index.")
+    print("7. Type 'ingestion status', 'resume ingestion' or 'retry failed ingestion' to manage link and transcript ingestion. Add 'in background' to an upload command to keep chatting while it runs.")
+    print("8. Type 'exit' or 'quit' to end the session.")
+
+
+def print_turn_stats():
+    if not turn_timings:
+        print("\nNo turns yet.")
+        return
+    print("\nTurn times (median):")
+    for label, kinds in (("First turns", ("first", "fresh")), ("Follow-ups", ("reused", "speculative", "re-retrieved"))):
+        timings = [timing for timing in turn_timings if timing.get("turn") in kinds]
+        if not timings:
+            continue
+        total = statistics.median(timing["total_time"] for timing in timings) * 1000
+        retrieval = statistics.median(timing["retrieval_time"] for timing in timings) * 1000
+        print(f"  {label}: {len(timings)} turn(s), retrieval {retrieval:.0f} ms, total {total:.0f} ms")
+    kinds = {}
+    for timing in turn_timings:
+        kinds[timing.get("turn")] = kinds.get(timing.get("turn"), 0) + 1
+    print("  Retrieval: " + ", ".join(f"{count} {kind}" for kind, count in kinds.items()))
 
 def handle_knowledge_storage(user_text):
     if re.search(r'\b(upload|store|save|add|ingest)\b.*(note|knowledge|context|info|information|this)', user_text, re.IGNORECASE):
@@ -88,4 +126,29 @@ def handle_knowledge_storage(user_text):
         store_conversation(conversation_id, knowledge)
         print(f"\nStored!\n\n")
         return True
-    return False
\ No newline at end of file
+    return False
+
+
+def handle_search_filter(user_text):
+    match = re.match(r'^filter\b\s*(.*)$', user_text.strip(), re.IGNORECASE)
+    if not match:
+        return False
+    args = match.group(1).strip()
+    if args.lower() in ("clear", "off", "none"):
+        search_filters.clear()
+        print("\nSearch filters cleared.")
+        return True
+    if args:
+        filters = parse_search_filters(args)
+        if filters is None:
+            return False
+        search_filters.clear()
+        search_filters.update(filters)
+    print(f"\nSearch filters: {search_filters or 'none'}")
+    if not args and config.CONSOLIDATED_INDEX_ENABLED:
+        try:
+            for field, values in get_source_facets().items():
+                print(f"  {field}: " + ", ".join(f"{value['value']} ({value['count']})" for value in values))
+        except Exception as e:
+            print("Could not load source facets:", e)
+    return True
@@ -0,0 +1,155 @@
+# context_builder.py
+
+import re
+import threading
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+def get_encoding(model="gpt-4o"):
+    """
+    The model's tiktoken encoding, or None when tiktoken is missing or its
+    encoding file cannot be loaded (offline, behind a proxy). A failed load
+    is not retried, so callers fall back to the length estimate.
+    """
+    global _encoding, _encoding_failed
+    if tiktoken is None or _encoding_failed:
+        return None
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                try:
+                    _encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                _encoding_failed = True
+                print("Warning: Could not load the tokenizer; estimating tokens from length instead.", e)
+        return _encoding
+
+def count_tokens(text):
+    """
+    Count tokens with the model's tokenizer when tiktoken is installed,
+    otherwise estimate at four characters per token.
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text, max_tokens):
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+def format_hit(hit):
+    return f"[{hit['index']}][{hit['doc_type']}] {hit['title']}: {hit['content']}"
+
+def shingles(text, size=5):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def overlap_size(first, second, min_overlap=50):
+    """
+    Length of the longest tail of `first` that `second` starts with, which is
+    what the chunker's overlap leaves between neighbouring chunks.
+    """
+    if len(first) < min_overlap or len(second) < min_overlap:
+        return 0
+    probe = second[:min_overlap]
+    position = first.find(probe, max(0, len(first) - len(second)))
+    while position != -1:
+        tail = first[position:]
+        if second.startswith(tail):
+            return len(tail)
+        position = first.find(probe, position + 1)
+    return 0
+
+def trim_overlap(kept_content, content, min_overlap=50):
+    size = overlap_size(kept_content, content, min_overlap)
+    if size:
+        content = content[size:]
+    size = overlap_size(content, kept_content, min_overlap)
+    if size:
+        content = content[:-size]
+    return content.strip()
+
+def dedupe_hits(hits, threshold=0.8):
+    """
+    Keep hits in rank order, dropping any whose word shingles are mostly
+    covered by hits already kept (Q&A answers restating a content chunk, the
+    same chunk in two indexes) and trimming overlap with a kept chunk of the
+    same page.
+    """
+    kept = []
+    seen = set()
+    for hit in hits:
+        hit_shingles = shingles(hit["content"])
+        if hit_shingles and len(hit_shingles & seen) / len(hit_shingles) >= threshold:
+            continue
+        content = hit["content"]
+        for other in kept:
+            if other.get("page") and other.get("page") == hit.get("page"):
+                content = trim_overlap(other["content"], content)
+        if not content:
+            continue
+        kept.append(dict(hit, content=content))
+        seen |= hit_shingles
+    return kept
+
+def build_context(hits, token_budget, dedupe_threshold=0.8):
+    """
+    Rank hits by reranker score, drop duplicates and pack the best ones into
+    token_budget. Returns (context, stats) where context is a list of
+    formatted "[index][doc_type] title: content" strings in rank order.
+    """
+    ranked = sorted(hits, key=lambda hit: hit.get("score") or 0.0, reverse=True)
+    unique = dedupe_hits(ranked, dedupe_threshold)
+
+    context = []
+    used = 0
+    for hit in unique:
+        text = format_hit(hit)
+        tokens = count_tokens(text)
+        if used + tokens > token_budget:
+            remaining = token_budget - used
+            if remaining < 200:
+                continue
+            text = truncate_to_tokens(text, remaining)
+            tokens = count_tokens(text)
+        context.append(text)
+        used += tokens
+
+    stats = {
+        "hits": len(hits),
+        "duplicates": len(ranked) - len(unique),
+        "packed": len(context),
+        "tokens": used
+    }
+    return context, stats
+
+def format_history(history):
+    return "\n".join([f"{role.capitalize()}: {content}" for role, content in history])
+
+def trim_history(history, token_budget):
+    """
+    Keep the most recent turns that fit in token_budget.
+    """
+    kept = []
+    used = 0
+    for turn in reversed(history):
+        tokens = count_tokens(format_history([turn]))
+        if used + tokens > token_budget:
+            break
+        kept.append(turn)
+        used += tokens
+    return list(reversed(kept))
@@ -0,0 +1,121 @@
+# conversation_memory.py
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from context_builder import count_tokens, format_history, trim_history, truncate_to_tokens
+
+SUMMARY_ROLE = "earlier conversation summary"
+
+class ConversationMemory:
+    """
+    Bounded conversation history for prompts. The last keep_turns turns stay
+    verbatim; older turns are folded into a running summary by `summarizer`
+    on a background thread after each turn, so the next question never waits
+    for it. Until a fold finishes, the unfolded turns are simply sent verbatim
+    (still capped by history_token_budget).
+
+    summarizer(summary, turns, max_tokens) must return the updated summary.
+    Folds run on `executor` when one is given (and shared with other
+    conversations), otherwise on a thread of the memory's own.
+    """
+
+    def __init__(self, summarizer, keep_turns=4, summary_token_budget=400, history_token_budget=2000, executor=None):
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.summary_token_budget = summary_token_budget
+        self.history_token_budget = history_token_budget
+        self.summary = ""
+        self.turns = []
+        self.metrics = {"requests": 0, "folds": 0, "fold_failures": 0, "dropped_turns": 0, "history_tokens": deque(maxlen=100)}
+        self._lock = threading.Lock()
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="lumina-memory")
+        self._folding = False
+        self._trimmed = 0
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def append(self, user_text, assistant_reply):
+        with self._lock:
+            self.turns.append((user_text, assistant_reply))
+            overflow_limit = self.keep_turns * 4
+            if len(self.turns) > overflow_limit:
+                dropped = len(self.turns) - overflow_limit
+                del self.turns[:dropped]
+                self._trimmed += dropped
+                self.metrics["dropped_turns"] += dropped
+            should_fold = len(self.turns) > self.keep_turns and not self._folding
+            if should_fold:
+                self._folding = True
+                self._idle.clear()
+        if should_fold:
+            self._executor.submit(self._fold)
+
+    def _fold(self):
+        folded = False
+        try:
+            folded = self._fold_overflow()
+        finally:
+            with self._lock:
+                self._folding = folded and len(self.turns) > self.keep_turns
+                if self._folding:
+                    self._executor.submit(self._fold)
+                else:
+                    self._idle.set()
+
+    def _fold_overflow(self):
+        with self._lock:
+            summary = self.summary
+            overflow = self.turns[:len(self.turns) - self.keep_turns]
+            trimmed = self._trimmed
+        if not overflow:
+            return False
+        try:
+            new_summary = self.summarizer(summary, overflow, self.summary_token_budget)
+        except Exception as e:
+            print("Warning: Could not summarize conversation history:", e)
+            with self._lock:
+                self.metrics["fold_failures"] += 1
+            return False
+        if count_tokens(new_summary) > self.summary_token_budget:
+            new_summary = truncate_to_tokens(new_summary, self.summary_token_budget)
+        with self._lock:
+            self.summary = new_summary
+            # append() may have trimmed some of the folded turns already;
+            # only the ones still at the head are left to remove.
+            del self.turns[:max(0, len(overflow) - (self._trimmed - trimmed))]
+            self.metrics["folds"] += 1
+        return True
+
+    def history_for_prompt(self):
+        """
+        Return the history to send with the next request as (role, content)
+        pairs: the running summary, if any, followed by the recent turns.
+        """
+        with self._lock:
+            summary = self.summary
+            turns = list(self.turns)
+        history = [(SUMMARY_ROLE, summary)] if summary else []
+        history += turns
+        if summary:
+            recent = trim_history(turns, max(0, self.history_token_budget - count_tokens(format_history(history[:1]))))
+            history = history[:1] + recent
+        else:
+            history = trim_history(history, self.history_token_budget)
+
+        tokens = count_tokens(format_history(history))
+        with self._lock:
+            self.metrics["requests"] += 1
+            self.metrics["history_tokens"].append(tokens)
+        return history
+
+    def close(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    def wait(self, timeout=None):
+        """
+        Block until background folding has caught up. Returns False on timeout.
+        """
+        return self._idle.wait(timeout)
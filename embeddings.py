@@ -0,0 +1,145 @@
+# embeddings.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from context_builder import count_tokens, truncate_to_tokens
+from llm_client import get_llm_client
+from config import Config
+
+config = Config()
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def embedding_key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    On-disk embedding store keyed by a hash of the model name and the exact
+    input text, so re-ingesting unchanged content never calls the API again.
+    Vectors are stored as packed float32.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)")
+        self._db.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items]
+            )
+            self._db.commit()
+
+class Embedder:
+    """
+    Batched, cached text embedder. Cache hits are answered locally; misses are
+    de-duplicated and sent in requests of at most batch_size texts and
+    batch_tokens estimated tokens. Calling the embedder with a list returns a
+    list of vectors; calling it with a single string returns one vector.
+    """
+
+    def __init__(self, client, model, cache=None, batch_size=256, batch_tokens=100000, max_input_tokens=8000):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self.max_input_tokens = max_input_tokens
+        self.stats = {"texts": 0, "cached": 0, "embedded": 0, "requests": 0}
+        self._lock = threading.Lock()
+
+    def _batches(self, texts):
+        batch = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = count_tokens(text)
+            if batch and (len(batch) >= self.batch_size or batch_tokens + tokens > self.batch_tokens):
+                yield batch
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def embed(self, texts, label="embeddings"):
+        texts = [truncate_to_tokens(text, self.max_input_tokens) if count_tokens(text) > self.max_input_tokens else text
+                 for text in texts]
+        keys = [embedding_key(self.model, text) for text in texts]
+        vectors = self.cache.get_many(set(keys)) if self.cache is not None else {}
+
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in vectors))
+        requests = 0
+        for batch in self._batches(missing):
+            embedded = self.client.embed(batch, label=label)
+            requests += 1
+            items = [(embedding_key(self.model, text), vector) for text, vector in zip(batch, embedded)]
+            vectors.update(items)
+            if self.cache is not None:
+                self.cache.put_many(items)
+
+        with self._lock:
+            self.stats["texts"] += len(texts)
+            self.stats["cached"] += len(texts) - len(missing)
+            self.stats["embedded"] += len(missing)
+            self.stats["requests"] += requests
+        return [vectors[key] for key in keys]
+
+    def __call__(self, texts):
+        if isinstance(texts, str):
+            return self.embed([texts])[0]
+        return self.embed(texts)
+
+def get_embedder():
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = Embedder(
+                get_llm_client(),
+                config.EMBEDDING_MODEL,
+                cache=EmbeddingCache(config.EMBEDDING_CACHE_PATH),
+                batch_size=config.EMBEDDING_BATCH_SIZE,
+                batch_tokens=config.EMBEDDING_BATCH_TOKENS,
+                max_input_tokens=config.EMBEDDING_MAX_INPUT_TOKENS
+            )
+        return _embedder
+
+def document_embedding_text(document):
+    return f"{document.get('title', '')}\n{document.get('content', '')}".strip()
+
+def embed_documents(documents, field):
+    """
+    Return copies of documents with `field` set to the embedding of their
+    title and content, computed in batches through the shared embedder.
+    """
+    vectors = get_embedder().embed([document_embedding_text(doc) for doc in documents], label=f"embeddings for {len(documents)} document(s)")
+    return [dict(doc, **{field: vector}) for doc, vector in zip(documents, vectors)]
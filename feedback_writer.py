@@ -0,0 +1,329 @@
+# feedback_writer.py
+
+import atexit
+import json
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from config import Config
+
+config = Config()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+MAX_APPEND_BLOCK_BYTES = 4 * 1024 * 1024
+REACTIONS_PREFIX = "feedback/reactions/"
+LEGACY_REACTION_STATS_BLOB = "feedback-reaction-stats.json"
+
+class FeedbackWriter:
+    """
+    Uploads feedback and telemetry from a background thread so the console
+    never waits on Blob Storage.
+
+    Records are JSON lines appended to one append blob per session and day
+    (feedback/<kind>/<date>/<session>.jsonl), a batch per blob per flush.
+    Thumbs up/down are counted in memory and the pending counts are folded
+    in the background into one of a fixed set of counter shards
+    (feedback/reactions/shard-<n>.json), picked at random and updated with
+    an ETag check, so concurrent users rarely contend on a blob and never
+    lose an update; reaction_stats() sums the shards.
+    """
+
+    def __init__(self, container_name, connection_string=None, flush_interval=2.0, batch_size=100,
+                 max_retries=3, queue_size=10000, container_client=None, shards=8):
+        self.container_name = container_name
+        self.connection_string = connection_string
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.shards = shards
+        self.stats = {"queued": 0, "written": 0, "failed": 0, "dropped": 0, "appends": 0,
+                      "counter_writes": 0, "counter_conflicts": 0, "counter_failures": 0}
+        self._container = container_client
+        self._container_ready = container_client is not None
+        self._append_blobs = set()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending_counts = {"thumbs_up": 0, "thumbs_down": 0}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def _container_client(self):
+        if self._container is None:
+            from azure.storage.blob import BlobServiceClient
+            service = BlobServiceClient.from_connection_string(self.connection_string or config.AZURE_STORAGE_CONNECTION_STRING)
+            self._container = service.get_container_client(self.container_name)
+        if not self._container_ready:
+            from azure.core.exceptions import ResourceExistsError
+            try:
+                self._container.create_container()
+            except ResourceExistsError:
+                pass
+            self._container_ready = True
+        return self._container
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="lumina-feedback", daemon=True)
+                self._thread.start()
+
+    def _put(self, item):
+        self._start()
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            return False
+
+    def record(self, kind, session_id, data):
+        """
+        Queue one record for the session's append blob of this kind. Returns
+        False if the queue is full or the writer has been closed.
+        """
+        if self._closed:
+            return False
+        entry = {"timestamp": datetime.now(timezone.utc).isoformat(), "type": kind, **data}
+        if not self._put((kind, session_id, entry)):
+            return False
+        with self._lock:
+            self.stats["queued"] += 1
+        return True
+
+    def record_reaction(self, feedback_type):
+        counter = {"positive": "thumbs_up", "negative": "thumbs_down"}.get(feedback_type)
+        if counter is None or self._closed:
+            return False
+        with self._lock:
+            self._pending_counts[counter] += 1
+        self._start()
+        return True
+
+    def flush(self, timeout=None):
+        """
+        Wait until everything queued so far has been written. Returns False
+        on timeout.
+        """
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        if not self._put(done):
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"Warning: Feedback upload did not finish; {self._queue.qsize()} item(s) not written.")
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch
+            records = [item for item in batch if isinstance(item, tuple)]
+            try:
+                if records:
+                    self._write_records(records)
+                self._write_counts()
+            except Exception as e:
+                print(f"Error uploading feedback: {e}")
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _retry(self, action, description):
+        for attempt in range(self.max_retries):
+            try:
+                return action()
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    print(f"Error uploading {description}: {e}")
+                    raise
+                time.sleep(0.5 * (2 ** attempt))
+
+    def _blob_name(self, kind, session_id, timestamp):
+        return f"feedback/{kind}/{timestamp[:10]}/{session_id}.jsonl"
+
+    def _write_records(self, records):
+        by_blob = {}
+        for kind, session_id, entry in records:
+            by_blob.setdefault(self._blob_name(kind, session_id, entry["timestamp"]), []).append(entry)
+        for blob_name, entries in by_blob.items():
+            try:
+                for block in self._blocks(entries):
+                    self._retry(lambda: self._append(blob_name, block), blob_name)
+                    with self._lock:
+                        self.stats["appends"] += 1
+            except Exception:
+                with self._lock:
+                    self.stats["failed"] += len(entries)
+                continue
+            with self._lock:
+                self.stats["written"] += len(entries)
+
+    def _blocks(self, entries):
+        block = b""
+        for entry in entries:
+            line = (json.dumps(entry) + "\n").encode("utf-8")
+            if block and len(block) + len(line) > MAX_APPEND_BLOCK_BYTES:
+                yield block
+                block = b""
+            block += line
+        if block:
+            yield block
+
+    def _append(self, blob_name, data):
+        from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+        blob_client = self._container_client().get_blob_client(blob_name)
+        if blob_name not in self._append_blobs:
+            try:
+                blob_client.create_append_blob(if_none_match="*")
+            except (ResourceExistsError, ResourceModifiedError):
+                pass
+            self._append_blobs.add(blob_name)
+        try:
+            blob_client.append_block(data)
+        except ResourceNotFoundError:
+            self._append_blobs.discard(blob_name)
+            raise
+
+    def _shard_name(self, shard):
+        return f"{REACTIONS_PREFIX}shard-{shard}.json"
+
+    def _add_to_shard(self, counts, blob_name=None):
+        """
+        Add counts to a counter shard (a random one unless blob_name is
+        given), re-reading and retrying when another writer updated it first.
+        Returns False if every attempt lost the race.
+        """
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+        container = self._container_client()
+        for _ in range(self.max_retries * 2):
+            blob_client = container.get_blob_client(blob_name or self._shard_name(random.randrange(self.shards)))
+            try:
+                downloader = blob_client.download_blob()
+                shard = json.loads(downloader.readall())
+                etag = downloader.properties.etag
+            except ResourceNotFoundError:
+                shard, etag = {}, None
+            for key, value in counts.items():
+                shard[key] = shard.get(key, 0) + value
+            shard["last_updated"] = datetime.now(timezone.utc).isoformat()
+            try:
+                if etag is None:
+                    blob_client.upload_blob(json.dumps(shard), overwrite=False)
+                else:
+                    blob_client.upload_blob(json.dumps(shard), overwrite=True, etag=etag, match_condition=MatchConditions.IfNotModified)
+                return True
+            except (ResourceExistsError, ResourceModifiedError):
+                with self._lock:
+                    self.stats["counter_conflicts"] += 1
+                continue
+        return False
+
+    def _write_counts(self):
+        with self._lock:
+            counts = {key: value for key, value in self._pending_counts.items() if value}
+        if not counts:
+            return
+        try:
+            written = self._add_to_shard(counts)
+        except Exception as e:
+            print(f"Error uploading feedback counters: {e}")
+            written = False
+        if not written:
+            with self._lock:
+                self.stats["counter_failures"] += 1
+            return
+        with self._lock:
+            for key, value in counts.items():
+                self._pending_counts[key] -= value
+            self.stats["counter_writes"] += 1
+
+    def reaction_stats(self):
+        """
+        Sum the counter shards, plus the totals in the old single stats blob
+        written before counters were sharded. Per-process shards left by
+        earlier versions are folded into a fixed shard and deleted.
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        container = self._container_client()
+        fixed = {self._shard_name(shard) for shard in range(self.shards)}
+        for blob in container.list_blobs(name_starts_with=REACTIONS_PREFIX):
+            if blob.name not in fixed:
+                self._compact_shard(blob.name)
+
+        totals = {"thumbs_up": 0, "thumbs_down": 0, "shards": 0}
+        for name in sorted(fixed) + [LEGACY_REACTION_STATS_BLOB]:
+            try:
+                shard = json.loads(container.get_blob_client(name).download_blob().readall())
+            except ResourceNotFoundError:
+                continue
+            totals["thumbs_up"] += shard.get("thumbs_up", 0)
+            totals["thumbs_down"] += shard.get("thumbs_down", 0)
+            totals["shards"] += 1
+        return totals
+
+    def _compact_shard(self, blob_name):
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+        blob_client = self._container_client().get_blob_client(blob_name)
+        try:
+            downloader = blob_client.download_blob()
+            shard = json.loads(downloader.readall())
+            etag = downloader.properties.etag
+            counts = {key: shard.get(key, 0) for key in ("thumbs_up", "thumbs_down")}
+            # Delete first (only if unchanged) so a concurrent compaction
+            # cannot count the same shard twice.
+            blob_client.delete_blob(etag=etag, match_condition=MatchConditions.IfNotModified)
+        except (ResourceNotFoundError, ResourceModifiedError):
+            return
+        try:
+            written = self._add_to_shard(counts)
+        except Exception as e:
+            print(f"Error compacting feedback counters: {e}")
+            written = False
+        if not written:
+            with self._lock:
+                for key, value in counts.items():
+                    self._pending_counts[key] += value
+            self._start()
+
+def get_feedback_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = FeedbackWriter(
+                config.AZURE_STORAGE_CONTAINER_NAME,
+                flush_interval=config.FEEDBACK_FLUSH_INTERVAL,
+                batch_size=config.FEEDBACK_BATCH_SIZE,
+                max_retries=config.FEEDBACK_MAX_RETRIES,
+                queue_size=config.FEEDBACK_QUEUE_SIZE,
+                shards=config.FEEDBACK_REACTION_SHARDS
+            )
+            atexit.register(_writer.close, config.FEEDBACK_FLUSH_TIMEOUT)
+        return _writer
@@ -0,0 +1,142 @@
+# html_extract.py
+
+from importlib.util import find_spec
+from config import Config
+
+config = Config()
+
+UNWANTED_TAGS = ['nav', 'header', 'footer', 'aside', 'script', 'style']
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+def available_parsers():
+    # Detected without importing, so parsers load only when a page is extracted.
+    parsers = []
+    if find_spec("selectolax.lexbor") is not None:
+        parsers.append("selectolax")
+    if find_spec("lxml") is not None:
+        parsers.append("lxml")
+    parsers.append("html.parser")
+    return parsers
+
+def default_parser():
+    if config.HTML_PARSER and config.HTML_PARSER in available_parsers():
+        return config.HTML_PARSER
+    return available_parsers()[0]
+
+def normalize_lines(text):
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+def extract_with_soup(html, parser):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, parser)
+    title = soup.title.get_text().strip() if soup.title else ""
+    article = soup.find('article', id="_content")
+    sections = []
+
+    if article:
+        for unwanted in article.find_all(UNWANTED_TAGS):
+            unwanted.decompose()
+        content = article.get_text(separator="\n")
+        h2_containers = article.find_all("div", class_=lambda x: x and "h2-container" in x)
+        if h2_containers:
+            for i, container in enumerate(h2_containers):
+                h_heading = container.find(HEADING_TAGS)
+                sec_title = h_heading.get_text(strip=True) if h_heading else f"Section {i+1}"
+                if h_heading:
+                    h_heading.decompose()
+                sections.append({"title": sec_title, "content": container.get_text(separator="\n", strip=True)})
+        else:
+            headings = article.find_all(HEADING_TAGS)
+            for i, heading in enumerate(headings):
+                content_parts = []
+                for sibling in heading.find_next_siblings():
+                    if sibling.name in HEADING_TAGS:
+                        break
+                    text = sibling.get_text(separator=" ", strip=True)
+                    if text:
+                        content_parts.append(text)
+                sections.append({"title": heading.get_text(strip=True) or f"Section {i+1}", "content": "\n".join(content_parts).strip()})
+            if not headings:
+                sections.append({"title": "Untitled Section", "content": content.strip()})
+    else:
+        texts = [p.get_text(separator=" ", strip=True) for p in soup.find_all('p')]
+        texts = [text for text in texts if text]
+        content = "\n".join(texts) if texts else soup.get_text(separator="\n")
+        sections = [{"title": f"Section {i+1}", "content": text} for i, text in enumerate(texts)]
+        if not sections:
+            sections.append({"title": "Untitled Section", "content": content.strip()})
+
+    soup.decompose()
+    return title, content, sections
+
+def node_text(node, separator="", strip=False):
+    """
+    Join a selectolax node's text nodes the way BeautifulSoup's get_text does,
+    so both backends produce the same sections.
+    """
+    strings = [child.text_content for child in node.traverse(include_text=True) if child.tag == "-text"]
+    if strip:
+        strings = [text.strip() for text in strings]
+        strings = [text for text in strings if text]
+    return separator.join(strings)
+
+def extract_with_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
+    title_node = tree.css_first("title")
+    title = node_text(title_node).strip() if title_node else ""
+    article = tree.css_first('article#_content')
+    sections = []
+
+    if article:
+        for unwanted in article.css(", ".join(UNWANTED_TAGS)):
+            unwanted.decompose()
+        content = node_text(article, "\n")
+        h2_containers = article.css('div[class*="h2-container"]')
+        if h2_containers:
+            for i, container in enumerate(h2_containers):
+                h_heading = container.css_first(", ".join(HEADING_TAGS))
+                sec_title = node_text(h_heading, strip=True) if h_heading else f"Section {i+1}"
+                if h_heading:
+                    h_heading.decompose()
+                sections.append({"title": sec_title, "content": node_text(container, "\n", strip=True)})
+        else:
+            headings = article.css(", ".join(HEADING_TAGS))
+            for i, heading in enumerate(headings):
+                content_parts = []
+                sibling = heading.next
+                while sibling is not None:
+                    if sibling.tag in HEADING_TAGS:
+                        break
+                    if not sibling.tag.startswith(("-", "_")):
+                        text = node_text(sibling, " ", strip=True)
+                        if text:
+                            content_parts.append(text)
+                    sibling = sibling.next
+                sections.append({"title": node_text(heading, strip=True) or f"Section {i+1}", "content": "\n".join(content_parts).strip()})
+            if not headings:
+                sections.append({"title": "Untitled Section", "content": content.strip()})
+    else:
+        texts = [node_text(p, " ", strip=True) for p in tree.css('p')]
+        texts = [text for text in texts if text]
+        body = tree.body or tree.root
+        content = "\n".join(texts) if texts else (node_text(body, "\n") if body else "")
+        sections = [{"title": f"Section {i+1}", "content": text} for i, text in enumerate(texts)]
+        if not sections:
+            sections.append({"title": "Untitled Section", "content": content.strip()})
+
+    return title, content, sections
+
+def extract_page(html, parser=None):
+    """
+    Parse the page once and return its title, main content and sections
+    (the main <article id="_content"> split on h2 containers or headings,
+    falling back to paragraphs). Uses selectolax when installed, then
+    BeautifulSoup with lxml, then html.parser; HTML_PARSER pins one.
+    """
+    parser = parser or default_parser()
+    if parser == "selectolax":
+        title, content, sections = extract_with_selectolax(html)
+    else:
+        title, content, sections = extract_with_soup(html, parser)
+    return {"title": title, "content": normalize_lines(content), "sections": sections}
@@ -0,0 +1,166 @@
+# ingest_jobs.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import Config
+
+config = Config()
+
+_queue = None
+_queue_lock = threading.Lock()
+
+UNFINISHED_STATUSES = ("pending", "running")
+
+class JobQueue:
+    """
+    Durable record of ingestion work, one row per (kind, item) such as
+    ("url", "https://...") or ("transcript", "MeetingTranscripts/x.vtt"), with
+    its status (pending, running, done, failed), the last stage it completed,
+    and a JSON checkpoint of the latest checkpointed stage's output. Rows
+    still pending or running after a crash are picked up by resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "kind TEXT NOT NULL, item TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, "
+            "checkpoint_stage TEXT, checkpoint TEXT, attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (kind, item))"
+        )
+        self._db.commit()
+
+    def _update(self, kind, item, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE kind = ? AND item = ?", (*fields.values(), kind, item))
+            self._db.commit()
+
+    def enqueue(self, kind, items):
+        """
+        Add items as pending. Finished or failed items are reset so they run
+        again from the start; unfinished ones keep their checkpoint.
+        """
+        now = time.time()
+        with self._lock:
+            for item in items:
+                self._db.execute(
+                    "INSERT INTO jobs (kind, item, status, created_at, updated_at) VALUES (?, ?, 'pending', ?, ?) "
+                    "ON CONFLICT (kind, item) DO UPDATE SET status = 'pending', stage = NULL, checkpoint_stage = NULL, "
+                    "checkpoint = NULL, error = NULL, updated_at = excluded.updated_at WHERE status IN ('done', 'failed')",
+                    (kind, item, now, now)
+                )
+            self._db.commit()
+
+    def unfinished(self, kind):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT item FROM jobs WHERE kind = ? AND status IN (?, ?) ORDER BY created_at",
+                (kind, *UNFINISHED_STATUSES)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def retry_failed(self, kind=None):
+        """
+        Put failed items back to pending, keeping their checkpoint so they
+        resume after the last checkpointed stage. Returns how many were reset.
+        """
+        query = "UPDATE jobs SET status = 'pending', updated_at = ? WHERE status = 'failed'"
+        params = [time.time()]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            count = self._db.execute(query, params).rowcount
+            self._db.commit()
+        return count
+
+    def checkpoint(self, kind, item):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT checkpoint_stage, checkpoint FROM jobs WHERE kind = ? AND item = ?", (kind, item)
+            ).fetchone()
+        if not row or row[0] is None:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def mark_running(self, kind, item):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, error = NULL, updated_at = ? WHERE kind = ? AND item = ?",
+                (time.time(), kind, item)
+            )
+            self._db.commit()
+
+    def record_stage(self, kind, item, stage, value=None, checkpoint=False):
+        if checkpoint:
+            self._update(kind, item, stage=stage, checkpoint_stage=stage, checkpoint=json.dumps(value))
+        else:
+            self._update(kind, item, stage=stage)
+
+    def mark_done(self, kind, item):
+        self._update(kind, item, status="done", checkpoint_stage=None, checkpoint=None)
+
+    def mark_failed(self, kind, item, error):
+        self._update(kind, item, status="failed", error=str(error)[:1000])
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        counts = {}
+        for kind, status, count in rows:
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def failures(self, limit=10):
+        with self._lock:
+            return self._db.execute(
+                "SELECT kind, item, stage, attempts, error FROM jobs WHERE status = 'failed' ORDER BY updated_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+class JobJournal:
+    """
+    Connects run_pipeline to a JobQueue for one kind of item: each item
+    starts after its last checkpointed stage, and every completed stage,
+    failure and finish is recorded as it happens.
+    """
+
+    def __init__(self, queue, kind, checkpoint_stages=()):
+        self.queue = queue
+        self.kind = kind
+        self.checkpoint_stages = set(checkpoint_stages)
+
+    def resume(self, item, stages):
+        self.queue.mark_running(self.kind, item)
+        stage_name, value = self.queue.checkpoint(self.kind, item)
+        names = [stage.name for stage in stages]
+        if stage_name in names:
+            print(f"Resuming {item} after the {stage_name} stage")
+            return names.index(stage_name) + 1, value
+        return 0, item
+
+    def stage_done(self, item, stage, value):
+        self.queue.record_stage(self.kind, item, stage.name, value, checkpoint=stage.name in self.checkpoint_stages)
+
+    def failed(self, item, error):
+        self.queue.mark_failed(self.kind, item, error)
+
+    def done(self, item):
+        self.queue.mark_done(self.kind, item)
+
+def get_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(config.INGEST_JOBS_PATH)
+        return _queue
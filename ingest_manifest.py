@@ -0,0 +1,135 @@
+# ingest_manifest.py
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from config import Config
+
+config = Config()
+
+PENDING = "pending"
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def hash_stream(pieces):
+    digest = hashlib.sha256()
+    for piece in pieces:
+        digest.update(piece.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+class IngestManifest:
+    """
+    Local record of what has already been ingested, one entry per URL or file:
+
+        {"content_hash": ..., "validators": {...}, "updated_at": ...,
+         "chunks": {chunk_hash: {index_name: [doc ids]}}}
+
+    Ingestion compares against it before any LLM call so unchanged sources
+    and chunks are skipped, and uses the stored IDs to delete documents for
+    chunks that no longer exist. A chunk whose generation failed is stored
+    with "pending": True (and the source without a content hash), so its
+    documents can still be cleaned up but it is regenerated next time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.sources = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.sources = json.load(f).get("sources", {})
+            except Exception as e:
+                print(f"Warning: Could not read ingestion manifest '{path}', starting fresh:", e)
+
+    def get(self, source):
+        with self._lock:
+            record = self.sources.get(source)
+            return json.loads(json.dumps(record)) if record else None
+
+    def is_unchanged(self, source, content_hash=None, validators=None):
+        record = self.get(source)
+        if not record:
+            return False
+        if validators and record.get("validators") == validators:
+            return True
+        return content_hash is not None and record.get("content_hash") == content_hash
+
+    def update(self, source, content_hash, chunks, validators=None):
+        with self._lock:
+            self.sources[source] = {
+                "content_hash": content_hash,
+                "validators": validators or {},
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+                "chunks": chunks
+            }
+            self._save()
+
+    def remove(self, source):
+        with self._lock:
+            if self.sources.pop(source, None) is not None:
+                self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sources": self.sources}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class ChunkPlan:
+    """
+    Decide chunk by chunk, as a chunker yields them, which chunks need
+    regenerating. add() returns (chunk_hash, is_new); chunks already in the
+    previous record, or repeated within this source, are not new. Once the
+    chunk stream is exhausted, `kept` maps unchanged chunk hashes to their
+    stored doc IDs and stale() maps index names to the IDs of chunks that
+    disappeared.
+    """
+
+    def __init__(self, previous):
+        self.previous_chunks = (previous or {}).get("chunks", {})
+        self.kept = {}
+        self.seen = set()
+        self.total = 0
+        self.changed = 0
+
+    def add(self, chunk):
+        chunk_hash = hash_text(chunk)
+        self.total += 1
+        if chunk_hash in self.seen:
+            return chunk_hash, False
+        self.seen.add(chunk_hash)
+        previous = self.previous_chunks.get(chunk_hash)
+        if previous is not None and not previous.get(PENDING):
+            self.kept[chunk_hash] = previous
+            return chunk_hash, False
+        self.changed += 1
+        return chunk_hash, True
+
+    def stale(self):
+        stale = {}
+        for chunk_hash, docs in self.previous_chunks.items():
+            # Chunks still present are kept or regenerated under the same IDs.
+            if chunk_hash in self.seen:
+                continue
+            for index_name, ids in docs.items():
+                if index_name != PENDING:
+                    stale.setdefault(index_name, []).extend(ids)
+        return stale
+
+def get_ingest_manifest():
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = IngestManifest(config.INGEST_MANIFEST_PATH)
+        return _manifest
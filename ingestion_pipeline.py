@@ -0,0 +1,84 @@
+# ingestion_pipeline.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+class Stage:
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = workers
+
+def run_pipeline(items, stages, label="item", journal=None):
+    """
+    Push every item through the stages in order. Each stage has its own worker
+    limit, so one item can be generating Q&A while the next is still being
+    scraped, and an exception only drops the item it was raised for.
+
+    Every stage function is called as func(item, value), where value is the
+    previous stage's return value (the item itself for the first stage).
+
+    With a journal (see ingest_jobs.JobJournal) each item resumes after its
+    last checkpointed stage and progress is recorded stage by stage.
+    """
+    limits = {stage.name: threading.BoundedSemaphore(stage.workers) for stage in stages}
+    lock = threading.Lock()
+    summary = {
+        "total": len(items),
+        "succeeded": 0,
+        "failed": 0,
+        "failures": {},
+        "results": {},
+        "stage_seconds": {stage.name: 0.0 for stage in stages},
+        "elapsed": 0.0
+    }
+
+    def process(item):
+        start_index, value = journal.resume(item, stages) if journal else (0, item)
+        for stage in stages[start_index:]:
+            with limits[stage.name]:
+                start = time.perf_counter()
+                try:
+                    value = stage.func(item, value)
+                except Exception as e:
+                    error = RuntimeError(f"{stage.name} stage failed: {e}")
+                    if journal:
+                        journal.failed(item, error)
+                    raise error from e
+                finally:
+                    with lock:
+                        summary["stage_seconds"][stage.name] += time.perf_counter() - start
+            if journal:
+                journal.stage_done(item, stage, value)
+        if journal:
+            journal.done(item)
+        return value
+
+    start = time.perf_counter()
+    max_workers = max(1, sum(stage.workers for stage in stages))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lumina-ingest") as executor:
+        futures = {executor.submit(process, item): item for item in items}
+        for done, future in enumerate(as_completed(futures), start=1):
+            item = futures[future]
+            try:
+                summary["results"][item] = future.result()
+                summary["succeeded"] += 1
+                print(f"[{done}/{len(items)}] Finished {label} {item}")
+            except Exception as e:
+                summary["failed"] += 1
+                summary["failures"][item] = str(e)
+                print(f"[{done}/{len(items)}] Failed {label} {item}: {e}")
+
+    summary["elapsed"] = time.perf_counter() - start
+    return summary
+
+def print_pipeline_summary(summary, label="item"):
+    elapsed = summary["elapsed"]
+    rate = summary["total"] / elapsed * 60 if elapsed else 0.0
+    print(f"\nProcessed {summary['total']} {label}(s) in {elapsed:.1f}s ({rate:.1f}/min): "
+          f"{summary['succeeded']} succeeded, {summary['failed']} failed.")
+    for name, seconds in summary["stage_seconds"].items():
+        print(f"  {name}: {seconds:.1f}s total")
+    for item, error in summary["failures"].items():
+        print(f"  Failed {item}: {error}")
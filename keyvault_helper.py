@@ -1,11 +1,133 @@
 # keyvault_helper.py
 
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 KEYVAULT_URI = "https://antarestest.vault.azure.net"
-credential = DefaultAzureCredential()
-kv_client = SecretClient(vault_url=KEYVAULT_URI, credential=credential)
+
+_kv_client = None
+_secrets = {}
+_registered = []
+_cache_loaded = False
+_lock = threading.Lock()
+
+def register_secret(name):
+    """
+    Declare a secret the app will need, so the first get_secret fetches it
+    together with every other registered secret instead of one at a time.
+    """
+    if name not in _registered:
+        _registered.append(name)
+
+def get_kv_client():
+    global _kv_client
+    if _kv_client is None:
+        from azure.identity import DefaultAzureCredential
+        from azure.keyvault.secrets import SecretClient
+        _kv_client = SecretClient(vault_url=KEYVAULT_URI, credential=DefaultAzureCredential())
+    return _kv_client
+
+def secret_cache_settings():
+    # Imported here because config.py imports this module.
+    from config import Config
+    return Config.SECRET_CACHE_ENABLED and sys.platform == "win32", Config.SECRET_CACHE_PATH, Config.SECRET_CACHE_TTL
+
+def dpapi(data, protect):
+    """
+    Encrypt or decrypt bytes with Windows DPAPI for the current user, so the
+    secret cache can only be read back by the same account on this machine.
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    class DataBlob(ctypes.Structure):
+        _fields_ = [("cbData", wintypes.DWORD), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+    buffer = ctypes.create_string_buffer(data, len(data))
+    blob_in = DataBlob(len(data), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+    blob_out = DataBlob()
+    crypt = ctypes.windll.crypt32.CryptProtectData if protect else ctypes.windll.crypt32.CryptUnprotectData
+    if not crypt(ctypes.byref(blob_in), None, None, None, None, 0x1, ctypes.byref(blob_out)):
+        raise ctypes.WinError()
+    try:
+        return ctypes.string_at(blob_out.pbData, blob_out.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(blob_out.pbData)
+
+def load_secret_cache():
+    enabled, path, _ = secret_cache_settings()
+    if not enabled or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as f:
+            cached = json.loads(dpapi(f.read(), protect=False).decode("utf-8"))
+    except Exception as e:
+        print("Warning: Could not read the secret cache; fetching from Key Vault.", e)
+        return {}
+    if cached.get("vault") != KEYVAULT_URI or cached.get("expires_at", 0) < time.time():
+        return {}
+    return cached.get("secrets", {})
+
+def save_secret_cache(secrets):
+    enabled, path, ttl = secret_cache_settings()
+    if not enabled:
+        return
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = json.dumps({"vault": KEYVAULT_URI, "expires_at": time.time() + ttl, "secrets": secrets})
+        with open(path, "wb") as f:
+            f.write(dpapi(payload.encode("utf-8"), protect=True))
+    except Exception as e:
+        print("Warning: Could not write the secret cache:", e)
+
+def clear_secret_cache():
+    global _cache_loaded
+    _, path, _ = secret_cache_settings()
+    with _lock:
+        _secrets.clear()
+        _cache_loaded = False
+        if os.path.exists(path):
+            os.remove(path)
+
+def fetch_secrets(names):
+    client = get_kv_client()
+    with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="lumina-keyvault") as executor:
+        futures = {name: executor.submit(client.get_secret, name) for name in names}
+    fetched = {}
+    errors = {}
+    for name, future in futures.items():
+        try:
+            fetched[name] = future.result().value
+        except Exception as e:
+            errors[name] = e
+    return fetched, errors
 
 def get_secret(name):
-    return kv_client.get_secret(name).value
\ No newline at end of file
+    """
+    Return a Key Vault secret. Nothing is contacted until the first call,
+    which loads the encrypted local cache (if enabled and not expired) or
+    else fetches every registered secret concurrently.
+    """
+    global _cache_loaded
+    with _lock:
+        if name in _secrets:
+            return _secrets[name]
+        if not _cache_loaded:
+            _secrets.update(load_secret_cache())
+            _cache_loaded = True
+            if name in _secrets:
+                return _secrets[name]
+        names = [name] + [other for other in _registered if other != name and other not in _secrets]
+        fetched, errors = fetch_secrets(names)
+        _secrets.update(fetched)
+        if fetched:
+            save_secret_cache(dict(_secrets))
+        if name in errors:
+            raise errors[name]
+        return _secrets[name]
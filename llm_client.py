@@ -0,0 +1,304 @@
+# llm_client.py
+
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import TokenBucket
+from config import Config
+
+config = Config()
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+class LLMError(Exception):
+    pass
+
+def parse_retry_after(response, default=None):
+    """
+    Read the server's retry hint from the retry-after-ms / retry-after headers,
+    falling back to the "retry after N seconds" text in the error body.
+    """
+    headers = response.headers or {}
+    try:
+        return float(headers.get("retry-after-ms")) / 1000
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    try:
+        error_msg = response.json().get("error", {}).get("message", "")
+        match = re.search(r"after (\d+) seconds", error_msg)
+        if match:
+            return float(match.group(1))
+    except Exception:
+        pass
+    return default
+
+def estimate_tokens(messages, max_tokens=0):
+    return sum(len(message.get("content") or "") for message in messages) // 4 + max_tokens
+
+def estimate_payload_tokens(payload):
+    if "input" in payload:
+        return sum(len(text) for text in payload["input"]) // 4
+    return estimate_tokens(payload["messages"], payload.get("max_tokens", 0))
+
+class LLMClient:
+    """
+    Chat completions client shared by every caller in the process. It keeps
+    one pooled keep-alive session, caps in-flight requests with a semaphore,
+    paces calls against request- and token-per-minute budgets, and retries
+    429/5xx/connection errors with exponential backoff that honours Retry-After.
+    """
+
+    def __init__(self, endpoint, api_key, deployment, timeout=(10, 120), max_retries=4, backoff=2.0,
+                 max_concurrency=8, requests_per_minute=60, tokens_per_minute=80000, embedding_endpoint=None):
+        self.endpoint = endpoint
+        self.embedding_endpoint = embedding_endpoint
+        self.api_key = api_key
+        self.deployment = deployment
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.request_limiter = TokenBucket(requests_per_minute)
+        self.token_limiter = TokenBucket(tokens_per_minute)
+        self.metrics = {
+            "calls": 0, "failures": 0, "retries": 0, "rate_limited": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0
+        }
+        self.recent_calls = deque(maxlen=200)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json", "api-key": api_key})
+
+    def _wait_before_retry(self, attempt, retry_after=None):
+        delay = retry_after if retry_after is not None else min(self.backoff * 2 ** attempt, 60)
+        if retry_after is not None:
+            self.request_limiter.pause(delay)
+        time.sleep(delay)
+
+    def _record(self, label, status, attempts, started, usage=None, first_token=None):
+        usage = usage or {}
+        call = {
+            "label": label,
+            "status": status,
+            "attempts": attempts,
+            "latency": time.perf_counter() - started,
+            "time_to_first_token": first_token - started if first_token else None,
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0)
+        }
+        with self._lock:
+            self.metrics["calls"] += 1
+            self.metrics["retries"] += attempts - 1
+            self.metrics["latency"] += call["latency"]
+            self.metrics["prompt_tokens"] += call["prompt_tokens"]
+            self.metrics["completion_tokens"] += call["completion_tokens"]
+            if status != 200:
+                self.metrics["failures"] += 1
+            self.recent_calls.append(call)
+        return call
+
+    def _post(self, payload, label, max_retries, stream=False, endpoint=None):
+        """
+        Send the request, retrying transient failures, and return the first
+        successful response along with the number of attempts it took.
+        """
+        endpoint = endpoint or self.endpoint
+        estimated = estimate_payload_tokens(payload)
+        status = None
+        for attempt in range(max_retries + 1):
+            self.request_limiter.acquire()
+            self.token_limiter.acquire(estimated)
+            retry_after = None
+            try:
+                response = self.session.post(endpoint, json=payload, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                status = type(e).__name__
+                print(f"LLM request failed for {label} ({status}); retrying...")
+            else:
+                status = response.status_code
+                if status == 200:
+                    return response, attempt + 1
+                if status == 429:
+                    with self._lock:
+                        self.metrics["rate_limited"] += 1
+                    retry_after = parse_retry_after(response, default=self.backoff * 2 ** attempt)
+                    print(f"Rate limit exceeded for {label}. Pausing LLM requests for {retry_after:.1f} seconds...")
+                elif status not in RETRYABLE_STATUSES:
+                    raise LLMError(f"LLM request for {label} failed with {status}: {response.text[:500]}")
+                else:
+                    retry_after = parse_retry_after(response)
+                    print(f"LLM request for {label} failed with {status}; retrying...")
+                response.close()
+            if attempt < max_retries:
+                self._wait_before_retry(attempt, retry_after)
+        raise LLMError(f"Max retries reached for {label} (last status: {status})")
+
+    def chat(self, messages, max_tokens=1000, label="chat", max_retries=None, **options):
+        """
+        Send a chat completion and return the parsed JSON response.
+        Raises LLMError once retries are exhausted or on a non-retryable status.
+        """
+        payload = {"model": self.deployment, "messages": messages, "max_tokens": max_tokens, **options}
+        max_retries = self.max_retries if max_retries is None else max_retries
+        started = time.perf_counter()
+        attempts = 0
+        with self._semaphore:
+            try:
+                response, attempts = self._post(payload, label, max_retries)
+                response_json = response.json()
+            except Exception:
+                self._record(label, "error", max(attempts, 1), started)
+                raise
+        self._record(label, 200, attempts, started, response_json.get("usage"))
+        return response_json
+
+    def chat_text(self, messages, max_tokens=1000, label="chat", **options):
+        response_json = self.chat(messages, max_tokens=max_tokens, label=label, **options)
+        return (response_json.get("choices") or [{}])[0].get("message", {}).get("content") or ""
+
+    def embed(self, texts, label="embeddings", max_retries=None):
+        """
+        Embed a batch of texts with the embeddings deployment and return one
+        vector per text, in input order.
+        """
+        if not self.embedding_endpoint:
+            raise LLMError("No embeddings endpoint is configured")
+        max_retries = self.max_retries if max_retries is None else max_retries
+        started = time.perf_counter()
+        attempts = 0
+        with self._semaphore:
+            try:
+                response, attempts = self._post({"input": list(texts)}, label, max_retries, endpoint=self.embedding_endpoint)
+                response_json = response.json()
+            except Exception:
+                self._record(label, "error", max(attempts, 1), started)
+                raise
+        self._record(label, 200, attempts, started, response_json.get("usage"))
+        data = sorted(response_json.get("data") or [], key=lambda item: item["index"])
+        if len(data) != len(texts):
+            raise LLMError(f"Embeddings for {label} returned {len(data)} vector(s) for {len(texts)} input(s)")
+        return [item["embedding"] for item in data]
+
+    def stream(self, messages, max_tokens=1000, label="stream", **options):
+        """
+        Stream a chat completion as server-sent events and yield each content
+        delta. Retries only happen before the first byte of the response.
+        """
+        payload = {"model": self.deployment, "messages": messages, "max_tokens": max_tokens, "stream": True, **options}
+        started = time.perf_counter()
+        first_token = None
+        attempts = 0
+        status = "error"
+        with self._semaphore:
+            try:
+                response, attempts = self._post(payload, label, self.max_retries, stream=True)
+                try:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            event = json.loads(data)
+                        except Exception as e:
+                            print("Error parsing streamed LLM event:", e)
+                            continue
+                        choices = event.get("choices") or [{}]
+                        token = choices[0].get("delta", {}).get("content")
+                        if not token:
+                            continue
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        yield token
+                    status = 200
+                finally:
+                    response.close()
+            finally:
+                self._record(label, status, max(attempts, 1), started, first_token=first_token)
+
+class AsyncLLMClient:
+    """
+    asyncio front end over the shared LLMClient. Calls run in worker threads,
+    so async callers share the same connection pool, concurrency cap and
+    rate budgets as synchronous ones.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def chat(self, messages, max_tokens=1000, label="chat", **options):
+        return await asyncio.to_thread(self.client.chat, messages, max_tokens, label, **options)
+
+    async def chat_text(self, messages, max_tokens=1000, label="chat", **options):
+        return await asyncio.to_thread(self.client.chat_text, messages, max_tokens, label, **options)
+
+    async def embed(self, texts, label="embeddings"):
+        return await asyncio.to_thread(self.client.embed, texts, label)
+
+    async def stream(self, messages, max_tokens=1000, label="stream", **options):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for token in self.client.stream(messages, max_tokens, label, **options):
+                    loop.call_soon_threadsafe(queue.put_nowait, token)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(None, produce)
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        await producer
+
+def get_llm_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(
+                config.AZURE_OPENAI_ENDPOINT,
+                config.AZURE_OPENAI_API_KEY,
+                config.DEPLOYMENT_NAME,
+                timeout=(config.LLM_CONNECT_TIMEOUT, config.LLM_READ_TIMEOUT),
+                max_retries=config.LLM_MAX_RETRIES,
+                backoff=config.LLM_BACKOFF,
+                max_concurrency=config.LLM_MAX_CONCURRENCY,
+                requests_per_minute=config.LLM_REQUESTS_PER_MINUTE,
+                tokens_per_minute=config.LLM_TOKENS_PER_MINUTE,
+                embedding_endpoint=config.AZURE_OPENAI_EMBEDDING_ENDPOINT
+            )
+        return _client
+
+def get_async_llm_client():
+    global _async_client
+    client = get_llm_client()
+    with _client_lock:
+        if _async_client is None:
+            _async_client = AsyncLLMClient(client)
+        return _async_client
@@ -0,0 +1,283 @@
+# local_search.py
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+import numpy as np
+from embeddings import get_embedder
+from config import Config
+
+config = Config()
+
+_local_index = None
+_local_index_lock = threading.Lock()
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder over words and word bigrams. It
+    needs no network or model download, so it doubles as the offline/test
+    embedder; any callable mapping a list of texts to an (n, dim) array can be
+    used instead.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = tokenize(text)
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vectors
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class IVFIndex:
+    """
+    Inverted-file ANN index: vectors are clustered with a few rounds of
+    spherical k-means and a query only scores the members of its n_probe
+    closest clusters.
+    """
+
+    def __init__(self, vectors, n_lists, iterations=8, seed=0):
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for cluster in range(n_lists):
+                members = vectors[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = normalize_rows(centroids)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.lists = [np.flatnonzero(assignment == cluster) for cluster in range(n_lists)]
+
+    def search(self, vectors, query, k, n_probe):
+        probes = np.argsort(-(self.centroids @ query))[:n_probe]
+        candidates = np.concatenate([self.lists[cluster] for cluster in probes])
+        if not len(candidates):
+            return candidates, np.zeros(0, dtype=np.float32)
+        scores = vectors[candidates] @ query
+        top = np.argsort(-scores)[:k]
+        return candidates[top], scores[top]
+
+class BM25Index:
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for position, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            self.lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings[term].append((position, frequency))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def search(self, query, k):
+        scores = defaultdict(float)
+        total = len(self.lengths)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / (self.average_length or 1.0))
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+def reciprocal_rank_fusion(rankings, k=60):
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            fused[position] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+class LocalSearchIndex:
+    """
+    Local mirror of the search indexes for offline and low-latency retrieval.
+    Documents are embedded once when added; search runs a vector query
+    (exact below ann_threshold documents, IVF above it) and a BM25 query over
+    title and content, and fuses both rankings with reciprocal-rank fusion.
+
+    The store is persisted under `path` as documents.json plus a vectors
+    .npy file, which is memory-mapped on load.
+    """
+
+    def __init__(self, path, embedder, ann_threshold=2000, n_probe=8):
+        self.path = path
+        self.embedder = embedder
+        self.ann_threshold = ann_threshold
+        self.n_probe = n_probe
+        self.documents = {}
+        self.vectors = {}
+        self._lock = threading.Lock()
+        self._built = None
+        self.load()
+
+    def _text(self, document):
+        return f"{document.get('title', '')}\n{document.get('content', '')}"
+
+    def add_documents(self, index_name, documents):
+        documents = [dict(doc, index=index_name) for doc in documents if doc.get("content")]
+        for doc in documents:
+            doc.pop(config.VECTOR_FIELD, None)
+        with self._lock:
+            changed = [doc for doc in documents
+                       if (index_name, doc["id"]) not in self.documents
+                       or self._text(self.documents[(index_name, doc["id"])]) != self._text(doc)]
+        if not changed:
+            return 0
+        vectors = normalize_rows(self.embedder([self._text(doc) for doc in changed]))
+        with self._lock:
+            for doc, vector in zip(changed, vectors):
+                key = (index_name, doc["id"])
+                self.documents[key] = doc
+                self.vectors[key] = vector
+            self._built = None
+        return len(changed)
+
+    def existing_ids(self, index_name, ids):
+        with self._lock:
+            return {doc_id for doc_id in ids if (index_name, doc_id) in self.documents}
+
+    def delete_documents(self, index_name, ids):
+        with self._lock:
+            for doc_id in ids:
+                self.documents.pop((index_name, doc_id), None)
+                self.vectors.pop((index_name, doc_id), None)
+            self._built = None
+
+    def _build(self):
+        keys = list(self.documents)
+        matrix = np.stack([self.vectors[key] for key in keys]) if keys else np.zeros((0, 1), dtype=np.float32)
+        bm25 = BM25Index([self._text(self.documents[key]) for key in keys])
+        ann = None
+        if len(keys) >= self.ann_threshold:
+            ann = IVFIndex(matrix, n_lists=int(math.sqrt(len(keys))))
+        self._built = (keys, matrix, bm25, ann)
+        return self._built
+
+    def search(self, query, top=10, indices=None, candidates=50, accept=None):
+        """
+        Return up to `top` hits shaped like search_index results, scored by
+        fused rank. `indices` restricts results to those index names and
+        `accept`, if given, is a predicate each document must pass.
+        """
+        with self._lock:
+            keys, matrix, bm25, ann = self._built or self._build()
+        if not keys:
+            return []
+
+        query_vector = normalize_rows(self.embedder([query]))[0]
+        if ann is not None:
+            vector_positions, _ = ann.search(matrix, query_vector, candidates, self.n_probe)
+        else:
+            vector_positions = np.argsort(-(matrix @ query_vector))[:candidates]
+        keyword_positions = [position for position, _ in bm25.search(query, candidates)]
+
+        hits = []
+        for position, score in reciprocal_rank_fusion([[int(position) for position in vector_positions], keyword_positions]):
+            index_name, _ = keys[position]
+            if indices is not None and index_name not in indices:
+                continue
+            document = self.documents.get(keys[position])
+            if document is None or (accept is not None and not accept(document)):
+                continue
+            hits.append({
+                "index": index_name,
+                "doc_type": document.get("doc_type", "unknown"),
+                "title": document.get("title", "No Title"),
+                "content": document.get("content", ""),
+                "page": document.get("file_name") or document.get("page_title"),
+                "score": score
+            })
+            if len(hits) >= top:
+                break
+        return hits
+
+    def save(self):
+        """
+        Write a new vectors-<generation>.npy and point documents.json at it.
+        Older vector files are removed when possible; one that is still
+        memory-mapped (Windows refuses to delete it) is cleaned up next time.
+        """
+        with self._lock:
+            keys = list(self.documents)
+            documents = [self.documents[key] for key in keys]
+            matrix = np.stack([self.vectors[key] for key in keys]) if keys else np.zeros((0, 1), dtype=np.float32)
+        os.makedirs(self.path, exist_ok=True)
+        vectors_file = f"vectors-{time.time_ns()}.npy"
+        np.save(os.path.join(self.path, vectors_file), matrix)
+        manifest_path = os.path.join(self.path, "documents.json")
+        with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"vectors": vectors_file, "documents": documents}, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+        for name in os.listdir(self.path):
+            if name.startswith("vectors-") and name.endswith(".npy") and name != vectors_file:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def load(self):
+        manifest_path = os.path.join(self.path, "documents.json")
+        if not os.path.exists(manifest_path):
+            return
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            documents = stored["documents"]
+            matrix = np.load(os.path.join(self.path, stored["vectors"]), mmap_mode="r")
+        except Exception as e:
+            print(f"Warning: Could not load local search index from '{self.path}':", e)
+            return
+        if len(documents) != len(matrix):
+            print(f"Warning: Local search index at '{self.path}' is inconsistent; ignoring it.")
+            return
+        for position, document in enumerate(documents):
+            key = (document["index"], document["id"])
+            self.documents[key] = document
+            self.vectors[key] = matrix[position]
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "azure": get_embedder
+}
+
+def get_local_index():
+    global _local_index
+    with _local_index_lock:
+        if _local_index is None:
+            _local_index = LocalSearchIndex(
+                config.LOCAL_INDEX_PATH,
+                EMBEDDERS[config.LOCAL_EMBEDDER](),
+                ann_threshold=config.LOCAL_ANN_THRESHOLD,
+                n_probe=config.LOCAL_ANN_PROBES
+            )
+        return _local_index
+
+def local_index_enabled():
+    return config.SEARCH_BACKEND == "local" or config.LOCAL_INDEX_MIRROR
+
+def save_local_index():
+    if _local_index is not None:
+        _local_index.save()
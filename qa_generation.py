@@ -0,0 +1,214 @@
+# qa_generation.py
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from chunker import chunk_text
+from context_builder import count_tokens
+from llm_client import LLMError, get_llm_client
+from config import Config
+
+config = Config()
+
+qa_executor = ThreadPoolExecutor(max_workers=config.QA_REQUEST_WORKERS, thread_name_prefix="lumina-qa")
+qa_metrics = {"requests": 0, "failed_requests": 0, "split_retries": 0, "segments": 0,
+              "prompt_tokens": 0, "completion_tokens": 0, "pairs": 0}
+recent_qa_requests = deque(maxlen=200)
+qa_metrics_lock = threading.Lock()
+
+QA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "pairs": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "segment": {"type": "string"},
+                    "question": {"type": "string"},
+                    "answer": {"type": "string"}
+                },
+                "required": ["segment", "question", "answer"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["pairs"],
+    "additionalProperties": False
+}
+
+class Segment:
+    def __init__(self, key, text):
+        self.key = key
+        self.text = text
+        self.tokens = count_tokens(text)
+        self.target = min(config.QA_MAX_PAIRS, max(config.QA_MIN_PAIRS, self.tokens // config.QA_INPUT_TOKENS_PER_PAIR))
+
+    @property
+    def output_tokens(self):
+        return self.target * config.QA_OUTPUT_TOKENS_PER_PAIR
+
+def response_format():
+    if config.QA_RESPONSE_FORMAT == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": "qa_pairs", "strict": True, "schema": QA_SCHEMA}}
+    return {"type": "json_object"}
+
+def build_segments(texts):
+    """
+    Turn {key: text} into segments that each fit one request, splitting any
+    text whose input or expected output exceeds the per-request budgets.
+    """
+    segments = []
+    for key, text in texts.items():
+        segment = Segment(key, text)
+        if segment.tokens <= config.QA_INPUT_TOKENS and segment.output_tokens <= config.QA_MAX_OUTPUT_TOKENS:
+            segments.append(segment)
+            continue
+        max_tokens = min(config.QA_INPUT_TOKENS,
+                         config.QA_MAX_OUTPUT_TOKENS // config.QA_OUTPUT_TOKENS_PER_PAIR * config.QA_INPUT_TOKENS_PER_PAIR)
+        segments.extend(Segment(key, part) for part in chunk_text(text, max_tokens, split_lines=True))
+    return segments
+
+def pack_segments(segments):
+    """
+    Greedily pack segments into requests under QA_INPUT_TOKENS of content and
+    QA_MAX_OUTPUT_TOKENS of expected output.
+    """
+    requests = []
+    current = []
+    input_tokens = 0
+    output_tokens = 0
+    for segment in segments:
+        if current and (input_tokens + segment.tokens > config.QA_INPUT_TOKENS
+                        or output_tokens + segment.output_tokens > config.QA_MAX_OUTPUT_TOKENS):
+            requests.append(current)
+            current = []
+            input_tokens = 0
+            output_tokens = 0
+        current.append(segment)
+        input_tokens += segment.tokens
+        output_tokens += segment.output_tokens
+    if current:
+        requests.append(current)
+    return requests
+
+def build_qa_messages(segments):
+    parts = [f"### S{i+1} (about {segment.target} pairs)\n{segment.text}" for i, segment in enumerate(segments)]
+    prompt = (
+        "Based solely on the content segments below (ignore navigation menus, headers, footers, sidebars, and extraneous UI elements), "
+        "generate highly relevant question-answer pairs for each segment, aiming for the number of pairs given in its heading. "
+        "Ensure coverage of all key topics and sections presented in the content. "
+        "Each Q&A pair must be specific, accurate and answerable from its own segment. If the text does not provide a clear, definitive answer, skip generating that pair. "
+        "Replace any user-specific details (such as IDs, GUIDs, or personal information) with placeholders. "
+        'Return a JSON object of the form {"pairs": [{"segment": "S1", "question": "...", "answer": "..."}]}.\n\n'
+        + "\n\n".join(parts)
+    )
+    return [
+        {"role": "system", "content": "You are an AI assistant that generates detailed Q&A pairs from provided content and replies in JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+def record_qa_request(label, segments, usage, pairs, status):
+    call = {
+        "label": label,
+        "segments": len(segments),
+        "input_tokens": sum(segment.tokens for segment in segments),
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "pairs": pairs,
+        "status": status,
+        "at": time.time()
+    }
+    with qa_metrics_lock:
+        qa_metrics["requests"] += 1
+        qa_metrics["segments"] += len(segments)
+        qa_metrics["prompt_tokens"] += call["prompt_tokens"]
+        qa_metrics["completion_tokens"] += call["completion_tokens"]
+        qa_metrics["pairs"] += pairs
+        if status != "ok":
+            qa_metrics["failed_requests"] += 1
+        recent_qa_requests.append(call)
+
+def run_qa_request(segments, identifier, max_retries=3, depth=0):
+    """
+    Generate pairs for one packed request and return [(segment, pairs)].
+    A response cut off at max_tokens is retried as two smaller requests.
+    pairs is None for segments whose request failed or returned invalid JSON.
+    """
+    label = f"Q&A for {identifier} ({len(segments)} segment(s))"
+    max_tokens = min(config.QA_MAX_OUTPUT_TOKENS, sum(segment.output_tokens for segment in segments) + 200)
+    try:
+        response_json = get_llm_client().chat(build_qa_messages(segments), max_tokens=max_tokens, label=label,
+                                              max_retries=max_retries, response_format=response_format())
+    except LLMError as e:
+        print(e)
+        record_qa_request(label, segments, {}, 0, "error")
+        return [(segment, None) for segment in segments]
+
+    choice = (response_json.get("choices") or [{}])[0]
+    usage = response_json.get("usage") or {}
+    if choice.get("finish_reason") == "length" and depth < 2:
+        record_qa_request(label, segments, usage, 0, "truncated")
+        with qa_metrics_lock:
+            qa_metrics["split_retries"] += 1
+        if len(segments) > 1:
+            middle = len(segments) // 2
+            halves = [segments[:middle], segments[middle:]]
+        else:
+            segment = segments[0]
+            halves = [[Segment(segment.key, part)] for part in chunk_text(segment.text, max(1, segment.tokens // 2 + 1), split_lines=True)]
+        return [result for half in halves for result in run_qa_request(half, identifier, max_retries, depth + 1)]
+
+    try:
+        pairs = json.loads(choice.get("message", {}).get("content") or "{}").get("pairs", [])
+    except (ValueError, AttributeError) as e:
+        print(f"Error parsing Q&A pairs for {identifier}:", e)
+        record_qa_request(label, segments, usage, 0, "invalid")
+        return [(segment, None) for segment in segments]
+
+    by_label = {f"S{i+1}": [] for i in range(len(segments))}
+    for pair in pairs if isinstance(pairs, list) else []:
+        if isinstance(pair, dict) and pair.get("segment") in by_label:
+            by_label[pair["segment"]].append({"question": pair.get("question", ""), "answer": pair.get("answer", "")})
+    record_qa_request(label, segments, usage, sum(len(found) for found in by_label.values()), "ok")
+    return [(segment, by_label[f"S{i+1}"]) for i, segment in enumerate(segments)]
+
+def generate_qa_batch(texts, identifier, max_retries=3):
+    """
+    Generate Q&A pairs for several texts at once. Small texts are packed into
+    shared requests and large ones split across requests; the requests run
+    concurrently. Returns {key: [{"question": ..., "answer": ...}]}, with None
+    for keys where any request failed so callers can retry them later.
+    """
+    results = {key: [] for key in texts}
+    if not texts:
+        return results
+    requests = pack_segments(build_segments(texts))
+    futures = [qa_executor.submit(run_qa_request, request, identifier, max_retries) for request in requests]
+    for future in futures:
+        for segment, pairs in future.result():
+            if pairs is None:
+                results[segment.key] = None
+            elif results[segment.key] is not None:
+                results[segment.key].extend(pairs)
+    return results
+
+def qa_metrics_summary():
+    with qa_metrics_lock:
+        metrics = dict(qa_metrics)
+    cost = (metrics["prompt_tokens"] / 1000 * config.QA_PROMPT_COST_PER_1K
+            + metrics["completion_tokens"] / 1000 * config.QA_COMPLETION_COST_PER_1K)
+    metrics["estimated_cost"] = cost
+    metrics["pairs_per_request"] = metrics["pairs"] / metrics["requests"] if metrics["requests"] else 0.0
+    metrics["pairs_per_dollar"] = metrics["pairs"] / cost if cost else 0.0
+    return metrics
+
+def print_qa_metrics():
+    metrics = qa_metrics_summary()
+    if not metrics["requests"]:
+        return
+    print(f"Q&A generation: {metrics['pairs']} pair(s) from {metrics['segments']} segment(s) in {metrics['requests']} request(s) "
+          f"({metrics['failed_requests']} failed, {metrics['split_retries']} split); {metrics['prompt_tokens']} tokens in, "
+          f"{metrics['completion_tokens']} out, ~${metrics['estimated_cost']:.2f} ({metrics['pairs_per_dollar']:.0f} pairs/$)")
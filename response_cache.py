@@ -0,0 +1,222 @@
+# response_cache.py
+
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from embeddings import get_embedder
+from config import Config
+
+config = Config()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def normalize_question(question):
+    normalized = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(normalized.split())
+
+def fingerprint_context(context, history=()):
+    digest = hashlib.sha256()
+    for item in sorted(context):
+        digest.update(item.encode("utf-8"))
+        digest.update(b"\0")
+    # Earlier turns change what the answer should be, so they are part of
+    # the fingerprint; with no history it matches the context-only one.
+    for user_text, assistant_reply in history:
+        digest.update(b"\1")
+        digest.update(f"{user_text}\0{assistant_reply}".encode("utf-8"))
+    return digest.hexdigest()
+
+def context_indices(context):
+    """
+    Pull the source index names out of query_search_indices results,
+    which are formatted as "[index][doc_type] title: content".
+    """
+    indices = set()
+    for item in context:
+        match = re.match(r"\[([^\]]+)\]", item)
+        if match:
+            indices.add(match.group(1))
+    return indices
+
+def cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class ResponseCache:
+    """
+    Answer cache keyed on the normalized question plus a fingerprint of the
+    retrieved context and the conversation so far, stored in SQLite so it
+    survives restarts. Entries are evicted least-recently-used past
+    max_entries and expire after ttl seconds. When an embedder is supplied, a
+    miss on the exact key falls back to the closest cached question that was
+    answered from the same context and history.
+    """
+
+    def __init__(self, path, max_entries=500, ttl=7 * 24 * 3600, embedder=None, similarity_threshold=0.95):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                context_fp TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                embedding TEXT,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_context ON entries (context_fp);
+            CREATE TABLE IF NOT EXISTS entry_indices (
+                key TEXT NOT NULL,
+                index_name TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entry_indices_name ON entry_indices (index_name);
+        """)
+        self._db.commit()
+
+    def _key(self, question, context_fp):
+        return hashlib.sha256(f"{normalize_question(question)}\0{context_fp}".encode("utf-8")).hexdigest()
+
+    def _delete(self, keys):
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+        self._db.executemany("DELETE FROM entry_indices WHERE key = ?", [(key,) for key in keys])
+
+    def get(self, question, context, history=()):
+        context_fp = fingerprint_context(context, history)
+        key = self._key(question, context_fp)
+        now = time.time()
+
+        with self._lock:
+            expired = [row[0] for row in self._db.execute("SELECT key FROM entries WHERE created_at < ?", (now - self.ttl,))]
+            if expired:
+                self._delete(expired)
+                self.stats["evictions"] += len(expired)
+
+            row = self._db.execute("SELECT answer FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self.stats["hits"] += 1
+                return row[0]
+            self._db.commit()
+
+        if self.embedder is not None:
+            answer = self._get_similar(question, context_fp, now)
+            if answer is not None:
+                return answer
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _get_similar(self, question, context_fp, now):
+        with self._lock:
+            candidates = self._db.execute(
+                "SELECT key, answer, embedding FROM entries WHERE context_fp = ? AND embedding IS NOT NULL",
+                (context_fp,)
+            ).fetchall()
+        if not candidates:
+            return None
+
+        try:
+            query_vector = self.embedder(normalize_question(question))
+        except Exception as e:
+            print("Warning: Could not embed question for cache lookup:", e)
+            return None
+
+        best_key, best_answer, best_score = None, None, 0.0
+        for key, answer, embedding in candidates:
+            score = cosine_similarity(query_vector, json.loads(embedding))
+            if score > best_score:
+                best_key, best_answer, best_score = key, answer, score
+        if best_score < self.similarity_threshold:
+            return None
+
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, best_key))
+            self._db.commit()
+            self.stats["semantic_hits"] += 1
+        return best_answer
+
+    def put(self, question, context, answer, history=()):
+        context_fp = fingerprint_context(context, history)
+        key = self._key(question, context_fp)
+        embedding = None
+        if self.embedder is not None:
+            try:
+                embedding = json.dumps(list(self.embedder(normalize_question(question))))
+            except Exception as e:
+                print("Warning: Could not embed question for cache entry:", e)
+        now = time.time()
+
+        with self._lock:
+            self._delete([key])
+            self._db.execute(
+                "INSERT INTO entries (key, question, context_fp, answer, embedding, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, question, context_fp, answer, embedding, now, now)
+            )
+            self._db.executemany(
+                "INSERT INTO entry_indices (key, index_name) VALUES (?, ?)",
+                [(key, index_name) for index_name in context_indices(context)]
+            )
+            count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                stale = [row[0] for row in self._db.execute(
+                    "SELECT key FROM entries ORDER BY last_access ASC LIMIT ?", (count - self.max_entries,)
+                )]
+                self._delete(stale)
+                self.stats["evictions"] += len(stale)
+            self._db.commit()
+            self.stats["stores"] += 1
+
+    def invalidate_index(self, index_name):
+        with self._lock:
+            keys = [row[0] for row in self._db.execute(
+                "SELECT DISTINCT key FROM entry_indices WHERE index_name = ?", (index_name,)
+            )]
+            if keys:
+                self._delete(keys)
+                self._db.commit()
+                self.stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM entry_indices")
+            self._db.commit()
+
+def get_response_cache():
+    global _cache
+    if not config.RESPONSE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            embedder = None
+            if config.RESPONSE_CACHE_EMBEDDINGS:
+                embedder = get_embedder()
+            _cache = ResponseCache(
+                config.RESPONSE_CACHE_PATH,
+                max_entries=config.RESPONSE_CACHE_MAX_ENTRIES,
+                ttl=config.RESPONSE_CACHE_TTL,
+                embedder=embedder,
+                similarity_threshold=config.RESPONSE_CACHE_SIMILARITY
+            )
+        return _cache
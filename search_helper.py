@@ -0,0 +1,127 @@
+# search_helper.py
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+
+config = Config()
+
+_lock = threading.Lock()
+_http_session = None
+_index_clients = {}
+_search_clients = {}
+_catalog = {"indices": None, "loaded_at": 0.0}
+_index_fields = {}
+_index_field_failures = {}
+
+def get_search_endpoint(service_name=None):
+    # SEARCH_ENDPOINT overrides the service URL, e.g. to point at a local stand-in.
+    return config.SEARCH_ENDPOINT or f"https://{service_name or config.SEARCH_SERVICE_NAME}.search.windows.net"
+
+def get_http_session():
+    """
+    One keep-alive session shared by every search client, so each index reuses
+    pooled connections instead of paying a new TLS handshake per request.
+    """
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=config.SEARCH_POOL_SIZE, pool_maxsize=config.SEARCH_POOL_SIZE)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+def get_index_client(service_name=None, admin_key=None):
+    service_name = service_name or config.SEARCH_SERVICE_NAME
+    admin_key = admin_key or config.ADMIN_KEY
+    key = (service_name, admin_key)
+    client = _index_clients.get(key)
+    if client is None:
+        from azure.core.credentials import AzureKeyCredential
+        from azure.core.pipeline.transport import RequestsTransport
+        from azure.search.documents.indexes import SearchIndexClient
+        session = get_http_session()
+        with _lock:
+            client = _index_clients.get(key)
+            if client is None:
+                client = SearchIndexClient(
+                    endpoint=get_search_endpoint(service_name),
+                    credential=AzureKeyCredential(admin_key),
+                    transport=RequestsTransport(session=session, session_owner=False)
+                )
+                _index_clients[key] = client
+    return client
+
+def get_search_client(index_name, service_name=None, admin_key=None):
+    service_name = service_name or config.SEARCH_SERVICE_NAME
+    admin_key = admin_key or config.ADMIN_KEY
+    key = (service_name, admin_key, index_name)
+    client = _search_clients.get(key)
+    if client is None:
+        from azure.core.credentials import AzureKeyCredential
+        from azure.core.pipeline.transport import RequestsTransport
+        from azure.search.documents import SearchClient
+        session = get_http_session()
+        with _lock:
+            client = _search_clients.get(key)
+            if client is None:
+                client = SearchClient(
+                    endpoint=get_search_endpoint(service_name),
+                    index_name=index_name,
+                    credential=AzureKeyCredential(admin_key),
+                    transport=RequestsTransport(session=session, session_owner=False)
+                )
+                _search_clients[key] = client
+    return client
+
+def get_indices(refresh=False):
+    """
+    Return the cached list of index names, re-listing them from the service
+    once SEARCH_CATALOG_TTL seconds have passed or after invalidation.
+    """
+    with _lock:
+        indices = _catalog["indices"]
+        fresh = indices is not None and time.monotonic() - _catalog["loaded_at"] < config.SEARCH_CATALOG_TTL
+    if fresh and not refresh:
+        return list(indices)
+
+    indices = [index.name for index in get_index_client().list_indexes()]
+    with _lock:
+        _catalog["indices"] = indices
+        _catalog["loaded_at"] = time.monotonic()
+    return list(indices)
+
+def get_index_fields(index_name, service_name=None, admin_key=None):
+    """
+    Return the set of field names in an index's schema, cached until the
+    catalog is invalidated. A failed read is cached too and raised again
+    without another request until SEARCH_CATALOG_TTL seconds have passed.
+    """
+    key = (service_name or config.SEARCH_SERVICE_NAME, index_name)
+    with _lock:
+        fields = _index_fields.get(key)
+        failure = _index_field_failures.get(key)
+    if fields is None:
+        if failure is not None and time.monotonic() - failure[0] < config.SEARCH_CATALOG_TTL:
+            raise failure[1]
+        try:
+            index = get_index_client(service_name, admin_key).get_index(index_name)
+        except Exception as e:
+            with _lock:
+                _index_field_failures[key] = (time.monotonic(), e)
+            raise
+        fields = {field.name for field in index.fields}
+        with _lock:
+            _index_fields[key] = fields
+            _index_field_failures.pop(key, None)
+    return set(fields)
+
+def invalidate_index_catalog():
+    with _lock:
+        _catalog["indices"] = None
+        _catalog["loaded_at"] = 0.0
+        _index_fields.clear()
+        _index_field_failures.clear()
@@ -0,0 +1,337 @@
+# service.py
+#
+# HTTP API serving many concurrent chat sessions from one warm process:
+#
+#   python service.py --host 127.0.0.1 --port 8080
+#
+#   POST   /sessions                 -> {"session_id"}
+#   GET    /sessions/{id}            -> turns, filters and recent timings
+#   DELETE /sessions/{id}
+#   POST   /chat      {"message", "session_id"?, "filters"?, "stream"?}
+#                     -> JSON reply, or server-sent events with "stream": true
+#   POST   /feedback  {"session_id", "reaction": "positive"|"negative"?, "feedback"?}
+#   POST   /ingest    {"urls": [...]} | {"transcripts": [{"name", "text"}]} | {"resume": true}
+#   GET    /ingest    -> job counts, the running ingestion and recent failures
+#   GET    /health
+#
+# Sessions keep their own history, memory, warm retrieval context and
+# filters (chat_session.ChatSession); search, LLM and blob clients are the
+# shared pooled ones. At most SERVICE_MAX_CONCURRENT_TURNS turns run at
+# once and one turn per session. Set SERVICE_API_KEY to require an
+# X-API-Key header.
+
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from ai_utils import (DOC_TYPE_ALIASES, add_link_contents_to_index, background_ingestion, build_response_messages, parse_search_filters,
+                      resume_ingestion, run_transcript_jobs, start_background_ingestion, warm_search)
+from chat_session import SessionStore
+from feedback_writer import get_feedback_writer
+from ingest_jobs import get_job_queue
+from llm_client import LLMError, get_async_llm_client
+from config import Config
+
+config = Config()
+
+FILTER_KEYS = {"doc_types", "since_days", "file_name"}
+MAX_SESSION_ID_LENGTH = 200
+MAX_SINCE_DAYS = 36500
+DOC_TYPES = {**{doc_type: doc_type for doc_type in DOC_TYPE_ALIASES.values()}, **DOC_TYPE_ALIASES}
+
+SESSIONS = web.AppKey("sessions", SessionStore)
+TURN_SLOTS = web.AppKey("turn_slots", asyncio.Semaphore)
+STATS = web.AppKey("stats", dict)
+
+def error(status, message):
+    return web.json_response({"error": message}, status=status)
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except (ValueError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "request body must be JSON"}), content_type="application/json")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "request body must be a JSON object"}), content_type="application/json")
+    return body
+
+def parse_filters(value):
+    """
+    Accept the console's filter text ("qa last 30 days") or an object with
+    doc_types (a list of known types or their aliases), since_days (a
+    positive integer) and file_name (a string). Raises ValueError otherwise.
+    """
+    if value is None or value == "":
+        return {}
+    if isinstance(value, str):
+        return parse_search_filters(value) or {}
+    if not isinstance(value, dict) or not set(value) <= FILTER_KEYS:
+        raise ValueError(f"filters must be a string or an object with {', '.join(sorted(FILTER_KEYS))}")
+    filters = {}
+    doc_types = value.get("doc_types")
+    if doc_types:
+        if not isinstance(doc_types, list) or not all(isinstance(item, str) and item.lower() in DOC_TYPES for item in doc_types):
+            raise ValueError(f"doc_types must be a list drawn from {', '.join(sorted(set(DOC_TYPES.values())))}")
+        filters["doc_types"] = list(dict.fromkeys(DOC_TYPES[item.lower()] for item in doc_types))
+    since_days = value.get("since_days")
+    if since_days is not None:
+        if not isinstance(since_days, int) or isinstance(since_days, bool) or not 0 < since_days <= MAX_SINCE_DAYS:
+            raise ValueError(f"since_days must be a whole number of days from 1 to {MAX_SINCE_DAYS}")
+        filters["since_days"] = since_days
+    file_name = value.get("file_name")
+    if file_name:
+        if not isinstance(file_name, str):
+            raise ValueError("file_name must be a string")
+        filters["file_name"] = file_name
+    return filters
+
+@web.middleware
+async def api_key_middleware(request, handler):
+    if config.SERVICE_API_KEY and request.path != "/health" and not hmac.compare_digest(
+            request.headers.get("X-API-Key", "").encode("utf-8"), config.SERVICE_API_KEY.encode("utf-8")):
+        return error(401, "missing or invalid X-API-Key")
+    return await handler(request)
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+async def create_session(request):
+    session = request.app[SESSIONS].get()
+    return web.json_response({"session_id": session.id}, status=201)
+
+async def get_session(request):
+    session = request.app[SESSIONS].get(request.match_info["session_id"], create=False)
+    if session is None:
+        return error(404, "unknown session")
+    return web.json_response({"session_id": session.id, "turns": len(session.history), "filters": session.filters,
+                              "timings": session.timings[-10:]})
+
+async def delete_session(request):
+    if not request.app[SESSIONS].remove(request.match_info["session_id"]):
+        return error(404, "unknown session")
+    return web.Response(status=204)
+
+async def chat(request):
+    body = await read_json(request)
+    message = (body.get("message") or "").strip() if isinstance(body.get("message"), str) else ""
+    if not message:
+        return error(400, "message is required")
+    session_id = body.get("session_id")
+    if session_id is not None and (not isinstance(session_id, str) or len(session_id) > MAX_SESSION_ID_LENGTH):
+        return error(400, "session_id must be a string")
+    try:
+        filters = parse_filters(body["filters"]) if "filters" in body else None
+    except ValueError as e:
+        return error(400, str(e))
+
+    session = request.app[SESSIONS].get(session_id)
+    if not session.begin_turn():
+        return error(409, "a turn is already running for this session")
+    try:
+        try:
+            await asyncio.wait_for(request.app[TURN_SLOTS].acquire(), timeout=config.SERVICE_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return error(503, "busy; try again shortly")
+        if filters is not None:
+            session.filters.clear()
+            session.filters.update(filters)
+        stats = request.app[STATS]
+        stats["active_turns"] += 1
+        try:
+            return await run_turn(request, session, message, bool(body.get("stream")))
+        finally:
+            stats["active_turns"] -= 1
+            stats["turns"] += 1
+            request.app[TURN_SLOTS].release()
+    finally:
+        session.end_turn()
+
+async def run_turn(request, session, message, stream):
+    turn_start = time.perf_counter()
+    search_results, turn, retrieval_time = await asyncio.to_thread(session.retrieve, message)
+    reply = await asyncio.to_thread(session.cached_reply, message, search_results)
+    cached = reply is not None
+    history = []
+    if not cached:
+        history = await asyncio.to_thread(session.memory.history_for_prompt)
+        messages = await asyncio.to_thread(build_response_messages, message, search_results, history)
+
+    response = None
+    first_token_at = None
+    if stream:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        await response.write(sse("session", {"session_id": session.id, "turn": turn}))
+
+    if cached:
+        first_token_at = time.perf_counter()
+        if stream:
+            await response.write(sse("token", {"text": reply}))
+    elif stream:
+        parts = []
+        try:
+            async for token in get_async_llm_client().stream(messages, max_tokens=1000, label="response"):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(token)
+                await response.write(sse("token", {"text": token}))
+        except (LLMError, requests.RequestException) as e:
+            await response.write(sse("error", {"error": str(e)}))
+        reply = "".join(parts) or "No response."
+    else:
+        try:
+            reply = await get_async_llm_client().chat_text(messages, max_tokens=1000, label="response") or "No response."
+        except LLMError as e:
+            print("Error processing OpenAI response:", e)
+            reply = "No response."
+        first_token_at = time.perf_counter()
+
+    timing = {
+        "time_to_first_token": first_token_at - turn_start if first_token_at is not None else None,
+        "total_time": time.perf_counter() - turn_start,
+        "cached": cached,
+        "turn": turn,
+        "retrieval_time": retrieval_time,
+        "history_tokens": session.memory.metrics["history_tokens"][-1] if history else 0
+    }
+    await asyncio.to_thread(session.record_turn, message, reply, search_results, timing, cached)
+    if config.TELEMETRY_UPLOADS:
+        get_feedback_writer().record("telemetry", session.id, timing)
+
+    if stream:
+        await response.write(sse("done", {"session_id": session.id, "reply": reply, "timing": timing}))
+        await response.write_eof()
+        return response
+    return web.json_response({"session_id": session.id, "reply": reply, "timing": timing})
+
+async def feedback(request):
+    body = await read_json(request)
+    session = request.app[SESSIONS].get(body.get("session_id"), create=False) if isinstance(body.get("session_id"), str) else None
+    if session is None:
+        return error(404, "unknown session")
+    reaction = body.get("reaction")
+    written = (body.get("feedback") or "").strip() if isinstance(body.get("feedback"), str) else ""
+    if reaction not in (None, "positive", "negative") or (reaction is None and not written):
+        return error(400, "give a reaction of 'positive' or 'negative' and/or written feedback")
+    writer = get_feedback_writer()
+    if reaction:
+        writer.record_reaction(reaction)
+    if written:
+        writer.record("written", session.id, {"feedback": written, "history": [list(turn) for turn in session.history]})
+    return web.json_response({"status": "queued"}, status=202)
+
+def ingest_transcripts(file_paths):
+    get_job_queue().enqueue("transcript", file_paths)
+    return run_transcript_jobs(file_paths)
+
+def save_transcripts(transcripts):
+    """
+    Write uploaded transcripts into SERVICE_TRANSCRIPTS_DIR. A name that is
+    repeated or already taken raises FileExistsError and nothing is kept,
+    so an upload never replaces a transcript that is already there.
+    """
+    names = []
+    for transcript in transcripts:
+        name = os.path.basename(str(transcript.get("name") or ""))
+        if not name.endswith((".txt", ".vtt")) or not isinstance(transcript.get("text"), str):
+            raise ValueError("each transcript needs a .txt or .vtt name and its text")
+        if name in names:
+            raise ValueError(f"transcript name {name} is given more than once")
+        names.append(name)
+
+    os.makedirs(config.SERVICE_TRANSCRIPTS_DIR, exist_ok=True)
+    file_paths = []
+    try:
+        for name, transcript in zip(names, transcripts):
+            file_path = os.path.join(config.SERVICE_TRANSCRIPTS_DIR, name)
+            with open(file_path, "x", encoding="utf-8") as f:
+                f.write(transcript["text"])
+            file_paths.append(file_path)
+    except FileExistsError:
+        for file_path in file_paths:
+            os.remove(file_path)
+        raise FileExistsError(f"a transcript named {name} already exists; upload it under another name")
+    return file_paths
+
+async def start_ingestion(request):
+    body = await read_json(request)
+    urls = body.get("urls")
+    transcripts = body.get("transcripts")
+    if urls:
+        if not isinstance(urls, list) or not all(isinstance(url, str) and url.startswith(("http://", "https://")) for url in urls):
+            return error(400, "urls must be a list of http(s) URLs")
+        started = start_background_ingestion(f"{len(urls)} link(s)", add_link_contents_to_index, urls)
+    elif transcripts:
+        if not isinstance(transcripts, list) or not all(isinstance(item, dict) for item in transcripts):
+            return error(400, "transcripts must be a list of {name, text} objects")
+        try:
+            file_paths = await asyncio.to_thread(save_transcripts, transcripts)
+        except ValueError as e:
+            return error(400, str(e))
+        except FileExistsError as e:
+            return error(409, str(e))
+        started = start_background_ingestion(f"{len(file_paths)} transcript(s)", ingest_transcripts, file_paths)
+    elif body.get("resume"):
+        started = start_background_ingestion("unfinished jobs", resume_ingestion)
+    else:
+        return error(400, "give urls, transcripts or resume")
+    if not started:
+        return error(409, f"already ingesting {background_ingestion['description']}")
+    return web.json_response({"status": "started", "description": background_ingestion["description"]}, status=202)
+
+async def ingestion_status(request):
+    queue = get_job_queue()
+    counts, failures = await asyncio.gather(asyncio.to_thread(queue.counts), asyncio.to_thread(queue.failures))
+    thread = background_ingestion["thread"]
+    running = background_ingestion["description"] if thread is not None and thread.is_alive() else None
+    return web.json_response({
+        "jobs": counts,
+        "running": running,
+        "failures": [{"kind": kind, "item": item, "stage": stage, "attempts": attempts, "error": message}
+                     for kind, item, stage, attempts, message in failures]
+    })
+
+async def health(request):
+    return web.json_response({"status": "ok", "sessions": len(request.app[SESSIONS]), **request.app[STATS]})
+
+async def on_startup(app):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=config.SERVICE_WORKER_THREADS, thread_name_prefix="lumina-service"))
+    # Warm the shared catalog and clients without holding up startup.
+    loop.run_in_executor(None, warm_search)
+
+async def on_cleanup(app):
+    app[SESSIONS].close()
+    get_feedback_writer().close(config.FEEDBACK_FLUSH_TIMEOUT)
+
+def create_app(sessions=None):
+    app = web.Application(middlewares=[api_key_middleware], client_max_size=config.SERVICE_MAX_BODY_BYTES)
+    app[SESSIONS] = sessions or SessionStore(config.SERVICE_MAX_SESSIONS, config.SERVICE_SESSION_IDLE_TIMEOUT, config.SERVICE_SESSION_WORKERS)
+    app[TURN_SLOTS] = asyncio.Semaphore(config.SERVICE_MAX_CONCURRENT_TURNS)
+    app[STATS] = {"active_turns": 0, "turns": 0}
+    app.router.add_post("/sessions", create_session)
+    app.router.add_get("/sessions/{session_id}", get_session)
+    app.router.add_delete("/sessions/{session_id}", delete_session)
+    app.router.add_post("/chat", chat)
+    app.router.add_post("/feedback", feedback)
+    app.router.add_post("/ingest", start_ingestion)
+    app.router.add_get("/ingest", ingestion_status)
+    app.router.add_get("/health", health)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Lumina as an HTTP service.")
+    parser.add_argument("--host", default=config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -42,11 +42,15 @@ echo Installing packages...
     azure-search-documents ^
     PyMuPDF ^
     beautifulsoup4 ^
+    lxml ^
+    selectolax ^
     selenium ^
+    aiohttp ^
     webdriver_manager ^
     python-dotenv ^
     openai ^
     numpy ^
+    tiktoken ^
     pytesseract ^
     easyocr ^
     azure-keyvault-secrets
@@ -0,0 +1,128 @@
+import functools
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.common.exceptions import WebDriverException
+from browser_pool import BrowserPool
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class StaticDriver:
+    """
+    A WebDriver stand-in that loads pages over plain HTTP. fail_next makes
+    the next get() raise the given exception instead.
+    """
+
+    def __init__(self):
+        self.page_source = ""
+        self.current_url = ""
+        self.cookies = []
+        self.fail_next = None
+        self.quit_called = False
+
+    def get(self, url):
+        if self.fail_next is not None:
+            error, self.fail_next = self.fail_next, None
+            raise error
+        with urllib.request.urlopen(url, timeout=10) as response:
+            self.page_source = response.read().decode("utf-8")
+        self.current_url = url
+
+    def get_cookies(self):
+        return [{"name": "session", "value": "signed-in"}]
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+    def quit(self):
+        self.quit_called = True
+
+class BrowserPoolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+        for name in ("a", "b", "c"):
+            with open(os.path.join(cls.root, f"{name}.html"), "w", encoding="utf-8") as f:
+                f.write(f"<html><body><div id=\"_content\">page {name}</div></body></html>")
+        handler = functools.partial(QuietHandler, directory=cls.root)
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def make_pool(self, **options):
+        self.drivers = []
+
+        def factory(headless):
+            driver = StaticDriver()
+            self.drivers.append(driver)
+            return driver
+
+        return BrowserPool(wait_for_id=None, driver_factory=factory, **options)
+
+    def test_reuses_drivers_and_replays_cookies(self):
+        pool = self.make_pool(size=2)
+        pool.fetch(f"{self.base}/a.html")
+        html = pool.fetch(f"{self.base}/b.html")
+        self.assertIn("page b", html)
+        self.assertEqual(pool.stats["created"], 1)
+        self.assertEqual(pool.stats["pages"], 2)
+
+        # A second driver picks up the cookies the first one captured.
+        first = pool._checkout()
+        second = pool._checkout()
+        pool._checkin(first, healthy=True)
+        pool._load(second, f"{self.base}/c.html")
+        pool._checkin(second, healthy=True)
+        self.assertEqual(self.drivers[1].cookies, [{"name": "session", "value": "signed-in"}])
+
+    def test_recycles_after_max_pages(self):
+        pool = self.make_pool(size=1, max_pages=2)
+        for name in ("a", "b", "c"):
+            pool.fetch(f"{self.base}/{name}.html")
+        self.assertEqual(pool.stats["recycled"], 1)
+        self.assertEqual(pool.stats["created"], 2)
+        self.assertTrue(self.drivers[0].quit_called)
+
+    def test_retries_with_a_fresh_driver_after_a_crash(self):
+        pool = self.make_pool(size=1)
+        pool.fetch(f"{self.base}/a.html")
+        self.drivers[0].fail_next = WebDriverException("tab crashed")
+        html = pool.fetch(f"{self.base}/b.html")
+        self.assertIn("page b", html)
+        self.assertEqual(pool.stats["crashed"], 1)
+        self.assertEqual(pool.stats["created"], 2)
+
+    def test_other_failures_return_the_slot(self):
+        pool = self.make_pool(size=1)
+        pool.fetch(f"{self.base}/a.html")
+        self.drivers[0].fail_next = ConnectionRefusedError("driver process is gone")
+        with self.assertRaises(ConnectionRefusedError):
+            pool.fetch(f"{self.base}/b.html")
+        # With size=1 this would block forever if the slot had leaked.
+        self.assertTrue(pool._slots.acquire(timeout=1))
+        pool._slots.release()
+        self.assertIn("page c", pool.fetch(f"{self.base}/c.html"))
+        self.assertEqual(pool.stats["crashed"], 1)
+
+    def test_close_quits_idle_drivers(self):
+        pool = self.make_pool(size=1)
+        pool.fetch(f"{self.base}/a.html")
+        pool.close()
+        self.assertTrue(self.drivers[0].quit_called)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import context_builder
+from conversation_memory import ConversationMemory
+
+class SlowSummarizer:
+    """
+    Records the turns of each fold, then blocks until the test lets one
+    fold finish.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Semaphore(0)
+
+    def __call__(self, summary, turns, max_tokens):
+        self.calls.append(list(turns))
+        self.gate.acquire(timeout=10)
+        return f"{summary} {len(turns)} turn(s)".strip()
+
+    def wait_for_calls(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.calls) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.calls) >= count
+
+class ConversationMemoryTest(unittest.TestCase):
+    def setUp(self):
+        context_builder.tiktoken = None
+
+    def test_turns_trimmed_during_a_fold_are_not_summarized_twice(self):
+        summarizer = SlowSummarizer()
+        memory = ConversationMemory(summarizer, keep_turns=2)
+        self.addCleanup(memory.close)
+        turns = [(f"question {i}", f"answer {i}") for i in range(10)]
+
+        for turn in turns[:8]:
+            memory.append(*turn)
+        self.assertTrue(summarizer.wait_for_calls(1))
+        summarizer.gate.release()
+        # The second fold takes turns 1-5; two more appends pass
+        # keep_turns * 4 and trim turn 1 while it is still running.
+        self.assertTrue(summarizer.wait_for_calls(2))
+        self.assertEqual(summarizer.calls[1], turns[1:6])
+        for turn in turns[8:]:
+            memory.append(*turn)
+        for _ in range(10):
+            summarizer.gate.release()
+        self.assertTrue(memory.wait(10))
+
+        folded = [turn for call in summarizer.calls for turn in call]
+        self.assertEqual(len(folded), len(set(folded)))
+        self.assertEqual(memory.turns, turns[-2:])
+
+if __name__ == "__main__":
+    unittest.main()
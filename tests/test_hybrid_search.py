@@ -0,0 +1,76 @@
+import contextlib
+import io
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_utils
+import search_helper
+from config import Config
+
+class FakeSearchClient:
+    def __init__(self, index):
+        self.index = index
+
+    def search(self, search_text=None, **options):
+        return [{"content": f"{self.index} result", "title": self.index, "@search.score": 1.0}]
+
+class HybridSearchTest(unittest.TestCase):
+    def setUp(self):
+        search_helper.invalidate_index_catalog()
+        self.addCleanup(search_helper.invalidate_index_catalog)
+        patches = [
+            mock.patch.object(Config, "SEARCH_BACKEND", "azure"),
+            mock.patch.object(Config, "EMBEDDINGS_ENABLED", True),
+            mock.patch.object(Config, "SEARCH_MODE", "hybrid"),
+            mock.patch.object(Config, "CONSOLIDATED_INDEX_ENABLED", False),
+            mock.patch.object(ai_utils, "reported_schema_issues", set()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_failed_schema_reads_are_cached(self):
+        index_client = mock.Mock()
+        index_client.get_index.side_effect = ConnectionError("search service unreachable")
+        output = io.StringIO()
+        with mock.patch.object(search_helper, "get_index_client", return_value=index_client), contextlib.redirect_stdout(output):
+            self.assertIsNone(ai_utils.has_vector_field("old-index"))
+            self.assertIsNone(ai_utils.has_vector_field("old-index"))
+            self.assertEqual(index_client.get_index.call_count, 1)
+            search_helper.invalidate_index_catalog()
+            ai_utils.has_vector_field("old-index")
+            self.assertEqual(index_client.get_index.call_count, 2)
+        self.assertEqual(output.getvalue().count("Could not read the schema"), 1)
+
+    def test_missing_vector_field_is_reported_once(self):
+        output = io.StringIO()
+        with mock.patch.object(ai_utils, "get_index_fields", return_value={"id", "content"}), contextlib.redirect_stdout(output):
+            self.assertFalse(ai_utils.has_vector_field("old-index"))
+            self.assertFalse(ai_utils.has_vector_field("old-index"))
+        self.assertEqual(output.getvalue().count("has no content_vector field"), 1)
+
+    def test_keyword_only_indexes_do_not_wait_for_the_embedding(self):
+        def embed_query(query):
+            time.sleep(0.5)
+            return [0.1, 0.2]
+
+        fields = {"new-index": {"id", "content", Config.VECTOR_FIELD}, "old-index": {"id", "content"}}
+        with mock.patch.object(ai_utils, "search_indices_for_query", return_value=["new-index", "old-index"]), \
+                mock.patch.object(ai_utils, "get_index_fields", lambda index, *args: fields[index]), \
+                mock.patch.object(ai_utils, "get_search_client", FakeSearchClient), \
+                mock.patch.object(ai_utils, "embed_query", embed_query), \
+                mock.patch("azure.search.documents.models.VectorizedQuery", mock.Mock()), \
+                contextlib.redirect_stdout(io.StringIO()):
+            hits, index_stats, elapsed = ai_utils.search_hits("swap a deployment slot")
+
+        self.assertEqual(sorted(hit["index"] for hit in hits), ["new-index", "old-index"])
+        self.assertLess(index_stats["old-index"]["latency"], 0.25)
+        self.assertGreaterEqual(index_stats["new-index"]["latency"], 0.25)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_utils
+
+class DroppingClient:
+    def stream(self, messages, max_tokens=1000, label="stream"):
+        yield "Swap the "
+        yield "staging slot"
+        raise requests.exceptions.ChunkedEncodingError("Connection broken: IncompleteRead")
+
+class ResponseStreamTest(unittest.TestCase):
+    def test_connection_drop_keeps_the_partial_reply(self):
+        with mock.patch.object(ai_utils, "get_llm_client", DroppingClient), \
+                mock.patch.object(ai_utils, "build_response_messages", lambda *args: []):
+            tokens = list(ai_utils.generate_response_stream("How do I swap?", [], []))
+        self.assertEqual("".join(tokens), "Swap the staging slot")
+        self.assertEqual(ai_utils.last_response_stats["chunks"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
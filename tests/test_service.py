@@ -0,0 +1,72 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from aiohttp.test_utils import TestClient, TestServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import service
+from chat_session import SessionStore
+from config import Config
+
+class ServiceTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        patches = [
+            mock.patch.object(Config, "SERVICE_TRANSCRIPTS_DIR", self.root),
+            mock.patch.object(Config, "SERVICE_API_KEY", "secret-key"),
+            mock.patch.object(Config, "SERVICE_MAX_CONCURRENT_TURNS", 0),
+            mock.patch.object(Config, "SERVICE_QUEUE_TIMEOUT", 0.05),
+            mock.patch.object(service, "warm_search", lambda: None),
+            mock.patch.object(service, "get_feedback_writer", mock.Mock()),
+            mock.patch.object(service, "start_background_ingestion", mock.Mock(return_value=False)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.sessions = SessionStore(max_sessions=10, idle_timeout=60, workers=2)
+        self.client = TestClient(TestServer(service.create_app(self.sessions)))
+        await self.client.start_server()
+        self.headers = {"X-API-Key": "secret-key"}
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_rejects_a_wrong_api_key(self):
+        response = await self.client.post("/sessions", headers={"X-API-Key": "wrong"})
+        self.assertEqual(response.status, 401)
+        response = await self.client.post("/sessions", headers=self.headers)
+        self.assertEqual(response.status, 201)
+
+    async def test_busy_turn_keeps_the_session_filters(self):
+        session = self.sessions.get()
+        session.filters.update({"doc_types": ["qa"]})
+        response = await self.client.post("/chat", headers=self.headers, json={
+            "message": "How do I swap a slot?", "session_id": session.id, "filters": {"doc_types": ["content"]}
+        })
+        self.assertEqual(response.status, 503)
+        self.assertEqual(session.filters, {"doc_types": ["qa"]})
+
+    async def test_upload_never_replaces_an_existing_transcript(self):
+        with open(os.path.join(self.root, "standup.vtt"), "w", encoding="utf-8") as f:
+            f.write("original")
+        response = await self.client.post("/ingest", headers=self.headers, json={
+            "transcripts": [{"name": "retro.vtt", "text": "new"}, {"name": "standup.vtt", "text": "replacement"}]
+        })
+        self.assertEqual(response.status, 409)
+        with open(os.path.join(self.root, "standup.vtt"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "original")
+        self.assertEqual(os.listdir(self.root), ["standup.vtt"])
+
+    def test_repeated_names_in_one_upload_are_rejected(self):
+        with self.assertRaises(ValueError):
+            service.save_transcripts([{"name": "a.txt", "text": "1"}, {"name": "a.txt", "text": "2"}])
+        self.assertEqual(os.listdir(self.root), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_utils
+import local_search
+from config import Config
+
+def unreachable(*args, **kwargs):
+    raise AssertionError("Azure Search or Key Vault was contacted")
+
+class StoreConversationLocalTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        patches = [
+            mock.patch.object(Config, "SEARCH_BACKEND", "local"),
+            mock.patch.object(Config, "LOCAL_EMBEDDER", "hashing"),
+            mock.patch.object(Config, "LOCAL_INDEX_PATH", self.root),
+            mock.patch.object(Config, "RESPONSE_CACHE_ENABLED", False),
+            mock.patch.object(local_search, "_local_index", None),
+            mock.patch.object(ai_utils, "get_indices", unreachable),
+            mock.patch.object(ai_utils, "get_search_client", unreachable),
+            mock.patch.object(ai_utils, "create_or_replace_index", unreachable),
+            mock.patch("keyvault_helper.get_secret", unreachable),
+            mock.patch.object(ai_utils, "generate_qa_pairs", lambda text, identifier: [
+                {"question": "How do I roll back a deployment?", "answer": "Run the rollback pipeline."}
+            ]),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def test_stores_into_the_local_index_without_azure(self):
+        history = [("user", "How do I roll back a deployment?"), ("assistant", "Run the rollback pipeline.")]
+        self.assertTrue(ai_utils.store_conversation("conv-1", history))
+
+        index = local_search.get_local_index()
+        self.assertEqual(index.existing_ids("manual-knowledge-1", ["conv-1-0", "conv-1-content-0"]), {"conv-1-0", "conv-1-content-0"})
+        self.assertTrue(os.listdir(self.root))
+
+if __name__ == "__main__":
+    unittest.main()
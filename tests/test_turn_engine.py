@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from turn_engine import TurnEngine
+
+DOCUMENTS = [
+    {"id": "slots", "title": "Deployment slots", "content": "Swap a staging deployment slot into production."},
+    {"id": "linux", "title": "Linux apps", "content": "Linux app service plans run containers on kudu."}
+]
+
+class TurnEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.searches = []
+        self.rewrites = []
+        self.rewrite_delay = 1.0
+
+    def search(self, query, filters):
+        self.searches.append(query)
+        words = set(query.lower().split())
+        hits = [dict(doc, score=1.0) for doc in DOCUMENTS if words & set(f"{doc['title']} {doc['content']}".lower().split())]
+        return hits, {}, 0.0
+
+    def rewriter(self, question, history):
+        self.rewrites.append(question)
+        time.sleep(self.rewrite_delay)
+        return "linux app service plans"
+
+    def make_engine(self):
+        engine = TurnEngine(self.search, lambda query, filters, hits, stats, elapsed: [hit["id"] for hit in hits], self.rewriter)
+        self.addCleanup(engine.close)
+        return engine
+
+    def test_reused_turn_does_not_wait_for_the_rewrite(self):
+        engine = self.make_engine()
+        history = [("How do I swap a deployment slot?", "Use a swap.")]
+        engine.retrieve("How do I swap a deployment slot?", [])
+        start = time.perf_counter()
+        context = engine.retrieve("why?", history)
+        self.assertLess(time.perf_counter() - start, self.rewrite_delay / 2)
+        self.assertEqual(engine.turns[-1]["kind"], "reused")
+        self.assertEqual(context, ["slots"])
+        self.assertEqual(self.rewrites, [])
+        self.assertEqual(len(self.searches), 1)
+
+    def test_follow_up_with_new_words_searches_the_rewrite(self):
+        engine = self.make_engine()
+        self.rewrite_delay = 0.0
+        history = [("How do I swap a deployment slot?", "Use a swap.")]
+        engine.retrieve("How do I swap a deployment slot?", [])
+        context = engine.retrieve("what about linux?", history)
+        self.assertEqual(self.rewrites, ["what about linux?"])
+        self.assertIn("linux", context)
+        self.assertNotEqual(engine.turns[-1]["kind"], "reused")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+# turn_engine.py
+
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+STOPWORDS = {
+    "a", "about", "all", "also", "an", "and", "any", "are", "as", "at", "be", "but", "by", "can", "could", "do",
+    "does", "for", "from", "get", "how", "i", "if", "in", "into", "is", "it", "its", "me", "more", "my", "of",
+    "on", "or", "should", "so", "tell", "that", "the", "then", "there", "these", "they", "this", "those", "to",
+    "use", "was", "we", "what", "when", "where", "which", "who", "why", "will", "with", "would", "you", "your"
+}
+
+def content_words(text):
+    return {word for word in re.findall(r"\w+", text.lower()) if len(word) > 1 and word not in STOPWORDS}
+
+def coverage(query, words):
+    """
+    Share of the query's content words that appear in `words`; a query with
+    none ("why?", "and then?") counts as fully covered.
+    """
+    wanted = content_words(query)
+    if not wanted:
+        return 1.0
+    return len(wanted & words) / len(wanted)
+
+def hit_words(hits):
+    return [content_words(f"{hit.get('title', '')} {hit.get('content', '')}") for hit in hits]
+
+def best_coverage(query, word_sets):
+    """
+    Coverage of the query by the single hit that matches it best, so words
+    scattered across unrelated hits do not add up to a match.
+    """
+    return max((coverage(query, words) for words in word_sets), default=coverage(query, set()))
+
+class TurnEngine:
+    """
+    Retrieval for one conversation, pipelined across turns.
+
+    The previous turn's hits stay warm. A follow-up that adds no content
+    words to the previous query ("why?", "tell me more") and is covered by
+    one of the warm hits is answered from them straight away, without
+    waiting for the LLM. Any other follow-up is rewritten by the LLM into a
+    standalone query: if it adds no words the rewritten query is searched;
+    if it does, a speculative search for "<previous query> <follow-up>"
+    runs alongside the rewrite, and when one of the speculative or warm
+    hits covers the rewritten query no second search is made, else the
+    rewritten query is searched as well. prefetch() warms catalogs and
+    clients in the background while the user is typing.
+
+    search(query, filters) must return (hits, index_stats, elapsed),
+    pack(query, filters, hits, index_stats, elapsed) the context, and
+    rewriter(question, history) a standalone query. Rewrites, speculative
+    searches and warm-ups run on `executor` when one is given (shared across
+    conversations), otherwise on a small pool of the engine's own.
+    """
+
+    def __init__(self, search, pack, rewriter, warmer=None, reuse_coverage=0.8, rewrite_timeout=10, warm_hits=40, executor=None):
+        self.search = search
+        self.pack = pack
+        self.rewriter = rewriter
+        self.warmer = warmer
+        self.reuse_coverage = reuse_coverage
+        self.rewrite_timeout = rewrite_timeout
+        self.warm_hits = warm_hits
+        self.turns = deque(maxlen=100)
+        self._warm = None
+        self._prefetch = None
+        self._lock = threading.Lock()
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=3, thread_name_prefix="lumina-turn")
+
+    def prefetch(self):
+        """
+        Start warming search in the background unless a warm-up is running.
+        """
+        if self.warmer is None:
+            return
+        with self._lock:
+            if self._prefetch is not None and not self._prefetch.done():
+                return
+            self._prefetch = self._executor.submit(self._run_warmer)
+
+    def _run_warmer(self):
+        try:
+            self.warmer()
+        except Exception as e:
+            print("Warning: Could not warm up search:", e)
+
+    def reset(self):
+        with self._lock:
+            self._warm = None
+
+    def close(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    def _rewrite(self, question, history, fallback):
+        try:
+            return self.rewriter(question, history) or fallback
+        except Exception as e:
+            print("Warning: Could not rewrite the follow-up question:", e)
+            return fallback
+
+    def retrieve(self, question, history, filters=None):
+        """
+        Return the packed context for `question`. history is the list of
+        earlier (question, answer) turns; the kind of retrieval used is
+        appended to self.turns.
+        """
+        start = time.perf_counter()
+        filters = dict(filters or {})
+        with self._lock:
+            warm = self._warm if self._warm is not None and self._warm["filters"] == filters else None
+
+        if warm is None or not history:
+            kind = "first" if not history else "fresh"
+            query = question
+            hits, index_stats, _ = self.search(query, filters)
+            new_hits = hits
+        else:
+            speculative_query = f"{warm['query']} {question}"
+            adds_words = bool(content_words(question) - content_words(warm["query"]))
+            if not adds_words and best_coverage(question, warm["words"]) >= self.reuse_coverage:
+                kind = "reused"
+                query = speculative_query
+                hits, index_stats, new_hits = warm["hits"], {}, []
+            else:
+                rewrite = self._executor.submit(self._rewrite, question, history, speculative_query)
+                speculative = self._executor.submit(self.search, speculative_query, filters) if adds_words else None
+                try:
+                    query = rewrite.result(timeout=self.rewrite_timeout)
+                except FutureTimeoutError:
+                    query = speculative_query
+
+                if speculative is None:
+                    kind = "re-retrieved"
+                    hits, index_stats, _ = self.search(query, filters)
+                    new_hits = hits
+                else:
+                    new_hits, index_stats, _ = speculative.result()
+                    hits = new_hits + warm["hits"]
+                    if query == speculative_query or best_coverage(query, hit_words(new_hits) + warm["words"]) >= self.reuse_coverage:
+                        kind = "speculative"
+                    else:
+                        kind = "re-retrieved"
+                        # The topic moved on, so the warm hits are left out.
+                        rewritten_hits, index_stats, _ = self.search(query, filters)
+                        new_hits = rewritten_hits + new_hits
+                        hits = new_hits
+
+        context = self.pack(query, filters, hits, index_stats, time.perf_counter() - start)
+        kept = sorted(hits, key=lambda hit: hit.get("score") or 0.0, reverse=True)[:self.warm_hits]
+        words = hit_words(kept) if kind != "reused" else warm["words"]
+        with self._lock:
+            self._warm = {"query": query if kind != "reused" else warm["query"], "filters": filters, "hits": kept, "words": words}
+            self.turns.append({"kind": kind, "query": query, "new_hits": len(new_hits), "retrieval_time": time.perf_counter() - start})
+        return context